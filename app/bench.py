@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""CLI de benchmarks (uso académico).
+
+Ejemplos:
+  python -m app.bench --output outputs/bench.json
+  python -m app.bench --sizes 512 1024 --batch-sizes 1 8 --repeat 20
+  python -m app.bench --baseline benchmarks/baseline.json --tolerance 0.25
+
+Con `--baseline` el proceso termina con código 1 si alguna medición es
+más lenta que la referencia por encima de la tolerancia.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from src.bench import (
+    DEFAULT_BATCH_SIZES,
+    DEFAULT_REPEAT,
+    DEFAULT_SIZES,
+    DEFAULT_TOLERANCE,
+    DEFAULT_WARMUP,
+    STAGES,
+    compare_results,
+    format_results,
+    results_to_json,
+    run_suite,
+)
+
+
+def main() -> None:
+    """Punto de entrada de los benchmarks."""
+    parser = argparse.ArgumentParser(
+        description="Benchmarks por etapa del pipeline de neumonía.",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=list(DEFAULT_SIZES),
+        help="Lados (px) de las imágenes sintéticas de entrada.",
+    )
+    parser.add_argument(
+        "--batch-sizes",
+        type=int,
+        nargs="+",
+        default=list(DEFAULT_BATCH_SIZES),
+        help="Tamaños de batch para predict.",
+    )
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=STAGES,
+        default=list(STAGES),
+        help="Etapas a medir (por defecto, todas).",
+    )
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    parser.add_argument(
+        "--model",
+        default=None,
+        help="Modelo .h5 real; por defecto se usa uno sintético.",
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Archivo JSON donde guardar los resultados.",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="JSON de referencia con el que comparar (falla si hay regresión).",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Aumento relativo de p50 permitido frente a la línea base.",
+    )
+    args = parser.parse_args()
+
+    results = run_suite(
+        sizes=args.sizes,
+        batch_sizes=args.batch_sizes,
+        stages=args.stages,
+        repeat=args.repeat,
+        warmup=args.warmup,
+        model_path=args.model,
+        progress=lambda r: print(f"  {r.key}: p50 {r.p50_ms:.2f} ms", flush=True),
+    )
+    print(format_results(results))
+
+    document = results_to_json(results)
+    if args.output:
+        out = Path(args.output)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(document, indent=2), encoding="utf-8")
+        print(f"Resultados: {out}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare_results(document, baseline, args.tolerance)
+        if regressions:
+            print("Regresiones frente a la línea base:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("Sin regresiones frente a la línea base.")
+
+
+if __name__ == "__main__":
+    main()
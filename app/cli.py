@@ -2,27 +2,66 @@
 # -*- coding: utf-8 -*-
 """CLI para inferencia y generación de Grad-CAM (uso académico).
 
-Ejecuta predicción sobre una imagen (DICOM/JPG/PNG), guarda el heatmap
-como PNG y muestra etiqueta + probabilidad por consola.
+Ejecuta predicción sobre una imagen (DICOM/JPG/PNG/TIFF), guarda el heatmap
+como PNG y muestra etiqueta + probabilidad por consola. Un DICOM
+multi-frame o un TIFF multipágina se procesa como estudio: un heatmap y
+una predicción por frame, más el resultado agregado.
+
+En modo lote (`--input-dir`, `--glob` o `--manifest`) procesa muchas
+imágenes en un solo proceso con un pipeline en streaming y escribe los
+resultados de forma incremental en un archivo JSONL o CSV.
+
+TensorFlow, OpenCV y pydicom se importan solo después de interpretar los
+argumentos, así `--help` responde al instante. `--profile-startup`
+muestra el desglose de tiempos de importación.
+
+`--heatmap never` solo clasifica (sin Grad-CAM) y `--heatmap auto` calcula
+el heatmap solo de las imágenes no normales o de confianza menor que
+`--min-confidence`.
+
+`--trace`, `--metrics` y `--log-timings` activan la instrumentación por
+etapas (ver `src.telemetry`).
 """
 
 from __future__ import annotations
 
 import argparse
+import csv
+import glob
+import json
+import logging
+import threading
+import time
 from pathlib import Path
-from typing import Iterable
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
 
-from PIL import Image
+from src.config import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_CACHE_MAX_MB,
+    DEFAULT_HEATMAP_MIN_CONFIDENCE,
+    DEFAULT_HEATMAP_POLICY,
+)
 
-from src.io_imgs import read_dicom_file, read_jpg_file
-from src.inference import predict
+if TYPE_CHECKING:
+    from src.inference import Prediction
+    from src.pipeline import PipelineResult
+
+# Referencia para medir el arranque con --profile-startup.
+_T0 = time.perf_counter()
 
 # Extensiones soportadas (en orden de prueba cuando no se especifica).
-SUPPORTED_EXTS: tuple[str, ...] = (".dcm", ".jpg", ".jpeg", ".png")
+SUPPORTED_EXTS: tuple[str, ...] = (
+    ".dcm", ".jpg", ".jpeg", ".png", ".tif", ".tiff"
+)
 
 # Valores por defecto de la CLI.
 DEFAULT_IMG_HINT = "samples/bacteria"
 DEFAULT_OUTPUT_DIR = "outputs"
+DEFAULT_RESULTS_NAME = "results.jsonl"
+
+# Campos del archivo de resultados que se añaden a los de `Prediction`
+# (`to_dict` en JSONL, `inference.PREDICTION_CSV_FIELDS` en CSV).
+RESULT_FIELDS: tuple[str, ...] = ("heatmap", "cached", "error")
 
 
 def _iter_candidates(base: Path, exts: Iterable[str]) -> Iterable[Path]:
@@ -81,6 +120,249 @@ def resolve_image_path(raw: str) -> Path:
     raise SystemExit(msg)
 
 
+def iter_batch_inputs(
+    input_dir: str | None, pattern: str | None, manifest: str | None
+) -> Iterator[Path]:
+    """Genera las rutas a procesar en modo lote.
+
+    - `input_dir` + `pattern`: archivos bajo la carpeta que cumplen el patrón
+      (por defecto `**/*`, recursivo).
+    - Solo `pattern`: patrón glob relativo al directorio actual.
+    - `manifest`: archivo de texto con una ruta por línea (`#` comenta).
+
+    Solo se devuelven archivos con extensión en SUPPORTED_EXTS.
+
+    Raises:
+        FileNotFoundError: Si no existen `manifest` o `input_dir` (se lanza
+            al iterar; `run_batch` los valida antes de arrancar).
+    """
+    if manifest:
+        with open(manifest, encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield Path(line)
+
+    if input_dir:
+        root = Path(input_dir)
+        if not root.is_dir():
+            raise FileNotFoundError(
+                f"No existe la carpeta de entrada: {root.resolve()}"
+            )
+        candidates: Iterable[Path] = sorted(root.glob(pattern or "**/*"))
+    elif pattern:
+        candidates = (Path(p) for p in sorted(glob.glob(pattern, recursive=True)))
+    else:
+        candidates = ()
+
+    for path in candidates:
+        if path.is_file() and path.suffix.lower() in SUPPORTED_EXTS:
+            yield path
+
+
+class ResultsWriter:
+    """Escribe resultados fila a fila (JSONL o CSV según la extensión).
+
+    Cada fila es la ruta, la serialización de `Prediction` (`to_dict` o
+    `to_csv_row`, como el resto de salidas) y los campos de RESULT_FIELDS.
+    """
+
+    def __init__(self, path: Path) -> None:
+        from src.inference import PREDICTION_CSV_FIELDS
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._fh = open(path, "w", encoding="utf-8", newline="")
+        self._writer = None
+        self._empty = [""] * len(PREDICTION_CSV_FIELDS)
+        if path.suffix.lower() == ".csv":
+            self._writer = csv.writer(self._fh)
+            self._writer.writerow(["path", *PREDICTION_CSV_FIELDS, *RESULT_FIELDS])
+
+    def write(
+        self,
+        path: Path,
+        prediction: Prediction | None,
+        heatmap: Path | None = None,
+        cached: bool = False,
+        error: str | None = None,
+    ) -> None:
+        """Añade una fila y la vuelca a disco inmediatamente.
+
+        Args:
+            path: Imagen de entrada.
+            prediction: Resultado, o `None` si la imagen falló.
+            heatmap: PNG del heatmap guardado, si lo hay.
+            cached: Si el resultado salió de la caché.
+            error: Mensaje de error de la imagen.
+        """
+        extra = [str(heatmap) if heatmap else None, cached, error]
+        with self._lock:
+            if self._writer is not None:
+                row = prediction.to_csv_row() if prediction else self._empty
+                self._writer.writerow([str(path), *row, *extra])
+            else:
+                record = {"path": str(path)}
+                if prediction is not None:
+                    record.update(prediction.to_dict())
+                record.update(zip(RESULT_FIELDS, extra))
+                self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._fh.flush()
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+def _heatmap_policy(args: argparse.Namespace) -> Any:
+    """`inference.HeatmapPolicy` a partir de `--heatmap` y `--min-confidence`."""
+    from src.inference import HeatmapPolicy
+
+    return HeatmapPolicy(args.heatmap, args.min_confidence)
+
+
+def run_batch(args: argparse.Namespace) -> None:
+    """Ejecuta el modo lote y reporta el rendimiento por consola."""
+    # Validar las entradas antes de importar TensorFlow y arrancar hilos
+    if args.input_dir and not Path(args.input_dir).is_dir():
+        raise SystemExit(
+            f"No existe la carpeta de entrada: {Path(args.input_dir).resolve()}"
+        )
+    if args.manifest and not Path(args.manifest).is_file():
+        raise SystemExit(f"No existe el manifiesto: {Path(args.manifest).resolve()}")
+    if args.processes and args.shm_slots and 0 < args.shm_slots < args.batch_size:
+        raise SystemExit(
+            f"--shm-slots ({args.shm_slots}) debe ser 0 o al menos "
+            f"--batch-size ({args.batch_size})."
+        )
+
+    from PIL import Image
+
+    from src.cache import ResultCache, cache_namespace
+    from src.inference import Prediction
+    from src.backends import backend_name, backend_path
+    from src.model import file_sha256
+    from src.pipeline import run_pipeline
+    from src.preprocess import PREPROCESS_DEFAULTS
+
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    results_path = Path(args.results or out_dir / DEFAULT_RESULTS_NAME)
+    results_path.parent.mkdir(parents=True, exist_ok=True)
+    input_root = Path(args.input_dir) if args.input_dir else None
+
+    def heatmap_path(img_path: Path) -> Path:
+        # Con --input-dir se replica la estructura de subcarpetas
+        rel_parent = Path()
+        if input_root is not None and img_path.is_relative_to(input_root):
+            rel_parent = img_path.relative_to(input_root).parent
+        return out_dir / rel_parent / f"heatmap_{img_path.stem}.png"
+
+    # Motores de las probabilidades (ver `inference`): Keras en las filas
+    # con heatmap y el de `get_backend` en las demás. Se hashean sus
+    # archivos (sin cargarlos aquí)
+    heatmap = _heatmap_policy(args)
+    try:
+        backend = "keras" if heatmap.mode == "always" else backend_name()
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from exc
+    hashes: dict[str, str] = {}
+    for name in {"keras", backend}:
+        model_path = backend_path(name)
+        try:
+            hashes[name] = file_sha256(model_path)
+        except FileNotFoundError:
+            raise SystemExit(
+                f"No se encontró el archivo del modelo en: {model_path}"
+            ) from None
+
+    writer = ResultsWriter(results_path)
+
+    def sink(result: PipelineResult) -> None:
+        prediction, out_file = None, None
+        if result.ok:
+            # Los aciertos de caché no pasan por el modelo: sin `inference_ms`
+            timings = {}
+            if result.inference_ms is not None:
+                timings["inference_ms"] = result.inference_ms
+            used = "keras" if result.heatmap is not None else backend
+            prediction = Prediction.from_probs(
+                result.probs,
+                backend=used,
+                model_sha256=hashes[used],
+                timings=timings,
+            )
+        if result.ok and result.heatmap is not None:
+            out_file = heatmap_path(result.path)
+            out_file.parent.mkdir(parents=True, exist_ok=True)
+            Image.fromarray(result.heatmap).save(out_file)
+        writer.write(result.path, prediction, out_file, result.cached, result.error)
+
+    reader_kwargs: dict[str, Any] = {}
+    bytes_reader = None
+    params: dict[str, Any] = dict(PREPROCESS_DEFAULTS)
+    if args.fast_decode:
+        from src.io_imgs import read_model_gray
+
+        reader_kwargs["reader"] = read_model_gray
+
+        def read_gray_bytes(path: Path, data: bytes) -> Any:
+            # Fallos de caché: decodificar los bytes ya leídos para la clave
+            return read_model_gray(path, data=data)
+
+        bytes_reader = read_gray_bytes
+        params["decode"] = "model_gray"  # resultados JPG no idénticos: otra caché
+    if heatmap.mode != "always":  # entradas sin heatmap: otra caché
+        params.update(heatmap=heatmap.mode, min_confidence=heatmap.min_confidence)
+    if backend != "keras":  # probabilidades de otro motor: otra caché
+        params.update(backend=backend, backend_sha256=hashes[backend])
+
+    cache = None
+    if args.cache_dir:
+        namespace = cache_namespace(hashes["keras"], params)
+        cache = ResultCache(
+            args.cache_dir, namespace, max_bytes=args.cache_max_mb * 1024 * 1024
+        )
+
+    inputs = iter_batch_inputs(args.input_dir, args.glob, args.manifest)
+    try:
+        if args.processes:
+            from src.sharded import run_sharded
+
+            stats = run_sharded(
+                inputs,
+                sink,
+                workers=args.processes,
+                shard_size=args.batch_size,
+                threads_per_worker=args.threads_per_process,
+                ring_slots=args.shm_slots,
+                writers=args.writers,
+                cache=cache,
+                heatmap=heatmap,
+                **reader_kwargs,
+            )
+        else:
+            stats = run_pipeline(
+                inputs,
+                sink,
+                batch_size=args.batch_size,
+                readers=args.readers,
+                writers=args.writers,
+                cache=cache,
+                heatmap=heatmap,
+                bytes_reader=bytes_reader,
+                **reader_kwargs,
+            )
+    finally:
+        writer.close()
+
+    print(
+        f"Procesadas: {stats.total} "
+        f"(errores: {stats.failed}, desde caché: {stats.cached})"
+    )
+    print(f"Tiempo:     {stats.seconds:.2f} s ({stats.images_per_sec:.2f} img/s)")
+    print(f"Resultados: {results_path.resolve()}")
+
+
 def main() -> None:
     """Punto de entrada de la CLI."""
     parser = argparse.ArgumentParser(
@@ -90,7 +372,7 @@ def main() -> None:
         "--img",
         default=DEFAULT_IMG_HINT,
         help=(
-            "Ruta a la imagen (.dcm/.jpg/.jpeg/.png). "
+            "Ruta a la imagen (.dcm/.jpg/.jpeg/.png/.tif/.tiff). "
             "Por defecto intenta 'samples/bacteria{ext}'."
         ),
     )
@@ -99,37 +381,213 @@ def main() -> None:
         default=DEFAULT_OUTPUT_DIR,
         help="Carpeta de salida para guardar el heatmap (PNG).",
     )
+    parser.add_argument(
+        "--heatmap",
+        choices=("always", "never", "auto"),
+        default=DEFAULT_HEATMAP_POLICY,
+        help=(
+            "Cuándo calcular Grad-CAM: siempre, nunca (solo clasificación) o "
+            "auto (clase no normal o confianza menor que --min-confidence)."
+        ),
+    )
+    parser.add_argument(
+        "--min-confidence",
+        type=float,
+        default=DEFAULT_HEATMAP_MIN_CONFIDENCE,
+        help="Umbral de confianza (%%) para --heatmap auto.",
+    )
+
+    batch = parser.add_argument_group("modo lote")
+    batch.add_argument(
+        "--input-dir", help="Carpeta con imágenes a procesar (recursivo)."
+    )
+    batch.add_argument(
+        "--glob",
+        help="Patrón glob (relativo a --input-dir si se indica; por defecto '**/*').",
+    )
+    batch.add_argument(
+        "--manifest", help="Archivo de texto con una ruta de imagen por línea."
+    )
+    batch.add_argument(
+        "--results",
+        help=(
+            "Archivo de resultados .jsonl o .csv "
+            f"(por defecto <out>/{DEFAULT_RESULTS_NAME})."
+        ),
+    )
+    batch.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Imágenes por llamada al modelo.",
+    )
+    batch.add_argument(
+        "--readers", type=int, default=4, help="Hilos de lectura/decodificación."
+    )
+    batch.add_argument(
+        "--writers", type=int, default=2, help="Hilos de escritura de resultados."
+    )
+    batch.add_argument(
+        "--processes",
+        type=int,
+        default=0,
+        help=(
+            "Procesos de trabajo, cada uno con su modelo cargado (0: un solo "
+            "proceso). Cada proceso recibe bloques de --batch-size archivos."
+        ),
+    )
+    batch.add_argument(
+        "--threads-per-process",
+        type=int,
+        help="Hilos de TensorFlow/OpenCV por proceso (por defecto, CPUs/procesos).",
+    )
+    batch.add_argument(
+        "--shm-slots",
+        type=int,
+        help=(
+            "Heatmaps en vuelo en memoria compartida con --processes (768 KB "
+            "cada uno; por defecto 2 x procesos x batch; mínimo --batch-size). "
+            "0: sin memoria compartida."
+        ),
+    )
+    batch.add_argument(
+        "--fast-decode",
+        action="store_true",
+        help=(
+            "Decodifica directo a gris a la resolución del modelo (más rápido; "
+            "en JPG puede variar ±1 nivel de gris). El heatmap usa esa base."
+        ),
+    )
+    batch.add_argument(
+        "--cache-dir",
+        help=(
+            "Caché de resultados en disco: imágenes ya procesadas (mismo "
+            "contenido, modelo y preprocesamiento) no vuelven a inferirse."
+        ),
+    )
+    batch.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=DEFAULT_CACHE_MAX_MB,
+        help="Tamaño máximo de la caché (MB); se desalojan las menos usadas.",
+    )
+    telemetry = parser.add_argument_group("instrumentación")
+    telemetry.add_argument(
+        "--trace",
+        help="Guarda los tiempos por etapa como traza JSON (chrome://tracing).",
+    )
+    telemetry.add_argument(
+        "--metrics",
+        help="Guarda métricas por etapa en formato de texto de Prometheus.",
+    )
+    telemetry.add_argument(
+        "--log-timings",
+        action="store_true",
+        help="Registra en el log la duración de cada etapa.",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Muestra el tiempo de importación de cada dependencia y sale.",
+    )
     args = parser.parse_args()
 
+    if args.profile_startup:
+        from src.startup import format_import_profile, profile_imports
+
+        elapsed = time.perf_counter() - _T0
+        print(format_import_profile(profile_imports(), elapsed_before=elapsed))
+        return
+
+    from src import telemetry
+
+    sinks: list[telemetry.Sink] = []
+    if args.trace:
+        sinks.append(telemetry.ChromeTraceSink(args.trace))
+    if args.metrics:
+        sinks.append(telemetry.PrometheusSink(args.metrics))
+    if args.log_timings:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        sinks.append(telemetry.LogSink())
+    if sinks:
+        telemetry.enable(*sinks)
+    else:
+        telemetry.configure_from_env()
+    try:
+        if args.input_dir or args.glob or args.manifest:
+            run_batch(args)
+        else:
+            run_single(args)
+    finally:
+        telemetry.disable()
+
+
+def run_single(args: argparse.Namespace) -> None:
+    """Modo de una sola imagen: predice y guarda su heatmap."""
+    from PIL import Image
+
+    from src.inference import predict
+    from src.io_imgs import frame_count, read_image_file
+
     # Resolver ruta de entrada y carpeta de salida.
     img_path = resolve_image_path(args.img)
     out_dir = Path(args.out)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    # Cargar imagen según la extensión (E/S centralizada en src.io_imgs).
-    ext = img_path.suffix.lower()
-    if ext == ".dcm":
-        array, _meta = read_dicom_file(str(img_path))
-    elif ext in {".jpg", ".jpeg", ".png"}:
-        array, _meta = read_jpg_file(str(img_path))
-    else:
-        raise SystemExit(f"Extensión no soportada: {ext}")
+    try:
+        if frame_count(img_path) > 1:
+            run_study(img_path, out_dir, _heatmap_policy(args))
+            return
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from exc
 
-    # Ejecutar inferencia (devuelve etiqueta, probabilidad y heatmap RGB).
-    label, proba, heatmap = predict(array)
+    # Cargar imagen según la extensión (E/S centralizada en src.io_imgs).
+    try:
+        array, _meta = read_image_file(img_path)
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from exc
 
-    # Guardar heatmap como PNG.
-    out_file = out_dir / f"heatmap_{img_path.stem}.png"
-    Image.fromarray(heatmap).save(out_file)
+    # Ejecutar inferencia (etiqueta, probabilidad, heatmap RGB o None si la
+    # política de heatmap lo omitió, y el vector completo de probabilidades).
+    prediction = predict(array, heatmap=_heatmap_policy(args))
+    label, proba, heatmap = prediction
 
     # Reporte breve por consola.
     print(f"Imagen:       {img_path.resolve()}")
     print(f"Resultado:    {label}")
     print(f"Probabilidad: {proba:.2f}%")
-    print(f"Heatmap:      {out_file.resolve()}")
+    scores = ", ".join(f"{name} {p * 100:.2f}%" for name, p in prediction.top_k())
+    print(f"Por clase:    {scores}")
 
+    # Guardar heatmap como PNG.
+    if heatmap is not None:
+        out_file = out_dir / f"heatmap_{img_path.stem}.png"
+        Image.fromarray(heatmap).save(out_file)
+        print(f"Heatmap:      {out_file.resolve()}")
 
-if __name__ == "__main__":
-    main()
 
+def run_study(
+    img_path: Path, out_dir: Path, heatmap: Any = DEFAULT_HEATMAP_POLICY
+) -> None:
+    """Estudio multi-frame: predice cada frame en batch y agrega."""
+    from PIL import Image
 
+    from src.inference import predict_study
+    from src.io_imgs import iter_frames
+
+    study = predict_study(iter_frames(img_path), heatmap=heatmap)
+
+    print(f"Estudio:      {img_path.resolve()}")
+    for index, (label, proba, cam) in enumerate(study.frames):
+        line = f"  frame {index:3d}:  {label} ({proba:.2f}%)"
+        if cam is not None:
+            out_file = out_dir / f"heatmap_{img_path.stem}_f{index:03d}.png"
+            Image.fromarray(cam).save(out_file)
+            line += f"  {out_file}"
+        print(line)
+    print(f"Resultado:    {study.label} (media de {len(study.heatmaps)} frames)")
+    print(f"Probabilidad: {study.proba:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
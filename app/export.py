@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""CLI de exportación del modelo a TFLite / ONNX (uso académico).
+
+Ejemplos:
+  # Exportar junto al .h5 y comprobar paridad con Keras
+  python -m app.export --model model/conv_MLP_84.h5
+
+  # Solo TFLite, comprobando con imágenes reales
+  python -m app.export --formats tflite --samples samples/
+
+  # Usar el motor exportado para clasificar
+  UAO_BACKEND=tflite python -m app.serve
+
+Termina con código 1 si algún motor no pasa la verificación de paridad.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+
+from src.config import DEFAULT_MODEL_PATH
+
+
+def main() -> None:
+    """Punto de entrada de la exportación."""
+    from src.export import DEFAULT_PARITY_ATOL, EXPORT_FORMATS
+
+    parser = argparse.ArgumentParser(
+        description="Exporta el modelo Keras a TFLite/ONNX y verifica la paridad.",
+    )
+    parser.add_argument(
+        "--model",
+        help=f"Modelo .h5 (por defecto MODEL_PATH o {DEFAULT_MODEL_PATH}).",
+    )
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        choices=EXPORT_FORMATS,
+        default=list(EXPORT_FORMATS),
+        help="Formatos a generar.",
+    )
+    parser.add_argument(
+        "--out-dir", help="Carpeta de salida (por defecto, la del modelo)."
+    )
+    parser.add_argument(
+        "--samples",
+        help="Carpeta con imágenes para la paridad (por defecto, batch sintético).",
+    )
+    parser.add_argument(
+        "--max-samples", type=int, default=16, help="Imágenes de --samples a usar."
+    )
+    parser.add_argument(
+        "--atol",
+        type=float,
+        default=DEFAULT_PARITY_ATOL,
+        help="Diferencia absoluta máxima admitida en las probabilidades.",
+    )
+    parser.add_argument(
+        "--no-check", action="store_true", help="No verifica la paridad."
+    )
+    args = parser.parse_args()
+
+    from src.export import check_parity, export_model, sample_batch
+
+    try:
+        paths = export_model(args.model, args.formats, args.out_dir)
+    except ImportError as exc:
+        raise SystemExit(
+            f"Falta el conversor: {exc.name} (pip install tf2onnx onnxruntime)"
+        ) from exc
+    for fmt, path in paths.items():
+        size_mb = path.stat().st_size / (1024 * 1024)
+        print(f"{fmt:<7} {path.resolve()} ({size_mb:.1f} MB)")
+    if args.no_check:
+        return
+
+    batch = None
+    if args.samples:
+        try:
+            batch = sample_batch(args.samples, args.max_samples)
+        except ValueError as exc:
+            raise SystemExit(str(exc)) from exc
+    results = check_parity(
+        args.model, args.formats, batch=batch, atol=args.atol, paths=paths
+    )
+    print(f"\n{'motor':<7} {'muestras':>8} {'dif. máx.':>11} {'misma clase':>12}")
+    for r in results:
+        status = "OK" if r.ok else "FALLA"
+        print(
+            f"{r.backend:<7} {r.samples:>8} {r.max_abs_diff:>11.2e} "
+            f"{r.argmax_agreement:>11.0%}  {status}"
+        )
+    if not all(r.ok for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
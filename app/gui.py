@@ -4,27 +4,106 @@
 
 Permite cargar imágenes radiográficas, ejecutar predicción, mostrar el
 heatmap, y exportar resultados a CSV o PDF.
+
+Los estudios vistos en la sesión se guardan en una caché LRU en memoria
+(imagen decodificada, batch preprocesado y última predicción), de modo
+que recargar o volver a analizar un estudio reciente es instantáneo.
+
+La inferencia corre en un hilo de trabajo: la ventana sigue respondiendo
+mientras TensorFlow calcula, los resultados vuelven al hilo de Tk a través
+de una cola consultada con `root.after`, y el modelo se precarga en segundo
+plano al abrir la aplicación. TensorFlow y pydicom se importan en ese
+hilo (no antes de mostrar la ventana).
 """
 
 from __future__ import annotations
 
 import csv
 import os
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
 from tkinter import END, StringVar, Text, Tk
 from tkinter import filedialog, font, ttk
-from tkinter.messagebox import WARNING, askokcancel, showinfo
+from tkinter.messagebox import WARNING, askokcancel, showerror, showinfo
+from typing import TYPE_CHECKING
 
-import tkcap
+import numpy as np
 from PIL import Image, ImageTk
 
-from src.io_imgs import read_dicom_file, read_jpg_file
-from src.inference import predict
+from src.cache import MemoryLRU
+from src.config import DEFAULT_MEMORY_CACHE_MB
+
+if TYPE_CHECKING:
+    from src.inference import Prediction
 
 # Directorios de salida
 RESULTS_DIR = "resultados"
 REPORTS_DIR = os.path.join(RESULTS_DIR, "reportes")
 HIST_DIR = os.path.join(RESULTS_DIR, "historial")
 
+# Separador del historial CSV.
+HISTORY_DELIMITER = "-"
+
+# Memoria máxima (MB) de la caché de estudios de la sesión.
+GUI_CACHE_MB = int(os.getenv("GUI_CACHE_MB", str(DEFAULT_MEMORY_CACHE_MB)))
+
+# Intervalo (ms) de consulta de resultados del hilo de trabajo.
+POLL_MS = 50
+
+
+def _rotate_history(csv_path: str) -> str:
+    """Renombra un historial con otras columnas a `<nombre>.anterior[-N].csv`."""
+    stem, ext = os.path.splitext(csv_path)
+    target, n = f"{stem}.anterior{ext}", 1
+    while os.path.exists(target):
+        target, n = f"{stem}.anterior-{n}{ext}", n + 1
+    os.replace(csv_path, target)
+    return target
+
+
+def append_history(csv_path: str, cedula: str, prediction: Prediction) -> None:
+    """Añade una fila al historial CSV, con cabecera si el archivo es nuevo.
+
+    Las columnas son fijas: `cedula` y las de
+    `inference.PREDICTION_CSV_FIELDS` (`Prediction.to_csv_row`), así el
+    historial se lee con `csv.DictReader(f, delimiter=HISTORY_DELIMITER)`.
+    Un historial cuya primera fila no es esa cabecera (el formato anterior,
+    `cedula-etiqueta-xx.xx%` sin cabecera, u otras columnas) no se mezcla:
+    se renombra con `_rotate_history` y se empieza uno nuevo.
+    """
+    from src.inference import PREDICTION_CSV_FIELDS
+
+    header = ["cedula", *PREDICTION_CSV_FIELDS]
+    try:
+        with open(csv_path, newline="", encoding="utf-8") as csvfile:
+            first = next(csv.reader(csvfile, delimiter=HISTORY_DELIMITER), None)
+    except FileNotFoundError:
+        first = None
+    except UnicodeDecodeError:  # historial antiguo en otra codificación
+        first = []
+    if first is not None and first != header:
+        _rotate_history(csv_path)
+        first = None
+
+    with open(csv_path, "a", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile, delimiter=HISTORY_DELIMITER)
+        if first is None:
+            writer.writerow(header)
+        writer.writerow([cedula, *prediction.to_csv_row()])
+
+
+@dataclass
+class Study:
+    """Estudio cargado en la sesión: imagen decodificada y resultados."""
+
+    array: np.ndarray
+    img2show: Image.Image
+    batch: np.ndarray | None = None
+    model_sha256: str | None = None
+    prediction: Prediction | None = None
+
 
 class App:
     """Aplicación de escritorio con interfaz Tkinter."""
@@ -80,6 +159,14 @@ class App:
         self.button6 = ttk.Button(
             self.root, text="Guardar", command=self.save_results_csv
         )
+        self.button7 = ttk.Button(
+            self.root, text="Cancelar", state="disabled", command=self.cancel_model
+        )
+
+        # Progreso y estado del hilo de trabajo
+        self.status_var = StringVar()
+        self.progress = ttk.Progressbar(self.root, mode="indeterminate")
+        self.lab7 = ttk.Label(self.root, textvariable=self.status_var)
 
         # Layout absoluto
         self.lab1.place(x=110, y=65)
@@ -91,6 +178,10 @@ class App:
         self.button3.place(x=670, y=460)
         self.button4.place(x=520, y=460)
         self.button6.place(x=370, y=460)
+        self.button7.place(x=220, y=505)
+
+        self.progress.place(x=370, y=508, width=380, height=20)
+        self.lab7.place(x=65, y=508)
 
         self.text_img1.place(x=65, y=90, width=250, height=250)
         self.text_img2.place(x=500, y=90, width=250, height=250)
@@ -107,13 +198,29 @@ class App:
         # Estado inicial
         self.text1.focus_set()
         self.array = None
+        self.prediction: Prediction | None = None
+        self.study: Study | None = None
+        self.study_key: tuple[str, int] | None = None
+        self.studies = MemoryLRU(max_bytes=GUI_CACHE_MB * 1024 * 1024)
         self.reportID = 0
         self.button4["state"] = "disabled"
         self.button6["state"] = "disabled"
 
+        # Hilo de trabajo (un solo worker: TensorFlow ya paraleliza por dentro)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gui")
+        self.events: queue.Queue = queue.Queue()
+        self.job_id = 0
+        self.future: Future | None = None
+
         # Actualizar exportación al escribir cédula
         self.ID.trace_add("write", self._on_id_change)
 
+        # Precargar el modelo sin bloquear la ventana
+        self._set_busy(True, "Cargando modelo…")
+        self.executor.submit(self._preload_model)
+
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.root.after(POLL_MS, self._poll_events)
         self.root.mainloop()
 
     # -------- Helpers de estado --------
@@ -130,6 +237,95 @@ class App:
     def _on_id_change(self, *args) -> None:
         self._refresh_export_buttons()
 
+    def _set_busy(self, busy: bool, status: str = "") -> None:
+        """Muestra u oculta el indicador de progreso."""
+        self.status_var.set(status)
+        if busy:
+            self.progress.start(10)
+        else:
+            self.progress.stop()
+
+    def _on_close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
+
+    # -------- Hilo de trabajo --------
+    def _preload_model(self) -> None:
+        """(worker) Importa TensorFlow y deja el modelo listo para inferir."""
+        try:
+            from src.inference import warm_up
+
+            warm_up()
+        except Exception as exc:  # se informa en la UI
+            self.events.put(("model", exc))
+        else:
+            self.events.put(("model", None))
+
+    def _analyze(self, job_id: int, study: Study, key: tuple[str, int]) -> None:
+        """(worker) Predice (o reutiliza la predicción cacheada) de un estudio."""
+        from src.inference import predict
+        from src.model import model_info
+        from src.preprocess import preprocess
+
+        try:
+            # Reutilizar la predicción cacheada si el modelo no ha cambiado
+            model_sha256 = model_info().sha256
+            if study.prediction is None or study.model_sha256 != model_sha256:
+                if study.batch is None:
+                    study.batch = preprocess(study.array)
+                study.prediction = predict(study.array, batch=study.batch)
+                study.model_sha256 = model_sha256
+                self.studies.put(key, study)  # recalcula su tamaño
+        except Exception as exc:  # se informa en la UI
+            self.events.put(("prediction", job_id, exc))
+        else:
+            self.events.put(("prediction", job_id, study.prediction))
+
+    def _poll_events(self) -> None:
+        """(Tk) Procesa los eventos enviados por el hilo de trabajo."""
+        try:
+            while True:
+                event = self.events.get_nowait()
+                if event[0] == "model":
+                    self._on_model_loaded(event[1])
+                else:
+                    self._on_prediction(event[1], event[2])
+        except queue.Empty:
+            pass
+        self.root.after(POLL_MS, self._poll_events)
+
+    def _on_model_loaded(self, error: Exception | None) -> None:
+        if self.future is None:  # no hay un análisis en curso
+            self._set_busy(False, "Modelo listo." if error is None else "")
+        if error is not None:
+            showerror(title="Modelo", message=f"No se pudo cargar el modelo:\n{error}")
+
+    def _on_prediction(self, job_id: int, outcome: object) -> None:
+        if job_id != self.job_id:
+            return  # análisis cancelado o de un estudio anterior
+        self.future = None
+        self.button7["state"] = "disabled"
+        self.button1["state"] = "enabled" if self.array is not None else "disabled"
+        self._set_busy(False)
+
+        if isinstance(outcome, Exception):
+            showerror(title="Predicción", message=f"Error al predecir:\n{outcome}")
+            return
+        self._show_prediction(outcome)
+
+    def _load_study(self, filepath: str) -> tuple[tuple[str, int], Study]:
+        """Devuelve el estudio desde la caché (ruta + mtime) o lo lee de disco."""
+        path = Path(filepath).resolve()
+        key = (str(path), path.stat().st_mtime_ns)
+        study = self.studies.get(key)
+        if study is None:
+            from src.io_imgs import read_image_file
+
+            array, img2show = read_image_file(path)
+            study = Study(array=array, img2show=img2show)
+            self.studies.put(key, study)
+        return key, study
+
     # -------- Flujo UI --------
     def load_img_file(self) -> None:
         """Carga imagen desde disco y la muestra en la interfaz."""
@@ -146,15 +342,15 @@ class App:
         if not filepath:
             return
 
+        self.cancel_model()
         self.text_img2.delete("1.0", "end")
         self.result_var.set("")
         self.proba_var.set("")
+        self.prediction = None
 
-        ext = filepath.lower().split(".")[-1]
-        if ext == "dcm":
-            self.array, img2show = read_dicom_file(filepath)
-        else:
-            self.array, img2show = read_jpg_file(filepath)
+        self.study_key, self.study = self._load_study(filepath)
+        self.array = self.study.array
+        img2show = self.study.img2show
 
         try:
             img2show = img2show.resize((250, 250), Image.Resampling.LANCZOS)
@@ -177,9 +373,32 @@ class App:
         self.text_img2.delete("1.0", "end")
         self.result_var.set("")
         self.proba_var.set("")
+        self.prediction = None
 
-        label, proba, heatmap = predict(self.array)
+        # Lanzar el análisis en el hilo de trabajo
+        self.job_id += 1
+        self.button1["state"] = "disabled"
+        self.button7["state"] = "enabled"
+        self._set_busy(True, "Analizando…")
+        self.future = self.executor.submit(
+            self._analyze, self.job_id, self.study, self.study_key
+        )
 
+    def cancel_model(self) -> None:
+        """Cancela el análisis en curso (su resultado se descarta)."""
+        if self.future is None:
+            return
+        self.future.cancel()  # solo surte efecto si aún no empezó
+        self.future = None
+        self.job_id += 1
+        self.button7["state"] = "disabled"
+        self.button1["state"] = "enabled" if self.array is not None else "disabled"
+        self._set_busy(False, "Análisis cancelado.")
+
+    def _show_prediction(self, prediction: Prediction) -> None:
+        """Presenta etiqueta, probabilidad y heatmap en la interfaz."""
+        label, proba, heatmap = prediction
+        self.prediction = prediction
         img_heat = Image.fromarray(heatmap)
         try:
             img_heat = img_heat.resize((250, 250), Image.Resampling.LANCZOS)
@@ -194,29 +413,26 @@ class App:
         self._refresh_export_buttons()
 
     def save_results_csv(self) -> None:
-        """Guarda cédula, resultado y probabilidad en historial CSV."""
+        """Guarda cédula y predicción completa en el historial CSV.
+
+        Ver `append_history`: además de etiqueta y probabilidad van las
+        probabilidades de cada clase, el motor, el SHA-256 del modelo y el
+        tiempo de inferencia, para analizar el historial sin repetir la
+        predicción.
+        """
         if not self.ID.get().strip():
             showinfo(title="Guardar", message="Falta la cédula.")
             return
         if self.array is None:
             showinfo(title="Guardar", message="No se ha cargado una imagen.")
             return
-        if not self._has_prediction():
+        if not self._has_prediction() or self.prediction is None:
             showinfo(title="Guardar", message="No se ha realizado una predicción.")
             return
 
         csv_path = os.path.join(HIST_DIR, "historial.csv")
         os.makedirs(HIST_DIR, exist_ok=True)
-
-        with open(csv_path, "a", newline="") as csvfile:
-            writer = csv.writer(csvfile, delimiter="-")
-            writer.writerow(
-                [
-                    self.text1.get(),
-                    self.result_var.get().strip(),
-                    self.proba_var.get().strip(),
-                ]
-            )
+        append_history(csv_path, self.text1.get(), self.prediction)
 
         showinfo(
             title="Guardar", message=f"Datos guardados con éxito en\n{csv_path}"
@@ -244,6 +460,8 @@ class App:
                 break
             idx += 1
 
+        import tkcap  # import local: solo se necesita al exportar PDF
+
         cap = tkcap.CAP(self.root)
         img_name = os.path.join(REPORTS_DIR, f"Reporte{idx}.jpg")
         cap.capture(img_name)
@@ -268,12 +486,16 @@ class App:
         if not answer:
             return
 
+        self.cancel_model()
         self.text1.delete(0, "end")
         self.result_var.set("")
         self.proba_var.set("")
         self.text_img1.delete("1.0", "end")
         self.text_img2.delete("1.0", "end")
         self.array = None
+        self.prediction = None
+        self.study = None
+        self.study_key = None
         self.img1 = None
         self.img2 = None
         self.button1["state"] = "disabled"
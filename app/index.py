@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""CLI del índice de cabeceras DICOM (uso académico).
+
+Ejemplos:
+  # Indexar (o actualizar) un archivo de estudios
+  python -m app.index build estudios/ --db outputs/estudios.sqlite
+
+  # Elegir solo radiografías de tórax y procesarlas en modo lote
+  python -m app.index query --db outputs/estudios.sqlite \\
+      --modality CR DX --body-part CHEST --output torax.txt
+  python -m app.cli --manifest torax.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+DEFAULT_DB = "outputs/dicom_index.sqlite"
+
+
+def main() -> None:
+    """Punto de entrada del índice DICOM."""
+    parser = argparse.ArgumentParser(
+        description="Índice de cabeceras DICOM para filtrar sin leer píxeles.",
+    )
+    parser.add_argument("--db", default=DEFAULT_DB, help="Base SQLite del índice.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Indexa o actualiza una carpeta.")
+    build.add_argument("root", help="Carpeta con los DICOM (recursivo).")
+    build.add_argument(
+        "--glob", default="**/*.dcm", help="Patrón de archivos relativo a root."
+    )
+    build.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Procesos de lectura (por defecto, uno por CPU; 0 = sin pool).",
+    )
+
+    query = commands.add_parser("query", help="Lista las rutas que cumplen filtros.")
+    query.add_argument("--modality", nargs="+", help="p. ej. CR DX")
+    query.add_argument("--body-part", nargs="+", help="p. ej. CHEST")
+    query.add_argument("--view-position", nargs="+", help="p. ej. PA AP")
+    query.add_argument("--photometric", nargs="+", help="p. ej. MONOCHROME2")
+    query.add_argument("--min-rows", type=int, help="Alto mínimo (px).")
+    query.add_argument("--min-columns", type=int, help="Ancho mínimo (px).")
+    query.add_argument(
+        "--output",
+        help="Manifiesto de salida (una ruta por línea); por defecto stdout.",
+    )
+
+    # Se acepta --db antes o después del subcomando
+    for sub in (build, query):
+        sub.add_argument("--db", default=argparse.SUPPRESS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    from src.dicom_index import DicomIndex
+
+    with DicomIndex(args.db) as index:
+        if args.command == "build":
+            stats = index.update(args.root, pattern=args.glob, workers=args.workers)
+            print(
+                f"Archivos: {stats.scanned} (nuevos: {stats.added}, "
+                f"modificados: {stats.updated}, sin cambios: {stats.unchanged}, "
+                f"borrados: {stats.removed}, con error: {stats.failed})"
+            )
+            print(f"Índice:   {Path(args.db).resolve()} ({len(index)} entradas)")
+            return
+
+        paths = index.paths(
+            modalities=args.modality,
+            body_parts=args.body_part,
+            view_positions=args.view_position,
+            photometric=args.photometric,
+            min_rows=args.min_rows,
+            min_columns=args.min_columns,
+        )
+
+    lines = "".join(f"{p}\n" for p in paths)
+    if args.output:
+        Path(args.output).write_text(lines, encoding="utf-8")
+        print(f"{len(paths)} rutas en {args.output}", file=sys.stderr)
+    else:
+        sys.stdout.write(lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""CLI de cuantización del modelo con reporte de paridad (uso académico).
+
+Ejemplos:
+  # Tres variantes, calibración int8 con imágenes reales y reporte JSON
+  python -m app.quantize --calibration samples/ --eval validacion/ \\
+      --report outputs/quantize.json
+
+  # Solo float16, exigiendo como mucho 0.5 % de deriva
+  python -m app.quantize --modes float16 --eval validacion/ --max-drift 0.005
+
+  # Servir con la variante aceptada
+  UAO_BACKEND=tflite-int8 python -m app.serve
+
+Termina con código 1 si alguna variante no cumple los umbrales.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from src.config import DEFAULT_MODEL_PATH
+
+
+def main() -> None:
+    """Punto de entrada de la cuantización."""
+    from src.quantize import DEFAULT_MAX_DRIFT, DEFAULT_MIN_AGREEMENT, QUANT_MODES
+
+    parser = argparse.ArgumentParser(
+        description="Cuantiza el modelo (dynamic/int8/float16) y compara con float32.",
+    )
+    parser.add_argument(
+        "--model",
+        help=f"Modelo .h5 (por defecto MODEL_PATH o {DEFAULT_MODEL_PATH}).",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=QUANT_MODES,
+        default=list(QUANT_MODES),
+        help="Variantes a generar.",
+    )
+    parser.add_argument(
+        "--calibration",
+        help="Carpeta con imágenes de calibración (obligatoria para int8).",
+    )
+    parser.add_argument(
+        "--max-calibration",
+        type=int,
+        default=100,
+        help="Imágenes de calibración a usar.",
+    )
+    parser.add_argument(
+        "--eval",
+        help=(
+            "Carpeta con imágenes de evaluación (por defecto, las de "
+            "calibración; mejor un conjunto distinto)."
+        ),
+    )
+    parser.add_argument(
+        "--max-eval", type=int, default=200, help="Imágenes de evaluación a usar."
+    )
+    parser.add_argument(
+        "--out-dir", help="Carpeta de salida (por defecto, la del modelo)."
+    )
+    parser.add_argument(
+        "--min-agreement",
+        type=float,
+        default=DEFAULT_MIN_AGREEMENT,
+        help="Fracción mínima de imágenes con la misma clase que float32.",
+    )
+    parser.add_argument(
+        "--max-drift",
+        type=float,
+        default=DEFAULT_MAX_DRIFT,
+        help="Diferencia absoluta máxima admitida en las probabilidades.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="Mediciones de latencia."
+    )
+    parser.add_argument("--report", help="Guarda el reporte en JSON.")
+    args = parser.parse_args()
+
+    eval_dir = args.eval or args.calibration
+    if "int8" in args.modes and not args.calibration:
+        parser.error("int8 necesita --calibration.")
+    if not eval_dir:
+        parser.error("indica --eval (o --calibration) con imágenes de evaluación.")
+
+    from src.export import sample_batch
+    from src.quantize import (
+        format_report,
+        quantization_report,
+        quantize_model,
+        report_to_json,
+    )
+
+    try:
+        calibration = None
+        if args.calibration:
+            calibration = sample_batch(args.calibration, args.max_calibration)
+        batch = sample_batch(eval_dir, args.max_eval)
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from exc
+
+    paths = quantize_model(args.model, args.modes, calibration, args.out_dir)
+    rows = quantization_report(paths, batch, args.model, repeat=args.repeat)
+    print(format_report(rows, args.min_agreement, args.max_drift))
+
+    if args.report:
+        report = report_to_json(rows, args.min_agreement, args.max_drift)
+        out = Path(args.report)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nReporte: {out.resolve()}")
+
+    if not all(row.passes(args.min_agreement, args.max_drift) for row in rows[1:]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Servidor HTTP local de inferencia (uso académico).
+
+Mantiene el modelo cargado y agrupa peticiones concurrentes en
+micro-batches antes de llamar al modelo.
+
+Endpoints:
+  - `GET /health`: estado y datos del modelo cargado.
+  - `POST /predict`: el cuerpo es el archivo (DICOM/JPG/PNG) tal cual.
+    Parámetros de consulta opcionales:
+      * `heatmap=1` incluye el Grad-CAM como PNG en base64.
+      * `heatmap=auto` lo incluye solo si la clase no es normal o la
+        confianza queda bajo `--min-confidence`.
+      * `ext=.dcm` fuerza el formato (si no, se detecta DICOM por su
+        preámbulo y el resto se decodifica con OpenCV).
+    Sin `heatmap`, la petición solo clasifica (no se calcula Grad-CAM).
+    La respuesta es `Prediction.to_dict()` (etiqueta, probabilidades,
+    motor, SHA-256 del modelo y `timings.latency_ms`) más `heatmap_png`.
+
+Ejemplo:
+  python -m app.serve --port 8000
+  curl --data-binary @samples/bacteria.jpeg "http://127.0.0.1:8000/predict?heatmap=1"
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+from src.config import DEFAULT_BATCH_SIZE, DEFAULT_HEATMAP_MIN_CONFIDENCE
+
+# Valores por defecto del servidor.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+DEFAULT_MAX_WAIT_MS = 10.0
+DEFAULT_TIMEOUT_S = 60.0
+MAX_UPLOAD_MB = 256
+
+
+def _encode_png(rgb: Any) -> str:
+    """Codifica una imagen RGB uint8 como PNG en base64."""
+    import cv2
+
+    ok, png = cv2.imencode(".png", cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+    if not ok:
+        raise ValueError("No se pudo codificar el heatmap como PNG.")
+    return base64.b64encode(png.tobytes()).decode("ascii")
+
+
+def _heatmap_mode(value: str) -> str:
+    """Traduce el parámetro `heatmap` de la consulta a un modo de política."""
+    value = value.lower()
+    if value in {"1", "true", "yes"}:
+        return "always"
+    return "auto" if value == "auto" else "never"
+
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    """Atiende /health y /predict usando el `MicroBatcher` del servidor."""
+
+    server_version = "uao-neumonia"
+
+    def _send_json(self, status: HTTPStatus, payload: dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if urlparse(self.path).path != "/health":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Ruta no encontrada."})
+            return
+        from src.model import REGISTRY
+
+        self._send_json(HTTPStatus.OK, {"status": "ok", "models": REGISTRY.info()})
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        if url.path != "/predict":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Ruta no encontrada."})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self._send_json(
+                HTTPStatus.BAD_REQUEST, {"error": "Content-Length inválido."}
+            )
+            return
+        if length <= 0:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": "Cuerpo vacío."})
+            return
+        if length > MAX_UPLOAD_MB * 1024 * 1024:
+            self._send_json(
+                HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                {"error": f"El archivo supera {MAX_UPLOAD_MB} MB."},
+            )
+            return
+        data = self.rfile.read(length)
+        query = parse_qs(url.query)
+        mode = _heatmap_mode(query.get("heatmap", ["0"])[0])
+        ext = query.get("ext", [None])[0]
+
+        from src.inference import Prediction, _backend_tag
+        from src.io_imgs import read_image_bytes
+
+        start = time.perf_counter()
+        # Decodificar en el hilo de la petición (en paralelo entre peticiones)
+        try:
+            array, _img = read_image_bytes(data, ext)
+        except Exception as exc:  # cv2.error, errores de pydicom...
+            self._send_json(HTTPStatus.UNPROCESSABLE_ENTITY, {"error": str(exc)})
+            return
+
+        # Resolver junto con otras peticiones concurrentes
+        future = self.server.batcher_for(mode).submit(array)
+        try:
+            probs, heatmap = future.result(timeout=self.server.timeout_s)
+        except TimeoutError:
+            future.cancel()
+            self._send_json(
+                HTTPStatus.GATEWAY_TIMEOUT, {"error": "Tiempo de espera agotado."}
+            )
+            return
+        except ValueError as exc:
+            self._send_json(HTTPStatus.UNPROCESSABLE_ENTITY, {"error": str(exc)})
+            return
+        except Exception as exc:  # error del modelo
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(exc)})
+            return
+
+        # Mismo esquema que la CLI y `aio` (`Prediction.to_dict`, sin el
+        # array del heatmap, que va aparte como PNG)
+        timings = {"latency_ms": (time.perf_counter() - start) * 1000.0}
+        prediction = Prediction.from_probs(
+            probs, heatmap, timings=timings, **_backend_tag(heatmap)
+        )
+        payload = prediction.to_dict()
+        if heatmap is not None:
+            payload["heatmap_png"] = _encode_png(heatmap)
+        self._send_json(HTTPStatus.OK, payload)
+
+
+class InferenceServer(ThreadingHTTPServer):
+    """Servidor HTTP multihilo con un `MicroBatcher` compartido.
+
+    `batchers` asigna un batcher por modo de heatmap (`"always"`,
+    `"never"`, `"auto"`); los modos que falten usan `batcher`.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        batcher: Any,
+        timeout_s: float = DEFAULT_TIMEOUT_S,
+        batchers: dict[str, Any] | None = None,
+    ) -> None:
+        super().__init__(address, InferenceHandler)
+        self.batcher = batcher
+        self.batchers = dict(batchers or {})
+        self.timeout_s = timeout_s
+
+    def batcher_for(self, mode: str) -> Any:
+        """Batcher que atiende las peticiones con el modo de heatmap `mode`."""
+        return self.batchers.get(mode, self.batcher)
+
+
+def main() -> None:
+    """Punto de entrada del servidor."""
+    parser = argparse.ArgumentParser(
+        description="Servidor HTTP local de inferencia con micro-batching.",
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Interfaz de escucha.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Puerto.")
+    parser.add_argument(
+        "--max-batch",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Máximo de peticiones por llamada al modelo.",
+    )
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=DEFAULT_MAX_WAIT_MS,
+        help="Espera máxima para agrupar peticiones concurrentes (ms).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT_S,
+        help="Tiempo máximo de respuesta por petición (s).",
+    )
+    parser.add_argument(
+        "--min-confidence",
+        type=float,
+        default=DEFAULT_HEATMAP_MIN_CONFIDENCE,
+        help="Con heatmap=auto, confianza (%%) bajo la cual se calcula Grad-CAM.",
+    )
+    args = parser.parse_args()
+
+    from src import telemetry
+    from src.batching import MicroBatcher, explain_batch_fn
+    from src.inference import HEATMAP_POLICIES, HeatmapPolicy, warm_up
+
+    # Instrumentación opcional (UAO_TRACE_FILE, UAO_METRICS_FILE...)
+    telemetry.configure_from_env()
+
+    # Modelo cargado y grafo compilado antes de aceptar peticiones
+    warm_up()
+    # Un batcher por modo: una petición sin heatmap no paga el Grad-CAM
+    # de sus compañeras de batch
+    batchers = {
+        mode: MicroBatcher(
+            explain_batch_fn(HeatmapPolicy(mode, args.min_confidence)),
+            max_batch=args.max_batch,
+            max_wait_ms=args.max_wait_ms,
+        )
+        for mode in HEATMAP_POLICIES
+    }
+    server = InferenceServer(
+        (args.host, args.port),
+        batchers["never"],
+        timeout_s=args.timeout,
+        batchers=batchers,
+    )
+
+    print(f"Servidor escuchando en http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for batcher in batchers.values():
+            batcher.close()
+
+
+if __name__ == "__main__":
+    main()
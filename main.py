@@ -4,13 +4,43 @@
 
 Por defecto ejecuta la interfaz gráfica (GUI).
 Para la CLI, usar directamente: `python -m app.cli`.
+Con `--profile-startup` muestra el desglose de tiempos de importación
+(GUI + dependencias pesadas) y sale sin abrir la ventana.
 """
 
 from __future__ import annotations
 
-from app.gui import main as gui_main
+import argparse
+import time
 
+_T0 = time.perf_counter()
 
-if __name__ == "__main__":
-    raise SystemExit(gui_main())
+from app.gui import main as gui_main  # noqa: E402  (se mide su importación)
+
+# Módulos que la GUI importa al abrir la ventana y en segundo plano.
+GUI_STARTUP_MODULES: tuple[str, ...] = ("tkinter", "PIL.ImageTk", "tkcap")
+
+
+def main() -> int:
+    """Lanza la GUI o, con `--profile-startup`, el perfil de arranque."""
+    parser = argparse.ArgumentParser(description="GUI de detección de neumonía.")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Muestra el tiempo de importación de cada dependencia y sale.",
+    )
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        from src.startup import STARTUP_MODULES, format_import_profile, profile_imports
 
+        elapsed = time.perf_counter() - _T0
+        timings = profile_imports(GUI_STARTUP_MODULES + STARTUP_MODULES)
+        print(format_import_profile(timings, elapsed_before=elapsed))
+        return 0
+
+    return gui_main()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
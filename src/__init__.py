@@ -1,26 +1,56 @@
 """Paquete src: núcleo de la herramienta de detección de neumonía.
 
 Incluye:
-- io_imgs: lectura de imágenes DICOM/JPG/PNG
+- io_imgs: lectura de imágenes DICOM/JPG/PNG/TIFF (también multi-frame)
 - preprocess: funciones de preprocesamiento
 - model: construcción del modelo de clasificación
 - explain: Grad-CAM para interpretabilidad
 - inference: predicción con etiquetas y probabilidades
+- aio: predicción awaitable para servicios asyncio
+
+Las re-exportaciones son perezosas (PEP 562): `import src` no carga
+TensorFlow, OpenCV ni pydicom; cada submódulo se importa al acceder por
+primera vez a uno de sus nombres. `preprocess` (que difiere OpenCV hasta
+su primer uso) se importa de inmediato para que `src.preprocess` siga
+siendo la función y no el submódulo homónimo.
 """
 
-from .io_imgs import read_dicom_file, read_jpg_file
-from .preprocess import preprocess
-from .model import model_fun
-from .explain import grad_cam
-from .inference import LABELS, predict
-
-__all__ = [
-    "read_dicom_file",
-    "read_jpg_file",
-    "preprocess",
-    "model_fun",
-    "grad_cam",
-    "predict",
-    "LABELS",
-]
+from __future__ import annotations
+
+import importlib
+from typing import Any
+
+from .preprocess import Preprocessor, preprocess, preprocess_batch
+
+# Nombre público (perezoso) → submódulo que lo define.
+_EXPORTS: dict[str, str] = {
+    "read_dicom_file": "io_imgs",
+    "read_jpg_file": "io_imgs",
+    "iter_frames": "io_imgs",
+    "model_fun": "model",
+    "grad_cam": "explain",
+    "predict": "inference",
+    "predict_batch": "inference",
+    "predict_study": "inference",
+    "classify_batch": "inference",
+    "HeatmapPolicy": "inference",
+    "Prediction": "inference",
+    "predict_async": "aio",
+    "predict_stream": "aio",
+    "LABELS": "inference",
+}
+
+__all__ = ["Preprocessor", "preprocess", "preprocess_batch", *_EXPORTS]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value  # siguientes accesos sin pasar por aquí
+    return value
+
 
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
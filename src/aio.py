@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""API asyncio para integrar la inferencia en servicios asíncronos.
+
+`inference.predict` bloquea el hilo que la llama durante la lectura, el
+preprocesamiento y el modelo; dentro de un bucle de eventos eso congela
+todas las demás corrutinas. Esta fachada delega el trabajo en ejecutores
+acotados y solo espera sus resultados:
+
+- La lectura/decodificación va a un `ThreadPoolExecutor` propio.
+- Preprocesamiento, modelo y Grad-CAM van al `MicroBatcher`, que agrupa
+  en un mismo batch las peticiones concurrentes de todas las corrutinas.
+- Un semáforo por bucle limita las peticiones en vuelo (`max_pending`):
+  las que sobran esperan su turno en lugar de acumular imágenes.
+
+Cada llamada admite `timeout`; cancelar la corrutina (o agotar el tiempo)
+retira la imagen del batcher si el modelo todavía no la ha tomado.
+
+Ejemplo:
+    label, proba, heatmap = await predict_async("estudio.dcm", timeout=5)
+
+    async for result in predict_stream(paths):
+        print(result.path, result.label, result.error)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, Iterable, Union
+
+import numpy as np
+
+from .batching import DEFAULT_MAX_WAIT_MS, BatchFn, MicroBatcher, explain_batch_fn
+from .config import DEFAULT_BATCH_SIZE
+
+if TYPE_CHECKING:
+    from .inference import HeatmapArg, Prediction
+    from .pipeline import PipelineResult
+
+# Peticiones en vuelo por bucle de eventos (y ventana de `stream`).
+DEFAULT_MAX_PENDING = 64
+
+# Hilos de lectura/decodificación.
+DEFAULT_DECODE_WORKERS = 4
+
+# Ruta de una imagen o su contenido en memoria.
+Source = Union[str, "os.PathLike[str]", bytes]
+
+
+def _decode(source: Source) -> np.ndarray:
+    from .io_imgs import read_image_bytes, read_image_file
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return read_image_bytes(bytes(source))[0]
+    return read_image_file(source)[0]
+
+
+class AsyncPredictor:
+    """Predicciones awaitables sobre un `MicroBatcher` compartido.
+
+    Args:
+        batch_fn: Función de batch del `MicroBatcher` (por defecto,
+            `inference.explain_batch`: probabilidades + Grad-CAM).
+        heatmap: Política de Grad-CAM de la función por defecto
+            (`"always"`, `"never"`, `"auto"` o `inference.HeatmapPolicy`);
+            sin heatmap, los resultados lo llevan en `None`.
+        max_batch: Tamaño máximo de cada micro-batch.
+        max_wait_ms: Espera máxima por compañeros de batch.
+        decode_workers: Hilos de lectura/decodificación.
+        max_pending: Peticiones en vuelo por bucle de eventos.
+    """
+
+    def __init__(
+        self,
+        batch_fn: BatchFn | None = None,
+        *,
+        max_batch: int = DEFAULT_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        decode_workers: int = DEFAULT_DECODE_WORKERS,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        heatmap: HeatmapArg = True,
+    ) -> None:
+        if max_pending < 1:
+            raise ValueError("max_pending debe ser >= 1.")
+        self._batcher = MicroBatcher(
+            batch_fn or explain_batch_fn(heatmap),
+            max_batch=max_batch,
+            max_wait_ms=max_wait_ms,
+        )
+        self._executor = ThreadPoolExecutor(
+            decode_workers, thread_name_prefix="uao-decode"
+        )
+        self.max_pending = max_pending
+        # asyncio.Semaphore queda ligado a un bucle: uno por bucle
+        self._limits: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Semaphore
+        ] = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _limit(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            limit = self._limits.get(loop)
+            if limit is None:
+                limit = self._limits[loop] = asyncio.Semaphore(self.max_pending)
+        return limit
+
+    async def explain(
+        self, source: Source, *, timeout: float | None = None
+    ) -> tuple[np.ndarray, np.ndarray | None]:
+        """Probabilidades por clase y heatmap (o `None`) de una imagen.
+
+        Raises:
+            asyncio.TimeoutError: Si no termina en `timeout` segundos.
+            ValueError: Si la imagen no es legible o procesable.
+        """
+        return await asyncio.wait_for(self._explain(source), timeout)
+
+    async def _explain(self, source: Source) -> tuple[np.ndarray, np.ndarray | None]:
+        async with self._limit():
+            loop = asyncio.get_running_loop()
+            array = await loop.run_in_executor(self._executor, _decode, source)
+            return await asyncio.wrap_future(self._batcher.submit(array))
+
+    async def predict(
+        self, source: Source, *, timeout: float | None = None
+    ) -> Prediction:
+        """Como `inference.predict`, sin bloquear el bucle de eventos.
+
+        Args:
+            source: Ruta de la imagen o sus bytes (DICOM/JPG/PNG).
+            timeout: Segundos máximos de espera (lectura incluida).
+
+        Returns:
+            `Prediction` (se desempaqueta como `(label, proba, heatmap)`).
+
+        Raises:
+            asyncio.TimeoutError: Si no termina en `timeout` segundos.
+            ValueError: Si la imagen no es legible o procesable.
+        """
+        from .inference import Prediction, _backend_tag
+
+        start = time.perf_counter()
+        probs, heatmap = await self.explain(source, timeout=timeout)
+        # Latencia completa: lectura, espera en el batcher y modelo
+        timings = {"latency_ms": (time.perf_counter() - start) * 1000.0}
+        tag = _backend_tag(heatmap)
+        return Prediction.from_probs(probs, heatmap, timings=timings, **tag)
+
+    async def stream(
+        self,
+        paths: Iterable[str | os.PathLike[str]],
+        *,
+        timeout: float | None = None,
+    ) -> AsyncIterator[PipelineResult]:
+        """Predice `paths` concurrentemente y entrega los resultados en orden.
+
+        Mantiene como mucho `max_pending` imágenes en vuelo; `paths` se
+        consume a medida que el consumidor avanza. Los errores (lectura,
+        imagen inválida, tiempo agotado) se entregan como resultados con
+        `error`, sin cortar el stream.
+        """
+        window: deque[tuple[int, Path, asyncio.Task]] = deque()
+        try:
+            for index, raw in enumerate(paths):
+                path = Path(raw)
+                task = asyncio.ensure_future(self.explain(path, timeout=timeout))
+                window.append((index, path, task))
+                if len(window) >= self.max_pending:
+                    yield await _stream_result(*window.popleft())
+            while window:
+                yield await _stream_result(*window.popleft())
+        finally:
+            for _index, _path, task in window:
+                task.cancel()
+
+    def close(self) -> None:
+        """Termina lo pendiente y libera los hilos."""
+        self._batcher.close()
+        self._executor.shutdown()
+
+    def __enter__(self) -> AsyncPredictor:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+async def _stream_result(
+    index: int, path: Path, task: asyncio.Task
+) -> PipelineResult:
+    from .inference import summarize
+    from .pipeline import PipelineResult
+
+    try:
+        probs, heatmap = await task
+    except asyncio.TimeoutError:
+        return PipelineResult(index, path, error="Tiempo de espera agotado.")
+    except Exception as exc:  # lectores y modelo lanzan tipos diversos
+        return PipelineResult(index, path, error=str(exc))
+    label, proba = summarize(probs)
+    return PipelineResult(index, path, label, proba, heatmap, probs=probs)
+
+
+_DEFAULT: AsyncPredictor | None = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_predictor() -> AsyncPredictor:
+    """`AsyncPredictor` compartido por `predict_async` y `predict_stream`."""
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None:
+            _DEFAULT = AsyncPredictor()
+        return _DEFAULT
+
+
+async def predict_async(
+    source: Source, *, timeout: float | None = None
+) -> Prediction:
+    """`await`-able equivalente de `inference.predict` para una ruta o bytes."""
+    return await default_predictor().predict(source, timeout=timeout)
+
+
+def predict_stream(
+    paths: Iterable[str | os.PathLike[str]], *, timeout: float | None = None
+) -> AsyncIterator[PipelineResult]:
+    """`async for` sobre los resultados de `paths`, en orden de entrada."""
+    return default_predictor().stream(paths, timeout=timeout)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Motores de inferencia intercambiables para la clasificación.
+
+La clasificación (sin Grad-CAM) puede ejecutarse con:
+  - `keras`: el modelo `.h5` con TensorFlow (paso compilado con
+    `tf.function`, sin la sobrecarga de `model.predict`).
+  - `tflite`: intérprete de TensorFlow Lite con XNNPACK (delegado por
+    defecto en CPU). Usa `ai_edge_litert` si está instalado y, si no,
+    `tf.lite`.
+  - `onnx`: ONNX Runtime en CPU (`pip install onnxruntime`).
+  - `tflite-dynamic`, `tflite-int8`, `tflite-float16`: variantes
+    cuantizadas de TFLite (ver `quantize`).
+
+El motor se elige con el argumento `name`, la variable de entorno
+`UAO_BACKEND` o `DEFAULT_BACKEND`. Los archivos `.tflite`/`.onnx` se
+buscan junto al `.h5` (mismo nombre) y se generan con `python -m
+app.export`. Como el `.h5`, se cargan una sola vez por proceso y se
+recargan si cambian en disco.
+
+El Grad-CAM necesita gradientes y siempre usa Keras (ver `explain`).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Protocol
+
+import numpy as np
+
+from .config import DEFAULT_BACKEND
+from .model import REGISTRY, ModelRegistry, _load_keras_model, resolve_model_path
+
+if TYPE_CHECKING:
+    from tensorflow.keras.models import Model
+
+# Motores disponibles y extensión del archivo que usa cada uno (las
+# variantes cuantizadas de TFLite se generan con `python -m app.quantize`).
+BACKEND_SUFFIXES: dict[str, str] = {
+    "keras": ".h5",
+    "tflite": ".tflite",
+    "onnx": ".onnx",
+    "tflite-dynamic": ".dynamic.tflite",
+    "tflite-int8": ".int8.tflite",
+    "tflite-float16": ".float16.tflite",
+}
+BACKENDS: tuple[str, ...] = tuple(BACKEND_SUFFIXES)
+
+
+class InferenceBackend(Protocol):
+    """Motor que calcula las probabilidades de un batch preprocesado."""
+
+    name: str
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        """Probabilidades (N, n_clases) de un batch (N, H, W, 1) float32."""
+        ...
+
+
+class KerasBackend:
+    """Modelo Keras con la pasada hacia delante compilada (`tf.function`).
+
+    Args:
+        model: Modelo Keras de clasificación.
+    """
+
+    name = "keras"
+
+    def __init__(self, model: Model) -> None:
+        import tensorflow as tf
+
+        self.model = model
+        spec = tf.TensorSpec((None, *model.input_shape[1:]), tf.float32)
+        self._step = tf.function(
+            lambda batch: model(batch, training=False), input_signature=[spec]
+        )
+
+    @property
+    def weights(self) -> list[Any]:
+        return self.model.weights
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return self._step(np.asarray(batch, dtype=np.float32)).numpy()
+
+
+def _tflite_interpreter() -> type:
+    """Clase `Interpreter` de LiteRT, o la de `tf.lite` si no está."""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        import warnings
+
+        import tensorflow as tf
+
+        warnings.filterwarnings(
+            "ignore", ".*tf.lite.Interpreter is deprecated", UserWarning
+        )
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteBackend:
+    """Intérprete TFLite (XNNPACK) con entrada redimensionada por batch.
+
+    El intérprete no admite llamadas concurrentes: se serializan con un
+    lock. Para paralelismo real, un intérprete por hilo o proceso.
+
+    Args:
+        path: Archivo `.tflite`.
+        num_threads: Hilos del intérprete (por defecto, los de la librería).
+    """
+
+    name = "tflite"
+
+    def __init__(self, path: str | os.PathLike[str], num_threads: int | None = None):
+        self.path = Path(path)
+        self._interpreter = _tflite_interpreter()(
+            model_path=str(self.path), num_threads=num_threads
+        )
+        self._input = self._interpreter.get_input_details()[0]["index"]
+        self._output = self._interpreter.get_output_details()[0]["index"]
+        self._shape: tuple[int, ...] | None = None
+        self._lock = threading.Lock()
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        with self._lock:
+            if batch.shape != self._shape:  # reservar solo si cambia el batch
+                self._interpreter.resize_tensor_input(self._input, batch.shape)
+                self._interpreter.allocate_tensors()
+                self._shape = batch.shape
+            self._interpreter.set_tensor(self._input, batch)
+            self._interpreter.invoke()
+            return self._interpreter.get_tensor(self._output)
+
+
+class OnnxBackend:
+    """Sesión de ONNX Runtime en CPU (admite llamadas concurrentes).
+
+    Args:
+        path: Archivo `.onnx`.
+        num_threads: Hilos intra-operación (por defecto, los de la librería).
+    """
+
+    name = "onnx"
+
+    def __init__(self, path: str | os.PathLike[str], num_threads: int | None = None):
+        import onnxruntime as ort
+
+        self.path = Path(path)
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self._session = ort.InferenceSession(
+            str(self.path), options, providers=["CPUExecutionProvider"]
+        )
+        self._input = self._session.get_inputs()[0].name
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.asarray(batch, dtype=np.float32)
+        return self._session.run(None, {self._input: batch})[0]
+
+
+def load_backend(path: Path) -> InferenceBackend:
+    """Carga el motor que corresponde a la extensión de `path`.
+
+    Raises:
+        ValueError: Si la extensión no corresponde a ningún motor.
+        ImportError: Si falta la librería del motor (p. ej. onnxruntime).
+    """
+    suffix = path.suffix.lower()
+    if suffix == ".tflite":
+        return TFLiteBackend(path)
+    if suffix == ".onnx":
+        return OnnxBackend(path)
+    if suffix in {".h5", ".keras"}:
+        return KerasBackend(_load_keras_model(path))
+    raise ValueError(f"Formato de modelo no soportado: {path.name}")
+
+
+# Motores TFLite/ONNX cargados (por ruta, como los `.h5` en `REGISTRY`).
+BACKEND_REGISTRY = ModelRegistry(loader=load_backend)
+
+
+def backend_name(name: str | None = None) -> str:
+    """Motor a usar: `name`, `UAO_BACKEND` o `DEFAULT_BACKEND`.
+
+    Raises:
+        ValueError: Si el motor no existe.
+    """
+    resolved = (name or os.getenv("UAO_BACKEND") or DEFAULT_BACKEND).lower()
+    if resolved not in BACKEND_SUFFIXES:
+        raise ValueError(
+            f"Motor de inferencia desconocido: {resolved} "
+            f"(opciones: {', '.join(BACKENDS)})"
+        )
+    return resolved
+
+
+def backend_path(
+    name: str, model_path: str | os.PathLike[str] | None = None
+) -> Path:
+    """Archivo del motor `name` junto al modelo `.h5` (mismo nombre)."""
+    path = resolve_model_path(model_path)
+    return path if name == "keras" else path.with_suffix(BACKEND_SUFFIXES[name])
+
+
+def get_backend(
+    name: str | None = None, model_path: str | os.PathLike[str] | None = None
+) -> InferenceBackend:
+    """Devuelve el motor de inferencia, cargándolo la primera vez.
+
+    Args:
+        name: `keras`, `tflite`, `onnx` o una variante cuantizada
+            (`tflite-int8`...); por defecto, `backend_name()`.
+        model_path: Modelo `.h5` de referencia (por defecto, `MODEL_PATH`).
+
+    Raises:
+        ValueError: Si el motor no existe.
+        FileNotFoundError: Si falta el archivo exportado del motor.
+        ImportError: Si falta la librería del motor.
+    """
+    name = backend_name(name)
+    if name == "keras":
+        # En la entrada del registro: se descarta con el modelo al recargarlo
+        entry = REGISTRY.entry(model_path)
+        backend = entry.derived.get("keras_backend")
+        if backend is None:
+            backend = entry.derived["keras_backend"] = KerasBackend(entry.model)
+        return backend
+
+    path = backend_path(name, model_path)
+    if not path.exists():
+        raise FileNotFoundError(
+            f"No existe {path}: genera el modelo {name} con `python -m app.export`."
+        )
+    return BACKEND_REGISTRY.get(path)
+
+
+def backend_sha256(
+    name: str | None = None, model_path: str | os.PathLike[str] | None = None
+) -> str | None:
+    """SHA-256 del archivo del motor `name` si ya está cargado (sin cargarlo).
+
+    Para `keras` es el del `.h5`; para el resto, el del archivo exportado.
+    """
+    name = backend_name(name)
+    registry = REGISTRY if name == "keras" else BACKEND_REGISTRY
+    entry = registry.loaded(backend_path(name, model_path))
+    return entry.sha256 if entry is not None else None
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Agrupación dinámica de peticiones concurrentes en micro-batches.
+
+Varios hilos llaman a `MicroBatcher.submit(array)` y reciben un `Future`.
+Un hilo de fondo reúne las peticiones que llegan dentro de una ventana
+de espera (`max_wait_ms`) o hasta `max_batch` y ejecuta el modelo una
+sola vez para todas, de modo que el rendimiento crece con la
+concurrencia en lugar de hacer una llamada al modelo por petición.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Callable, Sequence
+
+import numpy as np
+
+from .config import DEFAULT_BATCH_SIZE
+
+if TYPE_CHECKING:
+    from .inference import HeatmapArg
+
+# Espera máxima (ms) por compañeros de batch antes de lanzar el modelo.
+DEFAULT_MAX_WAIT_MS = 10.0
+
+# Función de batch: imágenes → un resultado por imagen (mismo orden).
+BatchFn = Callable[[Sequence[np.ndarray]], Sequence[object]]
+
+
+def _default_batch_fn(arrays: Sequence[np.ndarray]) -> Sequence[object]:
+    from .inference import explain_batch
+
+    return explain_batch(arrays, batch_size=len(arrays))
+
+
+def explain_batch_fn(heatmap: HeatmapArg = True) -> BatchFn:
+    """Función de batch de `explain_batch` con una política de Grad-CAM fija.
+
+    Con `heatmap="never"` (o `False`) el batcher solo clasifica y cada
+    resultado lleva el heatmap en `None`; ver `inference.heatmap_policy`.
+    """
+    from .inference import explain_batch, heatmap_policy
+
+    policy = heatmap_policy(heatmap)
+    if policy.mode == "always":
+        return _default_batch_fn
+
+    def batch_fn(arrays: Sequence[np.ndarray]) -> Sequence[object]:
+        return explain_batch(arrays, batch_size=len(arrays), heatmap=policy)
+
+    return batch_fn
+
+
+class MicroBatcher:
+    """Agrupa peticiones concurrentes y las resuelve por batches.
+
+    Args:
+        batch_fn: Función que procesa una lista de imágenes y devuelve un
+            resultado por imagen. Por defecto `inference.explain_batch`
+            (probabilidades + Grad-CAM).
+        max_batch: Tamaño máximo de cada micro-batch.
+        max_wait_ms: Tiempo máximo que la primera petición espera a otras.
+    """
+
+    def __init__(
+        self,
+        batch_fn: BatchFn = _default_batch_fn,
+        max_batch: int = DEFAULT_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+    ) -> None:
+        if max_batch < 1:
+            raise ValueError("max_batch debe ser >= 1.")
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="micro-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, array: np.ndarray) -> Future:
+        """Encola una imagen; el `Future` recibe su resultado o excepción."""
+        if self._closed:
+            raise RuntimeError("El MicroBatcher está cerrado.")
+        future: Future = Future()
+        self._queue.put((array, future))
+        return future
+
+    def close(self) -> None:
+        """Procesa lo pendiente y detiene el hilo de fondo."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+    def _collect(self, first: tuple[np.ndarray, Future]) -> list:
+        """Reúne peticiones hasta llenar el batch o agotar la ventana."""
+        items = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:  # cierre: procesar lo reunido y terminar
+                self._queue.put(None)
+                break
+            items.append(item)
+        return items
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            # Descartar peticiones canceladas antes de gastar cómputo
+            items = [
+                (array, future)
+                for array, future in self._collect(first)
+                if future.set_running_or_notify_cancel()
+            ]
+            if not items:
+                continue
+            try:
+                results = self.batch_fn([array for array, _f in items])
+            except ValueError:
+                # Una imagen inválida no debe tumbar a las demás
+                for array, future in items:
+                    self._resolve_one(array, future)
+                continue
+            except Exception as exc:  # error del modelo: afecta a todo el batch
+                for _array, future in items:
+                    future.set_exception(exc)
+                continue
+            for (_array, future), result in zip(items, results):
+                future.set_result(result)
+
+    def _resolve_one(self, array: np.ndarray, future: Future) -> None:
+        try:
+            [result] = self.batch_fn([array])
+        except Exception as exc:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
@@ -0,0 +1,643 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmarks del pipeline completo y de cada etapa.
+
+Mide por separado `read_dicom_file`, `decode_dicom` (cada decodificador
+instalado por transfer syntax), `read_jpg_file`, `read_model_gray` (ruta
+rápida), `preprocess`, `model_fun`, `predict`, `classify` (solo
+probabilidades con cada motor: Keras, TFLite, ONNX) y `grad_cam` con
+varios tamaños de imagen y de batch. Por defecto usa un modelo Keras sintético
+con la misma entrada que el real (512x512x1 → 3 clases), de modo que no
+hacen falta los pesos entrenados.
+
+Cada medición reporta latencia p50/p95, rendimiento (imágenes/s) y RSS
+pico del proceso; el resultado se guarda en JSON y puede compararse con
+una línea base para detectar regresiones (ver `compare_results`).
+"""
+
+from __future__ import annotations
+
+import os
+import platform
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+import numpy as np
+
+# Formato del JSON de resultados (subir si cambia su estructura).
+BENCH_FORMAT = 1
+
+STAGES: tuple[str, ...] = (
+    "read_dicom_file",
+    "decode_dicom",
+    "read_jpg_file",
+    "read_model_gray",
+    "preprocess",
+    "model_fun",
+    "predict",
+    "classify",
+    "grad_cam",
+)
+DEFAULT_SIZES: tuple[int, ...] = (512, 1024, 2048)
+DEFAULT_BATCH_SIZES: tuple[int, ...] = (1, 8, 16)
+DEFAULT_REPEAT = 10
+DEFAULT_WARMUP = 2
+# Aumento relativo de p50 a partir del cual se considera regresión.
+DEFAULT_TOLERANCE = 0.20
+
+
+@dataclass
+class BenchResult:
+    """Resultado de una medición (una etapa con unos parámetros)."""
+
+    stage: str
+    params: dict[str, Any]
+    repeat: int
+    p50_ms: float
+    p95_ms: float
+    mean_ms: float
+    images_per_sec: float
+    peak_rss_mb: float | None = None
+    extra: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        """Identificador estable para comparar con la línea base."""
+        params = ",".join(f"{k}={v}" for k, v in sorted(self.params.items()))
+        return f"{self.stage}[{params}]"
+
+
+def peak_rss_mb() -> float | None:
+    """RSS pico del proceso en MB (None si la plataforma no lo expone)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB; macOS, bytes.
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def measure(
+    stage: str,
+    fn: Callable[[], Any],
+    *,
+    params: dict[str, Any] | None = None,
+    items: int = 1,
+    repeat: int = DEFAULT_REPEAT,
+    warmup: int = DEFAULT_WARMUP,
+    setup: Callable[[], Any] | None = None,
+) -> BenchResult:
+    """Ejecuta `fn` varias veces y resume sus latencias.
+
+    Args:
+        stage: Nombre de la etapa medida.
+        fn: Llamada a medir (sin argumentos).
+        params: Parámetros de la medición (tamaño, batch...).
+        items: Imágenes procesadas por llamada (para imágenes/s).
+        repeat: Ejecuciones medidas.
+        warmup: Ejecuciones previas descartadas.
+        setup: Llamada fuera de la medición antes de cada ejecución
+            (p. ej. vaciar una caché para medir en frío).
+
+    Raises:
+        ValueError: Si `repeat` no es positivo.
+    """
+    if repeat < 1:
+        raise ValueError("repeat debe ser >= 1.")
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        fn()
+
+    samples = np.empty(repeat, dtype=np.float64)
+    for i in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - start
+
+    total = float(samples.sum())
+    return BenchResult(
+        stage=stage,
+        params=dict(params or {}),
+        repeat=repeat,
+        p50_ms=float(np.percentile(samples, 50)) * 1000.0,
+        p95_ms=float(np.percentile(samples, 95)) * 1000.0,
+        mean_ms=float(samples.mean()) * 1000.0,
+        images_per_sec=(items * repeat / total) if total > 0 else float("inf"),
+        peak_rss_mb=peak_rss_mb(),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Datos y modelo sintéticos
+# ---------------------------------------------------------------------------
+
+
+def synthetic_image(size: int, seed: int = 0) -> np.ndarray:
+    """Radiografía sintética en gris (size, size) uint16 de 12 bits."""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:size, 0:size].astype(np.float32) / max(size - 1, 1)
+    base = 2000.0 + 1500.0 * np.sin(np.pi * xx) * np.sin(np.pi * yy)
+    noise = rng.normal(0.0, 60.0, (size, size))
+    return np.clip(base + noise, 0, 4095).astype(np.uint16)
+
+
+# Transfer syntaxes que `write_synthetic_dicom` sabe generar.
+SYNTHETIC_SYNTAXES: tuple[str, ...] = ("native", "rle", "jpeg", "jpeg2000")
+
+
+def write_synthetic_dicom(
+    path: str | Path, pixels: np.ndarray, syntax: str = "native"
+) -> Path:
+    """Guarda `pixels` (uint16 de 12 bits) como DICOM MONOCHROME2.
+
+    Args:
+        path: Archivo de salida.
+        pixels: Imagen en gris uint16 (H, W) o volumen (frames, H, W), que
+            se guarda como DICOM multi-frame.
+        syntax: `native` (sin comprimir), `rle` (RLE Lossless, codificador
+            de pydicom), `jpeg` (JPEG baseline; la imagen se reduce a 8
+            bits) o `jpeg2000` (JPEG 2000 sin pérdida). JPEG y JPEG 2000 se
+            codifican con OpenCV.
+
+    Raises:
+        ValueError: Si `syntax` no está en `SYNTHETIC_SYNTAXES`.
+    """
+    from pydicom.dataset import Dataset, FileMetaDataset
+    from pydicom.encaps import encapsulate
+    from pydicom.uid import (
+        ExplicitVRLittleEndian,
+        JPEG2000Lossless,
+        JPEGBaseline8Bit,
+        RLELossless,
+        SecondaryCaptureImageStorage,
+        generate_uid,
+    )
+
+    if syntax not in SYNTHETIC_SYNTAXES:
+        raise ValueError(f"Transfer syntax sintética desconocida: {syntax}")
+
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = SecondaryCaptureImageStorage
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+    ds = Dataset()
+    ds.file_meta = meta
+    ds.SOPClassUID = meta.MediaStorageSOPClassUID
+    ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+    ds.Modality = "CR"
+    ds.Rows, ds.Columns = pixels.shape[-2:]
+    if pixels.ndim == 3:
+        ds.NumberOfFrames = pixels.shape[0]
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = "MONOCHROME2"
+    ds.BitsAllocated = 16
+    ds.BitsStored = 12
+    ds.HighBit = 11
+    ds.PixelRepresentation = 0
+    pixels = np.ascontiguousarray(pixels, dtype=np.uint16)
+    ds.PixelData = pixels.tobytes()
+
+    if syntax == "rle":
+        ds.compress(RLELossless, encoding_plugin="pydicom")
+    elif syntax in {"jpeg", "jpeg2000"}:
+        import cv2
+
+        if syntax == "jpeg":
+            pixels = (pixels >> 4).astype(np.uint8)
+            ds.BitsAllocated, ds.BitsStored, ds.HighBit = 8, 8, 7
+            ext, params = ".jpg", []
+        else:  # 1000 = sin pérdida
+            ext, params = ".jp2", [cv2.IMWRITE_JPEG2000_COMPRESSION_X1000, 1000]
+        frames = []
+        for frame in pixels.reshape(-1, *pixels.shape[-2:]):
+            ok, encoded = cv2.imencode(ext, frame, params)
+            if not ok:
+                raise ValueError(f"OpenCV no pudo codificar {syntax}.")
+            frames.append(encoded.tobytes())
+        meta.TransferSyntaxUID = (
+            JPEGBaseline8Bit if syntax == "jpeg" else JPEG2000Lossless
+        )
+        ds.PixelData = encapsulate(frames)
+        ds["PixelData"].VR = "OB"
+
+    path = Path(path)
+    ds.save_as(path, enforce_file_format=True)
+    return path
+
+
+def build_synthetic_model(
+    input_shape: tuple[int, int, int] = (512, 512, 1), n_classes: int = 3
+) -> Any:
+    """Modelo Keras pequeño con la misma entrada/salida que el real."""
+    import tensorflow as tf
+
+    inputs = tf.keras.Input(input_shape)
+    x = tf.keras.layers.Conv2D(16, 3, strides=2, activation="relu")(inputs)
+    x = tf.keras.layers.Conv2D(32, 3, strides=2, activation="relu")(x)
+    x = tf.keras.layers.Conv2D(64, 3, strides=2, activation="relu")(x)
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    outputs = tf.keras.layers.Dense(n_classes, activation="softmax")(x)
+    return tf.keras.Model(inputs, outputs)
+
+
+@contextmanager
+def _model_path(path: Path) -> Iterator[None]:
+    """Fija `MODEL_PATH` durante el bloque y lo restaura al salir."""
+    previous = os.environ.get("MODEL_PATH")
+    os.environ["MODEL_PATH"] = str(path)
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop("MODEL_PATH", None)
+        else:
+            os.environ["MODEL_PATH"] = previous
+
+
+# ---------------------------------------------------------------------------
+# Suite
+# ---------------------------------------------------------------------------
+
+
+def run_suite(
+    *,
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    batch_sizes: Sequence[int] = DEFAULT_BATCH_SIZES,
+    stages: Iterable[str] = STAGES,
+    repeat: int = DEFAULT_REPEAT,
+    warmup: int = DEFAULT_WARMUP,
+    model_path: str | Path | None = None,
+    workdir: str | Path | None = None,
+    progress: Callable[[BenchResult], None] | None = None,
+) -> list[BenchResult]:
+    """Ejecuta los benchmarks seleccionados.
+
+    Args:
+        sizes: Lados (px) de las imágenes de entrada sintéticas.
+        batch_sizes: Tamaños de batch para `predict`.
+        stages: Subconjunto de `STAGES` a medir.
+        repeat: Ejecuciones medidas por combinación.
+        warmup: Ejecuciones previas descartadas.
+        model_path: Modelo `.h5` a usar; si falta, se genera uno sintético.
+        workdir: Carpeta para los archivos temporales (por defecto, una
+            carpeta temporal que se borra al terminar).
+        progress: Llamada opcional con cada resultado según se obtiene.
+
+    Returns:
+        Lista de `BenchResult` en el orden de ejecución.
+
+    Raises:
+        ValueError: Si se pide una etapa desconocida.
+    """
+    stages = tuple(stages)
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Etapas desconocidas: {sorted(unknown)}")
+
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        return _run_suite(
+            Path(tmp),
+            sizes=sizes,
+            batch_sizes=batch_sizes,
+            stages=stages,
+            repeat=repeat,
+            warmup=warmup,
+            model_path=model_path,
+            progress=progress,
+        )
+
+
+def _run_suite(
+    tmp: Path,
+    *,
+    sizes: Sequence[int],
+    batch_sizes: Sequence[int],
+    stages: tuple[str, ...],
+    repeat: int,
+    warmup: int,
+    model_path: str | Path | None,
+    progress: Callable[[BenchResult], None] | None,
+) -> list[BenchResult]:
+    import cv2
+
+    from .io_imgs import (
+        _to_uint8,
+        read_dicom_file,
+        read_jpg_file,
+        read_model_gray,
+    )
+    from .preprocess import preprocess
+
+    results: list[BenchResult] = []
+
+    def record(result: BenchResult) -> None:
+        results.append(result)
+        if progress is not None:
+            progress(result)
+
+    # Imágenes de entrada en disco (DICOM de 12 bits y su versión JPG)
+    images: dict[int, np.ndarray] = {}
+    for size in sizes:
+        pixels = synthetic_image(size, seed=size)
+        dcm_path = write_synthetic_dicom(tmp / f"img_{size}.dcm", pixels)
+        jpg_path = tmp / f"img_{size}.jpg"
+        cv2.imwrite(str(jpg_path), _to_uint8(pixels))
+        images[size] = cv2.cvtColor(_to_uint8(pixels), cv2.COLOR_GRAY2RGB)
+
+        if "read_dicom_file" in stages:
+            record(
+                measure(
+                    "read_dicom_file",
+                    partial(read_dicom_file, dcm_path),
+                    params={"size": size},
+                    repeat=repeat,
+                    warmup=warmup,
+                )
+            )
+        if "read_jpg_file" in stages:
+            record(
+                measure(
+                    "read_jpg_file",
+                    partial(read_jpg_file, jpg_path),
+                    params={"size": size},
+                    repeat=repeat,
+                    warmup=warmup,
+                )
+            )
+        if "decode_dicom" in stages:
+            for syntax in SYNTHETIC_SYNTAXES:
+                for result in _measure_decoders(
+                    tmp / f"img_{size}_{syntax}.dcm",
+                    pixels,
+                    syntax,
+                    params={"size": size},
+                    repeat=repeat,
+                    warmup=warmup,
+                ):
+                    record(result)
+        if "read_model_gray" in stages:
+            for fmt, path in (("dicom", dcm_path), ("jpg", jpg_path)):
+                record(
+                    measure(
+                        "read_model_gray",
+                        partial(read_model_gray, path),
+                        params={"size": size, "format": fmt},
+                        repeat=repeat,
+                        warmup=warmup,
+                    )
+                )
+        if "preprocess" in stages:
+            record(
+                measure(
+                    "preprocess",
+                    partial(preprocess, images[size]),
+                    params={"size": size},
+                    repeat=repeat,
+                    warmup=warmup,
+                )
+            )
+
+    if not {"model_fun", "predict", "classify", "grad_cam"} & set(stages):
+        return results
+
+    from .explain import grad_cam
+    from .inference import predict, predict_batch
+    from .model import REGISTRY, model_fun
+
+    synthetic = model_path is None
+    if synthetic:
+        model_path = tmp / "synthetic.h5"
+        build_synthetic_model().save(model_path)
+
+    with _model_path(Path(model_path)):
+        if "model_fun" in stages:
+            cold = measure(
+                "model_fun",
+                model_fun,
+                params={"cache": "cold", "synthetic": synthetic},
+                repeat=repeat,
+                warmup=0,
+                setup=REGISTRY.evict,
+            )
+            cold.extra["weights_mb"] = REGISTRY.entry().nbytes / (1024 * 1024)
+            record(cold)
+            record(
+                measure(
+                    "model_fun",
+                    model_fun,
+                    params={"cache": "warm", "synthetic": synthetic},
+                    repeat=repeat,
+                    warmup=warmup,
+                )
+            )
+
+        if "predict" in stages:
+            array = next(iter(images.values()), None)
+            if array is None:
+                array = cv2.cvtColor(
+                    _to_uint8(synthetic_image(512)), cv2.COLOR_GRAY2RGB
+                )
+            for batch_size in batch_sizes:
+                if batch_size == 1:
+                    fn = partial(predict, array)
+                else:
+                    fn = partial(predict_batch, [array] * batch_size, batch_size)
+                record(
+                    measure(
+                        "predict",
+                        fn,
+                        params={
+                            "batch_size": batch_size,
+                            "size": array.shape[0],
+                            "synthetic": synthetic,
+                        },
+                        items=batch_size,
+                        repeat=repeat,
+                        warmup=warmup,
+                    )
+                )
+
+        if "classify" in stages:
+            for result in _measure_backends(
+                Path(model_path),
+                tmp,
+                batch_sizes,
+                params={"synthetic": synthetic},
+                repeat=repeat,
+                warmup=warmup,
+            ):
+                record(result)
+
+        if "grad_cam" in stages:
+            for size, array in images.items():
+                record(
+                    measure(
+                        "grad_cam",
+                        partial(grad_cam, array),
+                        params={"size": size, "synthetic": synthetic},
+                        repeat=repeat,
+                        warmup=warmup,
+                    )
+                )
+        REGISTRY.evict()
+    return results
+
+
+def _measure_backends(
+    model_path: Path,
+    tmp: Path,
+    batch_sizes: Sequence[int],
+    *,
+    params: dict[str, Any],
+    repeat: int,
+    warmup: int,
+) -> list[BenchResult]:
+    """Mide la clasificación (sin Grad-CAM) con cada motor disponible.
+
+    El modelo se exporta a `tmp` en cada formato cuyo conversor esté
+    instalado; los que fallan se omiten.
+    """
+    from .backends import get_backend, load_backend
+    from .export import EXPORT_FORMATS, export_model, parity_batch
+
+    engines = {"keras": get_backend("keras", model_path)}
+    for fmt in EXPORT_FORMATS:
+        try:
+            [path] = export_model(model_path, [fmt], out_dir=tmp).values()
+            engines[fmt] = load_backend(path)
+        except ImportError:  # conversor o runtime no instalado
+            continue
+
+    input_shape = engines["keras"].model.input_shape[1:]
+    results = []
+    for batch_size in batch_sizes:
+        batch = parity_batch(input_shape, samples=batch_size)
+        for name, engine in engines.items():
+            results.append(
+                measure(
+                    "classify",
+                    partial(engine.predict, batch),
+                    params={**params, "backend": name, "batch_size": batch_size},
+                    items=batch_size,
+                    repeat=repeat,
+                    warmup=warmup,
+                )
+            )
+    return results
+
+
+def _measure_decoders(
+    path: Path,
+    pixels: np.ndarray,
+    syntax: str,
+    *,
+    params: dict[str, Any],
+    repeat: int,
+    warmup: int,
+) -> list[BenchResult]:
+    """Mide cada decodificador instalado que soporte la transfer syntax."""
+    import pydicom
+    from pydicom.uid import UID
+
+    from .dicom_decoders import decode_dicom, decoders_for
+
+    write_synthetic_dicom(path, pixels, syntax)
+    header = pydicom.dcmread(str(path), stop_before_pixels=True)
+    tsyntax = UID(header.file_meta.TransferSyntaxUID)
+    return [
+        measure(
+            "decode_dicom",
+            partial(decode_dicom, path, decoder.name),
+            params={**params, "syntax": syntax, "decoder": decoder.name},
+            repeat=repeat,
+            warmup=warmup,
+        )
+        for decoder in decoders_for(tsyntax, header)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# JSON y comparación con línea base
+# ---------------------------------------------------------------------------
+
+
+def environment_info() -> dict[str, Any]:
+    """Datos del entorno que afectan a los tiempos."""
+    info: dict[str, Any] = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+    for name in ("cv2", "pydicom", "tensorflow"):
+        module = sys.modules.get(name)
+        if module is not None:
+            info[name] = getattr(module, "__version__", None)
+    return info
+
+
+def results_to_json(results: Iterable[BenchResult]) -> dict[str, Any]:
+    """Documento JSON con el entorno y todos los resultados."""
+    return {
+        "format": BENCH_FORMAT,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment_info(),
+        "results": [{"key": r.key, **asdict(r)} for r in results],
+    }
+
+
+def compare_results(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> list[str]:
+    """Compara dos documentos de `results_to_json` por su p50.
+
+    Args:
+        current: Resultados de esta ejecución.
+        baseline: Resultados de referencia.
+        tolerance: Aumento relativo de p50 permitido (0.2 = +20 %).
+
+    Returns:
+        Descripción de cada regresión encontrada (vacía si no hay).
+        Las mediciones sin contraparte en la línea base se ignoran.
+    """
+    base = {r["key"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for result in current.get("results", []):
+        ref = base.get(result["key"])
+        if ref is None or ref["p50_ms"] <= 0:
+            continue
+        ratio = result["p50_ms"] / ref["p50_ms"]
+        if ratio > 1.0 + tolerance:
+            regressions.append(
+                f"{result['key']}: p50 {ref['p50_ms']:.2f} → "
+                f"{result['p50_ms']:.2f} ms (+{(ratio - 1.0) * 100:.0f} %)"
+            )
+    return regressions
+
+
+def format_results(results: Iterable[BenchResult]) -> str:
+    """Tabla legible con los resultados."""
+    lines = [
+        f"{'medición':<60} {'p50 ms':>9} {'p95 ms':>9} {'img/s':>9} {'RSS MB':>8}"
+    ]
+    for r in results:
+        rss = f"{r.peak_rss_mb:8.0f}" if r.peak_rss_mb is not None else f"{'-':>8}"
+        lines.append(
+            f"{r.key:<60} {r.p50_ms:9.2f} {r.p95_ms:9.2f} "
+            f"{r.images_per_sec:9.1f} {rss}"
+        )
+    return "\n".join(lines)
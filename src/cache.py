@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Cachés de resultados: en disco (por contenido) y en memoria (LRU).
+
+Cada entrada se identifica por el SHA-256 de los bytes de la imagen
+combinado con un *namespace* que resume el modelo (su SHA-256) y los
+parámetros de preprocesamiento. Así, una imagen repetida (o un lote
+interrumpido que se relanza) reutiliza el resultado sin volver a
+ejecutar el modelo, y cambiar el modelo o el preprocesamiento invalida
+la caché automáticamente.
+
+Estructura en disco::
+
+    <root>/<ab>/<clave>.json   # etiqueta y probabilidades
+    <root>/<ab>/<clave>.png    # heatmap Grad-CAM (si se calculó)
+
+El tamaño total se acota con desalojo LRU (por fecha de último acceso,
+registrada en el mtime de los archivos).
+
+`MemoryLRU` es la variante en memoria para sesiones interactivas (GUI):
+acotada en bytes y con la misma política de desalojo.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, fields, is_dataclass
+from pathlib import Path
+from typing import Any, Callable, Hashable, Mapping
+
+import numpy as np
+
+from .config import DEFAULT_CACHE_MAX_MB, DEFAULT_MEMORY_CACHE_MB
+from .preprocess import PREPROCESS_DEFAULTS
+
+# Cambiar si se modifica el formato de las entradas.
+CACHE_FORMAT = 1
+
+
+def cache_namespace(
+    model_sha256: str, params: Mapping[str, Any] = PREPROCESS_DEFAULTS
+) -> str:
+    """Resume modelo + parámetros de preprocesamiento en un identificador."""
+    payload = json.dumps(
+        {"format": CACHE_FORMAT, "model": model_sha256, "params": dict(params)},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedResult:
+    """Resultado recuperado de la caché."""
+
+    label: str
+    probs: np.ndarray
+    heatmap: np.ndarray | None
+
+
+class ResultCache:
+    """Caché LRU en disco de resultados de inferencia.
+
+    Args:
+        root: Carpeta de la caché (se crea si no existe).
+        namespace: Identificador del modelo y preprocesamiento
+            (ver `cache_namespace`).
+        max_bytes: Tamaño máximo aproximado de la caché en disco.
+    """
+
+    def __init__(
+        self,
+        root: str | os.PathLike[str],
+        namespace: str,
+        max_bytes: int = DEFAULT_CACHE_MAX_MB * 1024 * 1024,
+    ) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = sum(f.stat().st_size for f in self._files())
+
+    def _files(self) -> list[Path]:
+        return [f for f in self.root.glob("*/*") if f.suffix in (".json", ".png")]
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        folder = self.root / key[:2]
+        return folder / f"{key}.json", folder / f"{key}.png"
+
+    def key_for(self, data: bytes) -> str:
+        """Clave de caché para el contenido de una imagen."""
+        digest = hashlib.sha256(self.namespace.encode("ascii"))
+        digest.update(hashlib.sha256(data).digest())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> CachedResult | None:
+        """Devuelve el resultado cacheado o `None` si no existe."""
+        import cv2
+
+        meta_path, png_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+        heatmap = None
+        paths = [meta_path]
+        if meta.get("heatmap", True):
+            try:
+                png = np.fromfile(png_path, dtype=np.uint8)
+            except (OSError, ValueError):
+                return None
+            bgr = cv2.imdecode(png, cv2.IMREAD_COLOR)
+            if bgr is None:
+                return None
+            heatmap = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+            paths.append(png_path)
+
+        # Marcar como usado recientemente (LRU)
+        for path in paths:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+        return CachedResult(
+            label=meta["label"],
+            probs=np.asarray(meta["probs"], dtype=np.float32),
+            heatmap=heatmap,
+        )
+
+    def put(
+        self,
+        key: str,
+        label: str,
+        probs: np.ndarray,
+        heatmap: np.ndarray | None,
+    ) -> None:
+        """Guarda un resultado de forma atómica y desaloja si se excede el tope.
+
+        Con `heatmap=None` (modo solo clasificación) se guarda solo el JSON.
+        """
+        import cv2
+
+        meta_path, png_path = self._paths(key)
+        meta_path.parent.mkdir(exist_ok=True)
+
+        files = []
+        if heatmap is not None:
+            ok, png = cv2.imencode(".png", cv2.cvtColor(heatmap, cv2.COLOR_RGB2BGR))
+            if not ok:
+                raise ValueError("No se pudo codificar el heatmap como PNG.")
+            files.append((png_path, png.tobytes()))
+        meta = json.dumps(
+            {
+                "label": label,
+                "probs": [float(p) for p in probs],
+                "heatmap": heatmap is not None,
+            }
+        )
+        files.append((meta_path, meta.encode()))
+
+        # Al reescribir una clave, descontar lo que se reemplaza (y un PNG
+        # anterior que la nueva entrada ya no usa)
+        replaced = 0
+        for path in (png_path, meta_path):
+            try:
+                replaced += path.stat().st_size
+            except FileNotFoundError:
+                continue
+            if heatmap is None and path == png_path:
+                path.unlink(missing_ok=True)
+
+        # PNG primero: una entrada es válida solo cuando existe su JSON
+        written = 0
+        for path, data in files:
+            tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            written += len(data)
+
+        with self._lock:
+            self._size += written - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Borra las entradas menos usadas hasta quedar en ~90% del tope."""
+        target = int(self.max_bytes * 0.9)
+        entries: dict[str, list[Path]] = {}
+        for f in self._files():
+            entries.setdefault(f.stem, []).append(f)
+
+        def last_used(files: list[Path]) -> float:
+            return max((f.stat().st_mtime for f in files if f.exists()), default=0.0)
+
+        size = sum(f.stat().st_size for fs in entries.values() for f in fs)
+        for _key, files in sorted(entries.items(), key=lambda kv: last_used(kv[1])):
+            if size <= target:
+                break
+            for f in files:
+                try:
+                    size -= f.stat().st_size
+                    f.unlink()
+                except OSError:
+                    pass
+        self._size = size
+
+
+def estimate_nbytes(value: Any) -> int:
+    """Estima la memoria de arrays/imágenes contenidos en `value`.
+
+    Recorre dataclasses, tuplas, listas y dicts; cuenta `np.ndarray` por
+    `nbytes` e imágenes PIL por ancho x alto x bandas. El resto se ignora.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if hasattr(value, "getbands") and hasattr(value, "size"):  # PIL.Image
+        width, height = value.size
+        return width * height * len(value.getbands())
+    if is_dataclass(value):
+        return sum(estimate_nbytes(getattr(value, f.name)) for f in fields(value))
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(estimate_nbytes(v) for v in value.values())
+    return 0
+
+
+class MemoryLRU:
+    """Caché LRU en memoria acotada por tamaño (bytes estimados).
+
+    Args:
+        max_bytes: Tope de memoria; al superarlo se desalojan las entradas
+            usadas hace más tiempo.
+        sizeof: Función que estima el tamaño de un valor.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MEMORY_CACHE_MB * 1024 * 1024,
+        sizeof: Callable[[Any], int] = estimate_nbytes,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._data: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria estimada ocupada por las entradas actuales."""
+        return self._size
+
+    def get(self, key: Hashable) -> Any | None:
+        """Devuelve el valor (marcándolo como reciente) o `None`."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            self._data.move_to_end(key)
+            return item[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Inserta o actualiza un valor y desaloja hasta respetar el tope.
+
+        Volver a llamar `put` tras modificar un valor ya cacheado recalcula
+        su tamaño.
+        """
+        size = self._sizeof(value)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            if size > self.max_bytes:
+                return  # no cabe: no se cachea
+            self._data[key] = (value, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _key, (_value, old_size) = self._data.popitem(last=False)
+                self._size -= old_size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._size = 0
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Valores por defecto compartidos (sin dependencias pesadas).
+
+Las interfaces (CLI/GUI) los usan al construir sus argumentos sin tener
+que importar TensorFlow, OpenCV ni pydicom.
+"""
+
+from __future__ import annotations
+
+# Ruta del modelo si no se define la variable de entorno `MODEL_PATH`.
+DEFAULT_MODEL_PATH = "model/conv_MLP_84.h5"
+
+# Motor de clasificación si no se define `UAO_BACKEND` (keras/tflite/onnx).
+DEFAULT_BACKEND = "keras"
+
+# Imágenes por llamada al modelo en `predict_batch`.
+DEFAULT_BATCH_SIZE = 16
+
+# Tope de la caché de resultados en disco (MB).
+DEFAULT_CACHE_MAX_MB = 1024
+
+# Tope de la caché de estudios en memoria de la GUI (MB).
+DEFAULT_MEMORY_CACHE_MB = 256
+
+# Política de Grad-CAM por defecto (always/never/auto) y, en `auto`, la
+# probabilidad (%) por debajo de la cual también se explica una imagen normal.
+DEFAULT_HEATMAP_POLICY = "always"
+DEFAULT_HEATMAP_MIN_CONFIDENCE = 90.0
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Decodificadores de píxeles DICOM intercambiables por transfer syntax.
+
+`decode_dicom` lee la cabecera, mira la transfer syntax y prueba los
+decodificadores instalados en orden de preferencia (el más rápido
+primero); si uno falla pasa al siguiente. El resultado indica qué
+decodificador manejó el archivo (también se registra en el log a nivel
+DEBUG y en el contador de telemetría `io.decoder.<nombre>`).
+
+Decodificadores incluidos:
+  - `native`: datos sin comprimir (pydicom).
+  - `opencv`: JPEG baseline y JPEG 2000 monocromo sin signo con OpenCV
+    (libjpeg-turbo/OpenJPEG, ya es dependencia del proyecto).
+  - Plugins de pydicom >= 3 si están instalados: `pylibjpeg`, `gdcm`,
+    `pyjpegls`, `pillow` y el decodificador RLE propio (`pydicom`).
+
+Se pueden añadir otros con `register_decoder`. El origen puede ser una
+ruta o el contenido del archivo en memoria (`bytes`, p. ej. una subida al
+servidor); los decodificadores lo abren con `open_source`.
+
+`iter_dicom_frames` recorre un multi-frame con la misma cadena de
+preferencias: usa el `iter_frames(source, header)` del decodificador si
+lo tiene (frame a frame, sin cargar el volumen) y, si no, parte el
+resultado de `decode`. El respaldo al siguiente decodificador solo
+aplica hasta el primer frame; un fallo posterior se propaga.
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Iterator, Protocol, Union
+
+import numpy as np
+
+from .telemetry import count, span
+
+if TYPE_CHECKING:
+    from pydicom import Dataset
+    from pydicom.uid import UID
+
+logger = logging.getLogger(__name__)
+
+# Ruta de un DICOM o su contenido en memoria.
+DicomSource = Union[str, Path, bytes]
+
+# Transfer syntaxes por familia.
+JPEG_BASELINE = ("1.2.840.10008.1.2.4.50",)
+JPEG_EXTENDED = ("1.2.840.10008.1.2.4.51",)
+JPEG_LOSSLESS = ("1.2.840.10008.1.2.4.57", "1.2.840.10008.1.2.4.70")
+JPEG_LS = ("1.2.840.10008.1.2.4.80", "1.2.840.10008.1.2.4.81")
+JPEG_2000 = (
+    "1.2.840.10008.1.2.4.90",
+    "1.2.840.10008.1.2.4.91",
+    "1.2.840.10008.1.2.4.201",
+    "1.2.840.10008.1.2.4.202",
+    "1.2.840.10008.1.2.4.203",
+)
+RLE = ("1.2.840.10008.1.2.5",)
+
+# Orden de preferencia por transfer syntax (medido con `python -m app.bench
+# --stages decode_dicom`). Los decodificadores no listados que soporten la
+# sintaxis se prueban al final.
+DECODER_PREFERENCES: dict[str, list[str]] = {
+    **{ts: ["opencv", "pillow", "pylibjpeg", "gdcm"] for ts in JPEG_BASELINE},
+    **{ts: ["pylibjpeg", "gdcm", "pillow"] for ts in JPEG_EXTENDED},
+    **{ts: ["pylibjpeg", "gdcm"] for ts in JPEG_LOSSLESS},
+    **{ts: ["pyjpegls", "pylibjpeg", "gdcm"] for ts in JPEG_LS},
+    **{ts: ["opencv", "pylibjpeg", "gdcm", "pillow"] for ts in JPEG_2000},
+    **{ts: ["pylibjpeg", "pydicom", "gdcm"] for ts in RLE},
+}
+
+
+class DicomDecoder(Protocol):
+    """Decodificador de la imagen de un archivo DICOM."""
+
+    name: str
+
+    def supports(self, tsyntax: UID, header: Dataset) -> bool:
+        """Indica si puede decodificar esta transfer syntax y cabecera."""
+        ...
+
+    def decode(self, source: DicomSource, header: Dataset) -> np.ndarray:
+        """Devuelve los píxeles crudos (sin rescale) del archivo."""
+        ...
+
+    # Opcional: `iter_frames(source, header) -> Iterator[np.ndarray]` con
+    # los frames crudos uno a uno (ver `iter_dicom_frames`).
+
+
+def open_source(source: DicomSource) -> str | BinaryIO:
+    """Argumento para pydicom: la ruta, o un flujo nuevo sobre los bytes."""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return str(source)
+
+
+def _source_name(source: DicomSource) -> str:
+    if isinstance(source, (bytes, bytearray)):
+        return "<memoria>"
+    return Path(source).name
+
+
+@dataclass
+class DecodedDicom:
+    """Cabecera (sin píxeles), píxeles crudos y decodificador usado."""
+
+    header: Dataset
+    pixels: np.ndarray
+    decoder: str
+    transfer_syntax: str
+
+
+class DecodeError(ValueError):
+    """Ningún decodificador instalado pudo leer los píxeles."""
+
+
+class NativeDecoder:
+    """Datos sin comprimir, leídos directamente del archivo por pydicom."""
+
+    name = "native"
+
+    def supports(self, tsyntax: UID, header: Dataset) -> bool:
+        return not tsyntax.is_compressed
+
+    def decode(self, source: DicomSource, header: Dataset) -> np.ndarray:
+        from pydicom.pixels import pixel_array
+
+        return pixel_array(open_source(source))
+
+    def iter_frames(self, source: DicomSource, header: Dataset) -> Iterator[np.ndarray]:
+        from pydicom.pixels import iter_pixels
+
+        return iter_pixels(open_source(source))
+
+
+class PydicomPluginDecoder:
+    """Plugin de decodificación de pydicom >= 3 (si está instalado).
+
+    Args:
+        plugin: Nombre del plugin (`pylibjpeg`, `gdcm`, `pillow`...).
+    """
+
+    def __init__(self, plugin: str) -> None:
+        self.name = plugin
+
+    def supports(self, tsyntax: UID, header: Dataset) -> bool:
+        from pydicom.pixels import get_decoder
+
+        if not tsyntax.is_compressed:
+            return False
+        try:
+            return self.name in get_decoder(tsyntax).available_plugins
+        except NotImplementedError:  # sintaxis sin decodificador en pydicom
+            return False
+
+    def decode(self, source: DicomSource, header: Dataset) -> np.ndarray:
+        from pydicom.pixels import pixel_array
+
+        return pixel_array(open_source(source), decoding_plugin=self.name)
+
+    def iter_frames(self, source: DicomSource, header: Dataset) -> Iterator[np.ndarray]:
+        from pydicom.pixels import iter_pixels
+
+        return iter_pixels(open_source(source), decoding_plugin=self.name)
+
+
+class OpenCVDecoder:
+    """JPEG baseline / JPEG 2000 de un solo frame con `cv2.imdecode`.
+
+    Solo imágenes monocromo sin signo: OpenCV no decodifica JPEG de 12
+    bits ni JPEG 2000 con signo (esos casos quedan para otros plugins).
+    """
+
+    name = "opencv"
+    syntaxes = frozenset(JPEG_BASELINE + JPEG_2000[:2])
+
+    def supports(self, tsyntax: UID, header: Dataset) -> bool:
+        return (
+            tsyntax in self.syntaxes
+            and int(header.get("SamplesPerPixel", 1)) == 1
+            and int(header.get("PixelRepresentation", 0)) == 0
+            and int(header.get("NumberOfFrames", 1) or 1) == 1
+        )
+
+    def decode(self, source: DicomSource, header: Dataset) -> np.ndarray:
+        import cv2
+        import pydicom
+        from pydicom.encaps import generate_frames
+
+        ds = pydicom.dcmread(open_source(source))
+        frame = next(generate_frames(ds.PixelData, number_of_frames=1))
+        pixels = cv2.imdecode(np.frombuffer(frame, np.uint8), cv2.IMREAD_UNCHANGED)
+        if pixels is None or pixels.shape != (ds.Rows, ds.Columns):
+            raise ValueError("OpenCV no pudo decodificar el frame.")
+        dtype = np.uint8 if int(ds.BitsAllocated) <= 8 else np.uint16
+        return pixels.astype(dtype, copy=False)
+
+
+# Decodificadores registrados, por nombre.
+_DECODERS: dict[str, DicomDecoder] = {
+    decoder.name: decoder
+    for decoder in (
+        NativeDecoder(),
+        OpenCVDecoder(),
+        *(
+            PydicomPluginDecoder(plugin)
+            for plugin in ("pylibjpeg", "gdcm", "pyjpegls", "pillow", "pydicom")
+        ),
+    )
+}
+
+
+def register_decoder(
+    decoder: DicomDecoder, syntaxes: tuple[str, ...] = (), first: bool = True
+) -> None:
+    """Registra (o reemplaza) un decodificador.
+
+    Args:
+        decoder: Objeto con `name`, `supports(tsyntax, header)` y
+            `decode(path, header)`.
+        syntaxes: Transfer syntaxes en cuya preferencia se inserta.
+        first: Si `True`, se prueba antes que los existentes en `syntaxes`.
+    """
+    _DECODERS[decoder.name] = decoder
+    for ts in syntaxes:
+        prefs = DECODER_PREFERENCES.setdefault(ts, [])
+        if decoder.name in prefs:
+            prefs.remove(decoder.name)
+        prefs.insert(0 if first else len(prefs), decoder.name)
+
+
+def decoders_for(tsyntax: UID, header: Dataset) -> list[DicomDecoder]:
+    """Decodificadores disponibles para la cabecera, en orden de preferencia."""
+    preferred = DECODER_PREFERENCES.get(str(tsyntax), [])
+    names = preferred + [n for n in _DECODERS if n not in preferred]
+    return [
+        _DECODERS[name]
+        for name in names
+        if name in _DECODERS and _DECODERS[name].supports(tsyntax, header)
+    ]
+
+
+def _candidates(
+    source: DicomSource, decoder: str | None
+) -> tuple[DicomSource, Dataset, UID, list[DicomDecoder]]:
+    """Cabecera, transfer syntax y decodificadores a probar, en orden."""
+    import pydicom
+    from pydicom.uid import UID
+
+    if not isinstance(source, (bytes, bytearray)):
+        source = Path(source)
+    with span("io.parse", format="dicom"):
+        header = pydicom.dcmread(open_source(source), stop_before_pixels=True)
+    tsyntax = UID(header.file_meta.TransferSyntaxUID)
+
+    candidates = decoders_for(tsyntax, header)
+    if decoder is not None:
+        candidates = [d for d in candidates if d.name == decoder]
+    return source, header, tsyntax, candidates
+
+
+def _handled(source: DicomSource, tsyntax: UID, decoder: DicomDecoder) -> None:
+    count(f"io.decoder.{decoder.name}")
+    logger.debug("%s: %s con %s", _source_name(source), tsyntax.name, decoder.name)
+
+
+def _decode_error(source: DicomSource, tsyntax: UID, errors: list[str]) -> DecodeError:
+    detail = "; ".join(errors) if errors else "no hay decodificadores instalados"
+    return DecodeError(
+        f"No se pudo decodificar {_source_name(source)} ({tsyntax.name}): {detail}"
+    )
+
+
+def decode_dicom(source: DicomSource, decoder: str | None = None) -> DecodedDicom:
+    """Lee cabecera y píxeles crudos de un DICOM con el mejor decodificador.
+
+    Args:
+        source: Ruta al archivo DICOM o su contenido (`bytes`).
+        decoder: Fuerza un decodificador concreto (p. ej. para benchmarks).
+
+    Returns:
+        `DecodedDicom` con la cabecera (sin PixelData), los píxeles y el
+        nombre del decodificador que los produjo.
+
+    Raises:
+        ImportError: Con pydicom < 3 (sin `pydicom.pixels`).
+        DecodeError: Si ningún decodificador pudo leer los píxeles.
+        Exception: Errores de pydicom al leer la cabecera.
+    """
+    source, header, tsyntax, candidates = _candidates(source, decoder)
+    errors = []
+    for candidate in candidates:
+        try:
+            with span("io.decode", format="dicom", decoder=candidate.name):
+                pixels = candidate.decode(source, header)
+        except Exception as exc:  # probar el siguiente decodificador
+            errors.append(f"{candidate.name}: {exc}")
+            continue
+        _handled(source, tsyntax, candidate)
+        return DecodedDicom(header, pixels, candidate.name, str(tsyntax))
+    raise _decode_error(source, tsyntax, errors)
+
+
+def _frames_of(
+    decoder: DicomDecoder, source: DicomSource, header: Dataset
+) -> Iterator[np.ndarray]:
+    """Frames crudos con `iter_frames` del decodificador o partiendo `decode`."""
+    iter_frames = getattr(decoder, "iter_frames", None)
+    if iter_frames is not None:
+        return iter(iter_frames(source, header))
+    pixels = decoder.decode(source, header)
+    multi = int(header.get("NumberOfFrames", 1) or 1) > 1
+    return iter(pixels if multi else pixels[None])
+
+
+def _stream(
+    first: np.ndarray, frames: Iterator[np.ndarray], name: str
+) -> Iterator[np.ndarray]:
+    yield first
+    while True:
+        with span("io.decode", format="dicom", decoder=name):
+            frame = next(frames, None)
+        if frame is None:
+            return
+        yield frame
+
+
+def iter_dicom_frames(
+    source: DicomSource, decoder: str | None = None
+) -> tuple[Dataset, Iterator[np.ndarray]]:
+    """Cabecera y frames crudos (sin rescale) de un DICOM, uno a uno.
+
+    Elige el decodificador como `decode_dicom`; se prueba el siguiente
+    si uno falla antes de entregar el primer frame.
+
+    Args:
+        source: Ruta al archivo DICOM o su contenido (`bytes`).
+        decoder: Fuerza un decodificador concreto.
+
+    Returns:
+        La cabecera (sin PixelData) y un iterador de frames.
+
+    Raises:
+        ImportError: Con pydicom < 3 (sin `pydicom.pixels`).
+        DecodeError: Si ningún decodificador pudo leer el primer frame.
+        Exception: Errores de pydicom al leer la cabecera.
+    """
+    source, header, tsyntax, candidates = _candidates(source, decoder)
+    errors = []
+    for candidate in candidates:
+        try:
+            with span("io.decode", format="dicom", decoder=candidate.name):
+                frames = _frames_of(candidate, source, header)
+                first = next(frames)
+        except StopIteration:
+            errors.append(f"{candidate.name}: sin frames")
+            continue
+        except Exception as exc:  # probar el siguiente decodificador
+            errors.append(f"{candidate.name}: {exc}")
+            continue
+        _handled(source, tsyntax, candidate)
+        return header, _stream(first, frames, candidate.name)
+    raise _decode_error(source, tsyntax, errors)
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Índice de cabeceras DICOM para filtrar archivos sin decodificar píxeles.
+
+Recorre un árbol de carpetas, lee solo la cabecera de cada DICOM
+(`stop_before_pixels`) en un pool de procesos y guarda ruta, UIDs y las
+etiquetas clave en una base SQLite. Al volver a indexar solo se leen los
+archivos nuevos o modificados (por mtime y tamaño) y se quitan los que ya
+no existen.
+
+Ejemplo:
+    index = DicomIndex("estudios.sqlite")
+    index.update("estudios/")
+    torax = index.paths(modalities=["CR", "DX"], body_parts=["CHEST"])
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+# Versión del esquema de la base (subir si cambian las columnas).
+INDEX_FORMAT = 1
+
+# Columna del índice → keyword DICOM de la cabecera.
+HEADER_FIELDS: dict[str, str] = {
+    "sop_instance_uid": "SOPInstanceUID",
+    "study_instance_uid": "StudyInstanceUID",
+    "series_instance_uid": "SeriesInstanceUID",
+    "modality": "Modality",
+    "body_part": "BodyPartExamined",
+    "view_position": "ViewPosition",
+    "photometric": "PhotometricInterpretation",
+    "rows": "Rows",
+    "columns": "Columns",
+    "frames": "NumberOfFrames",
+    "bits_stored": "BitsStored",
+}
+_INT_FIELDS = {"rows", "columns", "frames", "bits_stored"}
+
+# Archivos por tarea enviada al pool.
+_CHUNK_SIZE = 64
+
+
+@dataclass
+class IndexEntry:
+    """Fila del índice: un archivo DICOM y sus etiquetas clave."""
+
+    path: str
+    mtime_ns: int
+    size: int
+    sop_instance_uid: str | None = None
+    study_instance_uid: str | None = None
+    series_instance_uid: str | None = None
+    modality: str | None = None
+    body_part: str | None = None
+    view_position: str | None = None
+    photometric: str | None = None
+    rows: int | None = None
+    columns: int | None = None
+    frames: int | None = None
+    bits_stored: int | None = None
+    transfer_syntax: str | None = None
+    error: str | None = None
+
+
+_COLUMNS = tuple(f.name for f in fields(IndexEntry))
+
+
+@dataclass
+class IndexStats:
+    """Resumen de una actualización del índice."""
+
+    scanned: int = 0
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    failed: int = 0
+
+    @property
+    def unchanged(self) -> int:
+        return self.scanned - self.added - self.updated
+
+
+def read_header(path: str, mtime_ns: int = 0, size: int = 0) -> IndexEntry:
+    """Lee la cabecera de un DICOM (sin píxeles) y la resume.
+
+    Los errores de lectura no se propagan: quedan en `error` para que el
+    archivo no se vuelva a intentar mientras no cambie.
+    """
+    import pydicom
+
+    entry = IndexEntry(path=path, mtime_ns=mtime_ns, size=size)
+    try:
+        ds = pydicom.dcmread(
+            path,
+            stop_before_pixels=True,
+            specific_tags=list(HEADER_FIELDS.values()),
+        )
+        # Convertir dentro del try: un IS/US mal formado es un error del
+        # archivo, no de toda la actualización
+        values = {}
+        for column, keyword in HEADER_FIELDS.items():
+            value = ds.get(keyword)
+            if value is None or value == "":
+                continue
+            values[column] = int(value) if column in _INT_FIELDS else str(value)
+    except Exception as exc:  # pydicom lanza distintos tipos
+        entry.error = f"{type(exc).__name__}: {exc}"
+        return entry
+
+    for column, value in values.items():
+        setattr(entry, column, value)
+    meta = getattr(ds, "file_meta", None)
+    if meta is not None and "TransferSyntaxUID" in meta:
+        entry.transfer_syntax = str(meta.TransferSyntaxUID)
+    return entry
+
+
+def _read_headers(jobs: list[tuple[str, int, int]]) -> list[IndexEntry]:
+    """Lee un bloque de cabeceras (unidad de trabajo del pool)."""
+    return [read_header(*job) for job in jobs]
+
+
+def _chunks(items: list, size: int) -> Iterator[list]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class DicomIndex:
+    """Índice SQLite de cabeceras DICOM.
+
+    Args:
+        db_path: Archivo SQLite (se crea si no existe).
+
+    Raises:
+        ValueError: Si la base existe con otro formato de índice.
+    """
+
+    def __init__(self, db_path: str | os.PathLike[str]) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path)
+        self._conn.row_factory = sqlite3.Row
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        integers = _INT_FIELDS | {"mtime_ns", "size"}
+        columns = ", ".join(
+            f"{name} {'INTEGER' if name in integers else 'TEXT'}"
+            for name in _COLUMNS[1:]  # path va aparte como clave primaria
+        )
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'format'"
+            ).fetchone()
+            if row is not None and int(row["value"]) != INDEX_FORMAT:
+                raise ValueError(
+                    f"Índice con formato {row['value']} (se esperaba {INDEX_FORMAT}): "
+                    f"borra {self.db_path} y vuelve a indexar."
+                )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('format', ?)", (INDEX_FORMAT,)
+            )
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS images (path TEXT PRIMARY KEY, {columns})"
+            )
+            for column in ("modality", "body_part", "study_instance_uid"):
+                self._conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{column} ON images ({column})"
+                )
+
+    def close(self) -> None:
+        """Cierra la conexión con la base."""
+        self._conn.close()
+
+    def __enter__(self) -> DicomIndex:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+
+    def update(
+        self,
+        root: str | os.PathLike[str],
+        pattern: str = "**/*.dcm",
+        workers: int | None = None,
+    ) -> IndexStats:
+        """Indexa (o re-indexa) los archivos de `root` que casan con `pattern`.
+
+        Args:
+            root: Carpeta a recorrer.
+            pattern: Patrón glob relativo a `root`.
+            workers: Procesos del pool (por defecto, uno por CPU); con 0 se
+                leen en el proceso actual.
+
+        Returns:
+            `IndexStats` con archivos nuevos, modificados, borrados y con error.
+
+        Raises:
+            FileNotFoundError: Si `root` no es una carpeta.
+        """
+        root = Path(root).resolve()
+        if not root.is_dir():
+            raise FileNotFoundError(f"No existe la carpeta: {root}")
+
+        known = {
+            row["path"]: (row["mtime_ns"], row["size"])
+            for row in self._conn.execute("SELECT path, mtime_ns, size FROM images")
+        }
+        stats = IndexStats()
+        jobs: list[tuple[str, int, int]] = []
+        seen: set[str] = set()
+        for path in root.glob(pattern):
+            if not path.is_file():
+                continue
+            stat = path.stat()
+            key = str(path)
+            seen.add(key)
+            stats.scanned += 1
+            previous = known.get(key)
+            if previous == (stat.st_mtime_ns, stat.st_size):
+                continue
+            if previous is None:
+                stats.added += 1
+            else:
+                stats.updated += 1
+            jobs.append((key, stat.st_mtime_ns, stat.st_size))
+
+        prefix = f"{root}{os.sep}"
+        removed = [p for p in known if p.startswith(prefix) and p not in seen]
+        stats.removed = len(removed)
+
+        with self._conn:
+            for entry in self._read_all(jobs, workers):
+                stats.failed += entry.error is not None
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO images ({', '.join(_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                    tuple(getattr(entry, name) for name in _COLUMNS),
+                )
+            self._conn.executemany(
+                "DELETE FROM images WHERE path = ?", [(p,) for p in removed]
+            )
+        return stats
+
+    @staticmethod
+    def _read_all(
+        jobs: list[tuple[str, int, int]], workers: int | None
+    ) -> Iterable[IndexEntry]:
+        if workers == 0 or len(jobs) <= _CHUNK_SIZE:
+            return [read_header(*job) for job in jobs]
+
+        def entries() -> Iterator[IndexEntry]:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for chunk in pool.map(_read_headers, _chunks(jobs, _CHUNK_SIZE)):
+                    yield from chunk
+
+        return entries()
+
+    def select(
+        self,
+        *,
+        modalities: Iterable[str] | None = None,
+        body_parts: Iterable[str] | None = None,
+        view_positions: Iterable[str] | None = None,
+        photometric: Iterable[str] | None = None,
+        min_rows: int | None = None,
+        min_columns: int | None = None,
+        include_errors: bool = False,
+    ) -> list[IndexEntry]:
+        """Filtra el índice por etiquetas (sin leer ningún archivo).
+
+        Los filtros de texto no distinguen mayúsculas y aceptan varios
+        valores (OR); los distintos filtros se combinan con AND.
+
+        Returns:
+            Entradas que cumplen los filtros, ordenadas por ruta.
+        """
+        where: list[str] = []
+        args: list[Any] = []
+        for column, values in (
+            ("modality", modalities),
+            ("body_part", body_parts),
+            ("view_position", view_positions),
+            ("photometric", photometric),
+        ):
+            if values is not None:
+                values = [v.upper() for v in values]
+                where.append(f"UPPER({column}) IN ({', '.join('?' * len(values))})")
+                args.extend(values)
+        if min_rows is not None:
+            where.append("rows >= ?")
+            args.append(min_rows)
+        if min_columns is not None:
+            where.append("columns >= ?")
+            args.append(min_columns)
+        if not include_errors:
+            where.append("error IS NULL")
+
+        sql = "SELECT * FROM images"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        rows = self._conn.execute(sql + " ORDER BY path", args)
+        return [IndexEntry(**dict(row)) for row in rows]
+
+    def paths(self, **filters: Any) -> list[Path]:
+        """Como `select`, pero devuelve solo las rutas."""
+        return [Path(entry.path) for entry in self.select(**filters)]
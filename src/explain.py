@@ -1,82 +1,191 @@
-"""Generación de explicaciones visuales con Grad-CAM."""
+"""Generación de explicaciones visuales con Grad-CAM.
+
+La clasificación y el Grad-CAM comparten una única pasada hacia delante:
+`forward_with_cam` ejecuta el sub-modelo (activaciones_conv, salida) bajo
+`GradientTape` y de esa misma pasada obtiene probabilidades, clase
+predicha y mapa de calor. `GradCAMExplainer` cachea ese sub-modelo y
+compila el paso con `tf.function` para no retrazarlo en cada llamada.
+"""
 
 from __future__ import annotations
 
+import weakref
+
 import cv2
 import numpy as np
 import tensorflow as tf
 
 from .model import model_fun
 from .preprocess import preprocess
+from .telemetry import span
 
+_CONV_LAYERS = (
+    tf.keras.layers.Conv2D,
+    tf.keras.layers.SeparableConv2D,
+    tf.keras.layers.DepthwiseConv2D,
+)
+
+# Explicadores ya construidos, por modelo.
+_EXPLAINERS: "weakref.WeakKeyDictionary[tf.keras.Model, GradCAMExplainer]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def find_last_conv_layer(model: tf.keras.Model) -> tf.keras.layers.Layer:
+    """Localiza la última capa convolucional del modelo.
+
+    Raises:
+        ValueError: Si el modelo no contiene capas convolucionales.
+    """
+    for layer in reversed(model.layers):
+        if isinstance(layer, _CONV_LAYERS):
+            return layer
+    raise ValueError("El modelo no contiene capas convolucionales.")
 
-def grad_cam(array: np.ndarray, target_size: int = 512) -> np.ndarray:
-    """Genera un mapa Grad-CAM y lo superpone sobre la imagen original.
+
+class GradCAMExplainer:
+    """Grad-CAM con sub-modelo cacheado y paso de gradiente compilado.
+
+    La capa objetivo y el sub-modelo (activaciones_conv, salida) se
+    resuelven una sola vez. La pasada hacia delante, el gradiente, el
+    pooling y la suma ponderada corren dentro de un `tf.function` con
+    firma fija `(None, H, W, 1)`, de modo que llamadas repetidas (con
+    cualquier tamaño de batch) reutilizan el mismo grafo sin retrazar.
 
     Args:
-        array: Imagen de entrada (H, W, C) en formato RGB o escala de grises.
-        target_size: Tamaño al que redimensionar la salida (por defecto 512).
+        model: Modelo Keras de clasificación.
+        layer_name: Capa objetivo; por defecto la última convolucional.
+
+    Raises:
+        ValueError: Si el modelo no contiene capas convolucionales.
+    """
+
+    def __init__(self, model: tf.keras.Model, layer_name: str | None = None) -> None:
+        # Referencia débil: el explicador es el valor de `_EXPLAINERS`, cuya
+        # clave es el propio modelo; una referencia fuerte lo mantendría
+        # vivo para siempre (p. ej. tras recargarlo en `REGISTRY`)
+        self._model = weakref.ref(model)
+        self.layer = (
+            model.get_layer(layer_name)
+            if layer_name is not None
+            else find_last_conv_layer(model)
+        )
+        self.grad_model = tf.keras.models.Model(
+            inputs=model.input,
+            outputs=[self.layer.output, model.output],
+        )
+        spec = tf.TensorSpec((None, *model.input_shape[1:]), tf.float32)
+        self._step = tf.function(self._forward, input_signature=[spec])
+
+    @property
+    def model(self) -> tf.keras.Model | None:
+        """Modelo explicado (`None` si ya fue liberado)."""
+        return self._model()
+
+    def _forward(self, batch: tf.Tensor) -> tuple[tf.Tensor, tf.Tensor]:
+        """Pasada única: probabilidades y Grad-CAM de la clase predicha."""
+        with tf.GradientTape() as tape:
+            conv_outputs, predictions = self.grad_model(batch, training=False)
+            if isinstance(predictions, (list, tuple)):
+                predictions = predictions[0]
+            class_idx = tf.argmax(predictions, axis=-1)
+            loss = tf.gather(predictions, class_idx, axis=1, batch_dims=1)
+
+        grads = tape.gradient(loss, conv_outputs)
+        pooled_grads = tf.reduce_mean(grads, axis=(1, 2))  # (N, C)
+
+        # Combinar activaciones y gradientes
+        heatmaps = tf.einsum("nhwc,nc->nhw", conv_outputs, pooled_grads)
+        heatmaps = tf.maximum(heatmaps, 0)
+        heatmaps /= tf.reduce_max(heatmaps, axis=(1, 2), keepdims=True) + 1e-8
+        return predictions, heatmaps
+
+    def __call__(self, batch: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Ejecuta el paso compilado sobre un batch (N, H, W, 1)."""
+        # Pasada y gradiente van fusionados en el mismo grafo: un solo tramo
+        with span("explain.forward_gradient", batch=len(batch)):
+            probs, heatmaps = self._step(np.asarray(batch, dtype=np.float32))
+            return probs.numpy(), heatmaps.numpy()
+
+
+def get_explainer(model: tf.keras.Model) -> GradCAMExplainer:
+    """Devuelve (y cachea) el `GradCAMExplainer` asociado a `model`."""
+    explainer = _EXPLAINERS.get(model)
+    if explainer is None:
+        explainer = GradCAMExplainer(model)
+        _EXPLAINERS[model] = explainer
+    return explainer
+
+
+def forward_with_cam(
+    model: tf.keras.Model, batch: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Clasifica y calcula Grad-CAM en una sola pasada hacia delante.
+
+    Cada muestra usa su propia clase predicha (argmax) como objetivo.
+
+    Args:
+        model: Modelo Keras de clasificación.
+        batch: Batch preprocesado (N, H, W, 1) en float32.
 
     Returns:
-        Imagen RGB (target_size, target_size, 3) con el heatmap superpuesto.
+        probs: Probabilidades (N, n_clases).
+        heatmaps: Mapas Grad-CAM (N, h, w) normalizados a [0, 1], con la
+            resolución de la última capa convolucional.
 
     Raises:
         ValueError: Si el modelo no contiene capas convolucionales.
     """
-    # Preprocesar y ejecutar predicción
-    img = preprocess(array)  # shape (1, H, W, C)
-    model = model_fun()
-    preds = model.predict(img, verbose=0)
-    class_idx = int(np.argmax(preds[0]))
+    return get_explainer(model)(batch)
 
-    # Localizar la última capa convolucional
-    last_conv_layer = None
-    for layer in reversed(model.layers):
-        if isinstance(
-            layer,
-            (
-                tf.keras.layers.Conv2D,
-                tf.keras.layers.SeparableConv2D,
-                tf.keras.layers.DepthwiseConv2D,
-            ),
-        ):
-            last_conv_layer = layer
-            break
-    if last_conv_layer is None:
-        raise ValueError("El modelo no contiene capas convolucionales.")
-
-    # Modelo para obtener (activaciones_conv, salida)
-    grad_model = tf.keras.models.Model(
-        inputs=model.input,
-        outputs=[last_conv_layer.output, model.output],
-    )
-
-    # Calcular gradientes
-    with tf.GradientTape() as tape:
-        conv_outputs, predictions = grad_model(img, training=False)
-        if isinstance(predictions, (list, tuple)):
-            predictions = predictions[0]
-        loss = predictions[:, class_idx]
-
-    grads = tape.gradient(loss, conv_outputs)
-    pooled_grads = tf.reduce_mean(grads, axis=(0, 1, 2))
-
-    # Combinar activaciones y gradientes
-    conv_outputs = conv_outputs[0]  # (H, W, C)
-    heatmap = tf.reduce_sum(pooled_grads * conv_outputs, axis=-1)
-    heatmap = tf.maximum(heatmap, 0)
-    heatmap /= tf.reduce_max(heatmap) + 1e-8
-    heatmap = heatmap.numpy()
 
-    # Redimensionar y colorear
-    heat_u8 = np.uint8(255 * cv2.resize(heatmap, (target_size, target_size)))
-    heat_color = cv2.applyColorMap(heat_u8, cv2.COLORMAP_JET)
+def overlay_heatmap(
+    array: np.ndarray,
+    heatmap: np.ndarray,
+    target_size: int = 512,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """Colorea un mapa Grad-CAM y lo superpone sobre la imagen original.
 
-    # Superponer sobre la imagen base
-    base = cv2.resize(array, (target_size, target_size))
-    base_bgr = cv2.cvtColor(base, cv2.COLOR_RGB2BGR)
-    overlay_bgr = cv2.addWeighted(base_bgr, 0.6, heat_color, 0.4, 0)
-    overlay_rgb = cv2.cvtColor(overlay_bgr, cv2.COLOR_BGR2RGB)
+    Args:
+        array: Imagen base (H, W, 3) RGB o (H, W) en gris, uint8.
+        heatmap: Mapa (h, w) en [0, 1].
+        target_size: Tamaño de la salida (por defecto 512).
+        out: Buffer uint8 (target_size, target_size, 3) donde escribir el
+            resultado (p. ej. un slot de memoria compartida).
+
+    Returns:
+        Imagen RGB (target_size, target_size, 3) con el heatmap superpuesto.
+    """
+    # Redimensionar y colorear
+    with span("explain.colormap"):
+        heat_u8 = np.uint8(255 * cv2.resize(heatmap, (target_size, target_size)))
+        heat_color = cv2.applyColorMap(heat_u8, cv2.COLORMAP_JET)
+
+    with span("explain.overlay"):
+        # Superponer sobre la imagen base
+        base = cv2.resize(array, (target_size, target_size))
+        code = cv2.COLOR_GRAY2BGR if base.ndim == 2 else cv2.COLOR_RGB2BGR
+        base_bgr = cv2.cvtColor(base, code)
+        overlay_bgr = cv2.addWeighted(base_bgr, 0.6, heat_color, 0.4, 0)
+        overlay_rgb = cv2.cvtColor(overlay_bgr, cv2.COLOR_BGR2RGB, dst=out)
 
     return overlay_rgb
 
+
+def grad_cam(array: np.ndarray, target_size: int = 512) -> np.ndarray:
+    """Genera un mapa Grad-CAM y lo superpone sobre la imagen original.
+
+    Args:
+        array: Imagen de entrada (H, W, C) en formato RGB o escala de grises.
+        target_size: Tamaño al que redimensionar la salida (por defecto 512).
+
+    Returns:
+        Imagen RGB (target_size, target_size, 3) con el heatmap superpuesto.
+
+    Raises:
+        ValueError: Si el modelo no contiene capas convolucionales.
+    """
+    img = preprocess(array)  # shape (1, H, W, C)
+    _probs, heatmaps = forward_with_cam(model_fun(), img)
+    return overlay_heatmap(array, heatmaps[0], target_size)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Exportación del modelo Keras a TFLite / ONNX y verificación de paridad.
+
+Ejemplo:
+    paths = export_model("model/conv_MLP_84.h5")   # .tflite y .onnx al lado
+    for result in check_parity("model/conv_MLP_84.h5"):
+        print(result.backend, result.max_abs_diff, result.ok)
+
+La exportación a ONNX requiere `tf2onnx` (`pip install tf2onnx onnxruntime`).
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Sequence
+
+import numpy as np
+
+from .backends import BACKEND_SUFFIXES, KerasBackend, backend_path, load_backend
+from .model import REGISTRY, resolve_model_path
+
+# Formatos a los que se puede exportar el `.h5`.
+EXPORT_FORMATS: tuple[str, ...] = ("tflite", "onnx")
+
+# Diferencia absoluta máxima admitida en las probabilidades.
+DEFAULT_PARITY_ATOL = 1e-4
+
+# Opset de ONNX usado por `export_onnx`.
+ONNX_OPSET = 17
+
+
+@dataclass
+class ParityResult:
+    """Comparación de un motor exportado contra el modelo Keras."""
+
+    backend: str
+    path: Path
+    samples: int
+    max_abs_diff: float
+    argmax_agreement: float
+    atol: float
+
+    @property
+    def ok(self) -> bool:
+        return self.max_abs_diff <= self.atol and self.argmax_agreement == 1.0
+
+
+def export_tflite(model: Any, path: str | os.PathLike[str]) -> Path:
+    """Convierte un modelo Keras a TFLite (float32, batch variable)."""
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    path = Path(path)
+    path.write_bytes(converter.convert())
+    return path
+
+
+def export_onnx(
+    model: Any, path: str | os.PathLike[str], opset: int = ONNX_OPSET
+) -> Path:
+    """Convierte un modelo Keras a ONNX con `tf2onnx` (batch variable).
+
+    Raises:
+        ImportError: Si `tf2onnx` no está instalado.
+    """
+    import tensorflow as tf
+    import tf2onnx
+
+    spec = (tf.TensorSpec((None, *model.input_shape[1:]), tf.float32, name="input"),)
+    path = Path(path)
+    tf2onnx.convert.from_keras(
+        model, input_signature=spec, opset=opset, output_path=str(path)
+    )
+    return path
+
+
+_EXPORTERS = {"tflite": export_tflite, "onnx": export_onnx}
+
+
+def export_model(
+    model_path: str | os.PathLike[str] | None = None,
+    formats: Sequence[str] = EXPORT_FORMATS,
+    out_dir: str | os.PathLike[str] | None = None,
+) -> dict[str, Path]:
+    """Exporta el `.h5` a los formatos pedidos.
+
+    Args:
+        model_path: Modelo Keras (por defecto, `MODEL_PATH`).
+        formats: Subconjunto de `EXPORT_FORMATS`.
+        out_dir: Carpeta de salida; por defecto, la del `.h5` (donde los
+            busca `backends.get_backend`).
+
+    Returns:
+        Ruta generada por formato.
+
+    Raises:
+        ValueError: Si se pide un formato desconocido.
+        ImportError: Si falta el conversor de algún formato.
+    """
+    unknown = set(formats) - set(EXPORT_FORMATS)
+    if unknown:
+        raise ValueError(f"Formatos desconocidos: {sorted(unknown)}")
+
+    source = resolve_model_path(model_path)
+    model = REGISTRY.get(source)
+    folder = Path(out_dir) if out_dir is not None else source.parent
+    folder.mkdir(parents=True, exist_ok=True)
+    return {
+        fmt: _EXPORTERS[fmt](model, folder / f"{source.stem}{BACKEND_SUFFIXES[fmt]}")
+        for fmt in formats
+    }
+
+
+def parity_batch(
+    input_shape: Sequence[int], samples: int = 8, seed: int = 0
+) -> np.ndarray:
+    """Batch sintético (N, H, W, 1) en [0, 1] para comparar motores."""
+    rng = np.random.default_rng(seed)
+    return rng.random((samples, *input_shape), dtype=np.float32)
+
+
+def sample_batch(folder: str | os.PathLike[str], limit: int = 16) -> np.ndarray:
+    """Preprocesa (con `preprocess`) hasta `limit` imágenes de `folder`.
+
+    Las imágenes ilegibles se omiten. Sirve como batch de paridad o de
+    calibración con datos reales.
+
+    Returns:
+        Batch (N, H, W, 1) float32.
+
+    Raises:
+        ValueError: Si no hay ninguna imagen legible.
+    """
+    from .io_imgs import read_image_file
+    from .preprocess import preprocess
+
+    exts = {".dcm", ".jpg", ".jpeg", ".png", ".tif", ".tiff"}
+    files = sorted(p for p in Path(folder).rglob("*") if p.suffix.lower() in exts)
+    batches = []
+    for path in files:
+        if len(batches) >= limit:
+            break
+        try:
+            batches.append(preprocess(read_image_file(path)[0]))
+        except ValueError:
+            continue
+    if not batches:
+        raise ValueError(f"No hay imágenes legibles en {folder}")
+    return np.concatenate(batches)
+
+
+def check_parity(
+    model_path: str | os.PathLike[str] | None = None,
+    backends: Sequence[str] = EXPORT_FORMATS,
+    batch: np.ndarray | None = None,
+    atol: float = DEFAULT_PARITY_ATOL,
+    paths: dict[str, Path] | None = None,
+) -> list[ParityResult]:
+    """Compara las probabilidades de los motores exportados con Keras.
+
+    Args:
+        model_path: Modelo Keras de referencia (por defecto, `MODEL_PATH`).
+        backends: Motores a comprobar (deben estar exportados).
+        batch: Batch preprocesado (N, H, W, 1); por defecto `parity_batch`.
+        atol: Diferencia absoluta máxima admitida.
+        paths: Rutas de los modelos exportados (por defecto, junto al `.h5`).
+
+    Returns:
+        Un `ParityResult` por motor; `ok` indica si pasa la tolerancia y
+        coincide la clase predicha en todas las muestras.
+
+    Raises:
+        FileNotFoundError: Si falta algún modelo exportado.
+    """
+    model = REGISTRY.get(model_path)
+    if batch is None:
+        batch = parity_batch(model.input_shape[1:])
+    reference = KerasBackend(model).predict(batch)
+
+    results = []
+    for name in backends:
+        path = (paths or {}).get(name) or backend_path(name, model_path)
+        if not path.exists():
+            raise FileNotFoundError(f"No existe el modelo exportado: {path}")
+        probs = load_backend(path).predict(batch)
+        results.append(
+            ParityResult(
+                backend=name,
+                path=path,
+                samples=len(batch),
+                max_abs_diff=float(np.max(np.abs(probs - reference))),
+                argmax_agreement=float(
+                    np.mean(probs.argmax(axis=1) == reference.argmax(axis=1))
+                ),
+                atol=atol,
+            )
+        )
+    return results
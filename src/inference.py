@@ -1,53 +1,510 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-"""Inferencia: predicción de clase y generación de Grad‑CAM."""
+"""Inferencia: predicción de clase y generación de Grad‑CAM.
+
+`classify_batch` calcula solo probabilidades con el motor elegido
+(Keras, TFLite u ONNX Runtime; ver `backends`). Las funciones con
+heatmap usan siempre Keras, porque Grad‑CAM necesita gradientes.
+
+El Grad‑CAM es opcional: `predict`, `predict_batch`, `predict_study` y
+`explain_batch` aceptan `heatmap` (`True`/`"always"`, `False`/`"never"`
+o `"auto"`, ver `HeatmapPolicy`). Sin heatmap se clasifica con el motor
+de `classify_batch` y se omite la pasada de gradientes; en `auto` solo se
+explican las imágenes no normales o poco seguras. Un heatmap omitido se
+puede calcular después con `explain.grad_cam(array)`.
+
+Regla común: un resultado con heatmap lleva las probabilidades de la
+pasada de Keras que generó su Grad‑CAM (y se etiqueta `keras`), así el
+mapa siempre explica la clase informada; uno sin heatmap lleva las del
+motor de `classify_batch`.
+
+`predict` y `predict_batch` devuelven `Prediction`: el vector completo de
+probabilidades, la clase, el modelo y los tiempos, serializable a JSONL o
+CSV. Sigue desempaquetándose como `(label, proba, heatmap)`.
+"""
 
 from __future__ import annotations
 
+import json
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Iterable, Iterator, Sequence
+
 import numpy as np
 
-from .explain import grad_cam
+from .backends import backend_name, backend_sha256, get_backend
+from .config import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_HEATMAP_MIN_CONFIDENCE,
+    DEFAULT_HEATMAP_POLICY,
+)
+from .explain import forward_with_cam, overlay_heatmap
 from .model import model_fun
-from .preprocess import preprocess
+from .preprocess import PREPROCESS_DEFAULTS, Preprocessor
+from .telemetry import count, span
 
 LABELS: tuple[str, ...] = ("bacteriana", "normal", "viral")
 
+# Clase que la política `auto` no explica si la confianza es alta.
+NORMAL_LABEL = "normal"
+
+# Cuándo calcular el Grad‑CAM (ver `HeatmapPolicy`).
+HEATMAP_POLICIES: tuple[str, ...] = ("always", "never", "auto")
+
+# Preprocesamiento de los batches del modelo: el buffer de cada hilo se
+# reutiliza entre llamadas (el modelo lo consume antes de la siguiente).
+_PREPROCESSOR = Preprocessor(**PREPROCESS_DEFAULTS, pooled=True)
+
+
+@dataclass(frozen=True)
+class HeatmapPolicy:
+    """Cuándo calcular el Grad‑CAM de una imagen.
+
+    - `always`: siempre.
+    - `never`: nunca; solo clasificación, sin pasada de gradientes.
+    - `auto`: solo si la clase predicha no es `normal` o su probabilidad
+      (en %) es menor que `min_confidence`.
+
+    Raises:
+        ValueError: Si `mode` no está en `HEATMAP_POLICIES`.
+    """
+
+    mode: str = DEFAULT_HEATMAP_POLICY
+    min_confidence: float = DEFAULT_HEATMAP_MIN_CONFIDENCE
+
+    def __post_init__(self) -> None:
+        if self.mode not in HEATMAP_POLICIES:
+            raise ValueError(
+                f"Política de heatmap desconocida: {self.mode} "
+                f"(opciones: {', '.join(HEATMAP_POLICIES)})"
+            )
+
+    def wants(self, probs: np.ndarray) -> bool:
+        """Indica si la imagen con probabilidades `probs` necesita heatmap."""
+        if self.mode != "auto":
+            return self.mode == "always"
+        label, proba = summarize(probs)
+        return label != NORMAL_LABEL or proba < self.min_confidence
+
+
+HeatmapArg = HeatmapPolicy | str | bool
+
+
+def heatmap_policy(value: HeatmapArg = True) -> HeatmapPolicy:
+    """Normaliza `value`: política, nombre de modo o `True`/`False`."""
+    if isinstance(value, HeatmapPolicy):
+        return value
+    if isinstance(value, bool):
+        return HeatmapPolicy("always" if value else "never")
+    return HeatmapPolicy(value.lower())
+
+
+def warm_up() -> None:
+    """Carga el modelo y compila su paso de inferencia con un batch vacío.
+
+    Útil al arrancar procesos de larga duración (GUI, servidor) para que
+    la primera predicción real no pague la carga ni el trazado del grafo.
+    """
+    model = model_fun()
+    shape = (1, *model.input_shape[1:])
+    forward_with_cam(model, np.zeros(shape, dtype=np.float32))
+
+
+def label_for(class_idx: int) -> str:
+    """Devuelve la etiqueta en español para un índice de clase."""
+    return LABELS[class_idx] if 0 <= class_idx < len(LABELS) else f"class_{class_idx}"
+
+
+def explain_batch(
+    arrays: Sequence[np.ndarray],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    out: Sequence[np.ndarray] | None = None,
+    heatmap: HeatmapArg = True,
+) -> list[tuple[np.ndarray, np.ndarray | None]]:
+    """Calcula probabilidades completas y Grad‑CAM de varias imágenes.
+
+    Las imágenes se agrupan en batches de hasta `batch_size`; cada batch
+    se preprocesa en paralelo en un buffer (N, 512, 512, 1) reutilizado
+    entre llamadas. Con `heatmap="always"` pasa una sola vez por el modelo
+    (probabilidades y Grad‑CAM juntos). Si no, se clasifica con el motor
+    de `classify_batch` y la pasada de gradientes solo se hace para las
+    imágenes que la política pida; sus probabilidades se sustituyen por
+    las de esa pasada de Keras, de modo que el Grad‑CAM explica la clase
+    devuelta (el motor solo decide a qué imágenes calcularlo).
+
+    Args:
+        arrays: Imágenes de entrada (H, W, C) en RGB o escala de grises.
+        batch_size: Número máximo de imágenes por llamada al modelo.
+        out: Un buffer uint8 (512, 512, 3) por imagen donde escribir su
+            heatmap; por defecto se crean nuevos.
+        heatmap: Política de Grad‑CAM (ver `heatmap_policy`).
+
+    Returns:
+        Lista de tuplas `(probs, heatmap)` en el orden de entrada: vector
+        de probabilidades por clase (ordenado como LABELS) e imagen RGB
+        con el Grad‑CAM superpuesto, o `None` si la política lo omitió. Las
+        probabilidades son las de Keras si hay heatmap y, si no, las del
+        motor.
+
+    Raises:
+        ValueError: Si `batch_size` no es positivo o la política no existe.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size debe ser >= 1.")
+
+    policy = heatmap_policy(heatmap)
+    engine = get_backend() if policy.mode != "always" else None
+    results: list[tuple[np.ndarray, np.ndarray | None]] = []
+    for start in range(0, len(arrays), batch_size):
+        chunk = arrays[start : start + batch_size]
+
+        with span("inference.batch", size=len(chunk), heatmap=policy.mode):
+            with span("inference.preprocess"):
+                batch = _PREPROCESSOR(chunk)  # (N, H, W, 1)
+            if engine is None:
+                # Pasada única: probs y Grad‑CAM de todo el batch
+                probs, cams = forward_with_cam(model_fun(), batch)
+                wanted = list(range(len(chunk)))
+            else:
+                probs = engine.predict(batch)
+                wanted = [i for i, p in enumerate(probs) if policy.wants(p)]
+                cams = []
+                if wanted:
+                    # Probs de la misma pasada que el Grad‑CAM (ver `predict`)
+                    keras_probs, cams = forward_with_cam(model_fun(), batch[wanted])
+                    probs = np.array(probs, dtype=np.float32)
+                    probs[wanted] = keras_probs
+            cam_of = dict(zip(wanted, cams))
+
+            for i, (array, p) in enumerate(zip(chunk, probs)):
+                if i not in cam_of:
+                    results.append((p, None))
+                    continue
+                dst = out[start + i] if out is not None else None
+                results.append((p, overlay_heatmap(array, cam_of[i], out=dst)))
+        count("inference.images", len(chunk))
+        count("inference.heatmaps", len(cam_of))
+    return results
+
+
+def classify_batch(
+    arrays: Sequence[np.ndarray],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    backend: str | None = None,
+) -> np.ndarray:
+    """Calcula solo las probabilidades de varias imágenes (sin Grad‑CAM).
+
+    Args:
+        arrays: Imágenes de entrada (H, W, C) en RGB o escala de grises.
+        batch_size: Número máximo de imágenes por llamada al motor.
+        backend: `keras`, `tflite` u `onnx`; por defecto `UAO_BACKEND` o
+            `config.DEFAULT_BACKEND`.
+
+    Returns:
+        Probabilidades (N, n_clases) en el orden de entrada.
+
+    Raises:
+        ValueError: Si `batch_size` no es positivo o el motor no existe.
+        FileNotFoundError: Si falta el modelo exportado del motor.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size debe ser >= 1.")
+
+    engine = get_backend(backend)
+    probs: list[np.ndarray] = []
+    for start in range(0, len(arrays), batch_size):
+        chunk = arrays[start : start + batch_size]
+        with span("inference.classify", size=len(chunk), backend=engine.name):
+            with span("inference.preprocess"):
+                batch = _PREPROCESSOR(chunk)
+            probs.append(engine.predict(batch))
+        count("inference.images", len(chunk))
+    if not probs:
+        return np.empty((0, len(LABELS)), dtype=np.float32)
+    return np.concatenate(probs)
+
+
+def summarize(probs: np.ndarray) -> tuple[str, float]:
+    """Devuelve (etiqueta, probabilidad en %) de un vector de probabilidades."""
+    class_idx = int(np.argmax(probs))
+    proba = float(np.clip(np.max(probs) * 100.0, 0.0, 100.0))
+    return label_for(class_idx), proba
+
+
+# Columnas de `Prediction.to_csv_row` (una por clase: `p_<etiqueta>`).
+PREDICTION_CSV_FIELDS: tuple[str, ...] = (
+    "label",
+    "proba",
+    "class_index",
+    *(f"p_{label}" for label in LABELS),
+    "backend",
+    "model_sha256",
+    "inference_ms",
+)
+
+
+@dataclass(slots=True)
+class Prediction:
+    """Resultado completo de `predict` para una imagen.
+
+    Se desempaqueta como la tupla clásica `(label, proba, heatmap)`; el
+    resto de campos conserva lo que antes se descartaba, para no volver a
+    ejecutar el modelo al analizar los resultados.
 
-def predict(array: np.ndarray) -> tuple[str, float, np.ndarray]:
+    Attributes:
+        label: Etiqueta predicha (en español).
+        proba: Probabilidad de la clase predicha en porcentaje.
+        heatmap: Imagen RGB con el Grad‑CAM, o `None` si se omitió.
+        probs: Probabilidades por clase (ordenadas como `LABELS`).
+        class_index: Índice de la clase predicha (argmax de `probs`).
+        model_sha256: SHA-256 del archivo del motor que calculó `probs`
+            (el `.h5` o el `.tflite`/`.onnx` exportado), si estaba cargado.
+        timings: Tiempos en milisegundos (`inference_ms` en `predict`;
+            `latency_ms` en `aio`, con lectura y espera incluidas).
+        backend: Motor que calculó `probs` (`keras`, `tflite`, `onnx`...).
+    """
+
+    label: str
+    proba: float
+    heatmap: np.ndarray | None
+    probs: np.ndarray
+    class_index: int
+    model_sha256: str | None = None
+    timings: dict[str, float] = field(default_factory=dict)
+    backend: str | None = None
+
+    @classmethod
+    def from_probs(
+        cls,
+        probs: np.ndarray,
+        heatmap: np.ndarray | None = None,
+        model_sha256: str | None = None,
+        timings: dict[str, float] | None = None,
+        backend: str | None = None,
+    ) -> Prediction:
+        """Construye el resultado a partir del vector de probabilidades."""
+        probs = np.asarray(probs, dtype=np.float32)
+        label, proba = summarize(probs)
+        return cls(
+            label,
+            proba,
+            heatmap,
+            probs,
+            int(np.argmax(probs)),
+            model_sha256,
+            dict(timings or {}),
+            backend,
+        )
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter((self.label, self.proba, self.heatmap))
+
+    def __len__(self) -> int:
+        return 3
+
+    def __getitem__(self, index: int | slice) -> Any:
+        return (self.label, self.proba, self.heatmap)[index]
+
+    def top_k(self, k: int = len(LABELS)) -> list[tuple[str, float]]:
+        """Las `k` clases más probables como `(etiqueta, probabilidad)`."""
+        order = np.argsort(self.probs)[::-1][:k]
+        return [(label_for(int(i)), float(self.probs[i])) for i in order]
+
+    def to_dict(self, top_k: int | None = None) -> dict[str, Any]:
+        """Diccionario serializable (sin el heatmap).
+
+        Args:
+            top_k: Si se indica, añade `top_k` con las `k` clases más
+                probables en orden descendente.
+        """
+        record: dict[str, Any] = {
+            "label": self.label,
+            "proba": round(self.proba, 4),
+            "class_index": self.class_index,
+            "probs": {
+                label_for(i): round(float(p), 6) for i, p in enumerate(self.probs)
+            },
+            "backend": self.backend,
+            "model_sha256": self.model_sha256,
+            "timings": {k: round(v, 3) for k, v in self.timings.items()},
+        }
+        if top_k is not None:
+            record["top_k"] = [[name, round(p, 6)] for name, p in self.top_k(top_k)]
+        return record
+
+    def to_json(self, top_k: int | None = None) -> str:
+        """Una línea JSON compacta (formato JSONL) con `to_dict`."""
+        return json.dumps(
+            self.to_dict(top_k), ensure_ascii=False, separators=(",", ":")
+        )
+
+    def to_csv_row(self) -> list[Any]:
+        """Fila alineada con `PREDICTION_CSV_FIELDS`."""
+        return [
+            self.label,
+            f"{self.proba:.4f}",
+            self.class_index,
+            *(f"{float(p):.6f}" for p in self.probs),
+            self.backend or "",
+            self.model_sha256 or "",
+            _format_ms(self.timings.get("inference_ms")),
+        ]
+
+
+def _format_ms(value: float | None) -> str:
+    return "" if value is None else f"{value:.3f}"
+
+
+def _backend_tag(heatmap: np.ndarray | None) -> dict[str, str | None]:
+    """Motor que calculó las probabilidades de un resultado y su SHA-256.
+
+    Con heatmap, la pasada de Keras del Grad‑CAM; sin él, el motor de
+    `classify_batch` (`get_backend`).
+    """
+    name = "keras" if heatmap is not None else backend_name()
+    return {"backend": name, "model_sha256": backend_sha256(name)}
+
+
+def predict_batch(
+    arrays: Sequence[np.ndarray],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    heatmap: HeatmapArg = True,
+) -> list[Prediction]:
+    """Predice la clase y genera el Grad‑CAM de varias imágenes.
+
+    Ver `explain_batch` para el agrupamiento en batches. `inference_ms`
+    es el tiempo total repartido entre las imágenes.
+
+    Args:
+        arrays: Imágenes de entrada (H, W, C) en RGB o escala de grises.
+        batch_size: Número máximo de imágenes por llamada al modelo.
+        heatmap: Política de Grad‑CAM (ver `heatmap_policy`).
+
+    Returns:
+        Un `Prediction` por imagen, en el orden de entrada.
+
+    Raises:
+        ValueError: Si `batch_size` no es positivo.
+    """
+    policy = heatmap_policy(heatmap)
+    start = time.perf_counter()
+    outputs = explain_batch(arrays, batch_size, heatmap=policy)
+    per_image = (time.perf_counter() - start) * 1000.0 / max(len(outputs), 1)
+    timings = {"inference_ms": per_image}
+    return [
+        Prediction.from_probs(probs, cam, timings=timings, **_backend_tag(cam))
+        for probs, cam in outputs
+    ]
+
+
+@dataclass
+class StudyPrediction:
+    """Resultado de un estudio de varios frames (p. ej. DICOM multi-frame).
+
+    El resultado del estudio es la media de las probabilidades por frame.
+    """
+
+    label: str
+    proba: float
+    probs: np.ndarray
+    frame_probs: np.ndarray
+    heatmaps: list[np.ndarray | None]
+
+    @property
+    def frames(self) -> list[tuple[str, float, np.ndarray | None]]:
+        """`(label, proba, heatmap)` de cada frame, como en `predict_batch`."""
+        return [
+            (*summarize(probs), heatmap)
+            for probs, heatmap in zip(self.frame_probs, self.heatmaps)
+        ]
+
+
+def predict_study(
+    frames: Iterable[np.ndarray],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    heatmap: HeatmapArg = True,
+) -> StudyPrediction:
+    """Predice cada frame de un estudio y agrega el resultado.
+
+    Los frames se consumen de forma perezosa (p. ej. desde
+    `io_imgs.iter_frames`) en batches de hasta `batch_size`, así que en
+    memoria solo hay un batch de frames decodificados a la vez.
+
+    Args:
+        frames: Frames del estudio (H, W) o (H, W, 3) uint8.
+        batch_size: Número máximo de frames por llamada al modelo.
+        heatmap: Política de Grad‑CAM por frame (ver `heatmap_policy`).
+
+    Returns:
+        `StudyPrediction` con la etiqueta y probabilidades del estudio
+        (media por clase), las probabilidades de cada frame y sus heatmaps
+        (`None` en los frames que la política omitió).
+
+    Raises:
+        ValueError: Si no hay frames o `batch_size` no es positivo.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size debe ser >= 1.")
+
+    frame_probs: list[np.ndarray] = []
+    heatmaps: list[np.ndarray | None] = []
+    it = iter(frames)
+    while chunk := list(islice(it, batch_size)):
+        for probs, cam in explain_batch(chunk, batch_size, heatmap=heatmap):
+            frame_probs.append(probs)
+            heatmaps.append(cam)
+    if not frame_probs:
+        raise ValueError("El estudio no contiene frames.")
+
+    stacked = np.stack(frame_probs)
+    probs = stacked.mean(axis=0)
+    return StudyPrediction(*summarize(probs), probs, stacked, heatmaps)
+
+
+def predict(
+    array: np.ndarray,
+    batch: np.ndarray | None = None,
+    *,
+    heatmap: HeatmapArg = True,
+) -> Prediction:
     """Predice la clase de una imagen y genera el heatmap Grad‑CAM.
 
+    Un solo preprocesamiento y una sola pasada hacia delante: las
+    probabilidades, la clase y el Grad‑CAM salen de la misma ejecución.
+    Con `heatmap=False` (o `"auto"` y una imagen normal segura) solo se
+    clasifica, sin pasada de gradientes.
+
     Args:
         array: Imagen de entrada (H, W, C) en RGB o escala de grises.
+        batch: Resultado de `preprocess(array)` ya calculado (opcional);
+            si se pasa, no se vuelve a preprocesar.
+        heatmap: Política de Grad‑CAM (ver `heatmap_policy`).
 
     Returns:
+        `Prediction`, que se desempaqueta como `(label, proba, heatmap)`:
         label: Etiqueta predicha (en español).
         proba: Probabilidad de la clase predicha en porcentaje [0.0, 100.0].
-        heatmap: Imagen RGB (H, W, 3 aprox. tras resize) con Grad‑CAM.
+        heatmap: Imagen RGB (H, W, 3 aprox. tras resize) con Grad‑CAM, o
+            `None` si la política lo omitió.
+        Además lleva `probs` (todas las clases), `class_index`,
+        `backend`, `model_sha256` y `timings`.
 
     Notes:
         - `proba` se calcula como el máximo de `softmax` * 100.
         - El tamaño/shape del `heatmap` depende de la implementación de
-          `grad_cam` (por defecto, 512 x 512 en nuestra versión).
+          `overlay_heatmap` (por defecto, 512 x 512 en nuestra versión).
     """
-    # Preprocesar para el modelo
-    batch = preprocess(array)  # (1, H, W, C)
-
-    # Cargar/crear el modelo y predecir
-    model = model_fun()
-    probs = model.predict(batch, verbose=0)[0]
-
-    # Índice y etiqueta
-    class_idx = int(np.argmax(probs))
-    label = (
-        LABELS[class_idx] if 0 <= class_idx < len(LABELS) else f"class_{class_idx}"
-    )
-
-    # Probabilidad como porcentaje
-    proba = float(np.max(probs) * 100.0)
-    proba = float(np.clip(proba, 0.0, 100.0))
-
-    # Grad‑CAM (sobre la imagen original)
-    heatmap = grad_cam(array)
-
-    return label, proba, heatmap
+    policy = heatmap_policy(heatmap)
+    if batch is None:
+        return predict_batch([array], batch_size=1, heatmap=policy)[0]
 
+    start = time.perf_counter()
+    probs, cam = None, None
+    if policy.mode != "always":
+        probs = get_backend().predict(batch)[0]
+    if probs is None or policy.wants(probs):
+        all_probs, heatmaps = forward_with_cam(model_fun(), batch)
+        probs, cam = all_probs[0], overlay_heatmap(array, heatmaps[0])
+    timings = {"inference_ms": (time.perf_counter() - start) * 1000.0}
+    return Prediction.from_probs(probs, cam, timings=timings, **_backend_tag(cam))
@@ -4,18 +4,46 @@
 
 - DICOM → RGB `np.ndarray` + `PIL.Image` para mostrar.
 - JPG/PNG → RGB `np.ndarray` + `PIL.Image`.
+- Bytes en memoria (DICOM o imagen codificada) → lo mismo, sin pasar por disco.
+- Ruta rápida para inferencia: archivo → gris uint8 a la resolución del
+  modelo (`read_model_gray`), sin RGB intermedio a resolución completa.
+- Estudios de varias imágenes (DICOM multi-frame, TIFF multipágina) →
+  un frame cada vez (`iter_frames`), sin cargar el volumen completo.
+
+`pydicom` se importa solo al leer el primer DICOM.
 """
 
 from __future__ import annotations
 
+import io
+import logging
 from pathlib import Path
-from typing import Tuple
+from typing import TYPE_CHECKING, Iterator, Tuple
 
 import cv2
 import numpy as np
-import pydicom
 from PIL import Image
 
+from .telemetry import span
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    import pydicom
+
+# Extensiones de imagen (no DICOM) que decodifica OpenCV.
+_RASTER_EXTS = frozenset({".jpg", ".jpeg", ".png", ".tif", ".tiff"})
+
+# Extensiones que pueden contener varios frames.
+_MULTI_FRAME_EXTS = frozenset({".dcm", ".tif", ".tiff"})
+
+# Factores de reducción al decodificar con OpenCV (mayor primero).
+_REDUCED_GRAYSCALE: tuple[tuple[int, int], ...] = (
+    (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+)
+
 
 def _to_uint8(img: np.ndarray) -> np.ndarray:
     """Escala un array float/integro a rango [0, 255] y lo castea a uint8."""
@@ -34,11 +62,178 @@ def _to_uint8(img: np.ndarray) -> np.ndarray:
     return img.astype(np.uint8)
 
 
+def _rescale_float(
+    pixels: np.ndarray, slope: float, intercept: float, monochrome1: bool
+) -> np.ndarray:
+    """Rescale, inversión MONOCHROME1 y paso a 8 bits con arrays float32.
+
+    Implementación de referencia: hace varias copias float32 de la imagen
+    completa. Se usa solo cuando no aplica `_rescale_lut`.
+    """
+    img = pixels.astype("float32", copy=False)
+
+    # Rescale (slope/intercept) si están presentes
+    if slope != 1.0 or intercept != 0.0:
+        img = img * slope + intercept
+
+    # Invertir MONOCHROME1 (blanco = valores bajos)
+    if monochrome1:
+        img = np.max(img) - img
+
+    return _to_uint8(img)
+
+
+def _rescale_lut(
+    pixels: np.ndarray, slope: float, intercept: float, monochrome1: bool
+) -> np.ndarray:
+    """Igual que `_rescale_float`, pero con una tabla (LUT) de 8/16 bits.
+
+    Las mismas operaciones float32 se aplican a cada valor posible del tipo
+    entero (≤ 65 536 entradas) en lugar de a cada píxel, y la imagen se
+    convierte con una sola indexación a uint8. Como rescale e inversión son
+    monótonos, el mínimo y el máximo de la imagen transformada salen de los
+    extremos crudos, así que el resultado es idéntico bit a bit al de la
+    ruta float sin crear copias float de la imagen.
+    """
+    udtype = np.dtype(f"u{pixels.itemsize}")
+    index = pixels.view(udtype)
+    # Todos los valores posibles, en el orden de su representación sin signo
+    lut = np.arange(1 << (8 * pixels.itemsize), dtype=udtype)
+    lut = lut.view(pixels.dtype).astype(np.float32)
+    ends = np.array([pixels.min(), pixels.max()], dtype=pixels.dtype).view(udtype)
+
+    if slope != 1.0 or intercept != 0.0:
+        lut = lut * slope + intercept
+    if monochrome1:
+        lut = np.max(lut[ends]) - lut
+
+    vmin = float(np.min(lut[ends]))
+    vmax = float(np.max(lut[ends]))
+    if vmax <= vmin:  # imagen plana
+        return np.zeros(pixels.shape, dtype=np.uint8)
+
+    lut = (lut - vmin) / (vmax - vmin)
+    lut = (lut * 255.0).clip(0, 255).astype(np.uint8)
+    return lut[index]  # indexación por bloques: sin copia intp del índice
+
+
+def _pixels_to_uint8(
+    pixels: np.ndarray, slope: float, intercept: float, monochrome1: bool
+) -> np.ndarray:
+    """Lleva los píxeles crudos de un DICOM a uint8 (vía LUT si es posible)."""
+    if (
+        pixels.size
+        and pixels.dtype.kind in "ui"
+        and pixels.itemsize <= 2
+        and pixels.dtype.isnative
+    ):
+        return _rescale_lut(pixels, slope, intercept, monochrome1)
+    return _rescale_float(pixels, slope, intercept, monochrome1)
+
+
+def _dicom_to_uint8(
+    ds: pydicom.Dataset, pixels: np.ndarray | None = None
+) -> np.ndarray:
+    """Convierte un dataset DICOM a gris uint8 a resolución completa.
+
+    En un DICOM multi-frame se usa solo el primer frame (ver `iter_frames`
+    para recorrerlos todos).
+
+    Args:
+        ds: Dataset (basta con la cabecera si se pasa `pixels`).
+        pixels: Píxeles ya decodificados; si faltan, se usa `ds.pixel_array`.
+    """
+    if pixels is None:
+        try:
+            with span("io.decode", format="dicom"):
+                pixels = ds.pixel_array
+        except AttributeError:
+            raise ValueError(
+                "El DICOM no contiene datos de imagen (pixel_array)."
+            ) from None
+    if _dicom_frames(ds) > 1:
+        pixels = pixels[0]
+
+    with span("io.rescale"):
+        slope = float(getattr(ds, "RescaleSlope", 1.0))
+        intercept = float(getattr(ds, "RescaleIntercept", 0.0))
+        photometric = str(getattr(ds, "PhotometricInterpretation", "")).upper()
+        return _pixels_to_uint8(pixels, slope, intercept, photometric == "MONOCHROME1")
+
+
+def _dicom_frames(ds: pydicom.Dataset) -> int:
+    """Número de frames declarado en la cabecera (1 si no se indica)."""
+    return int(ds.get("NumberOfFrames", 1) or 1)
+
+
+def _dicom_to_rgb(
+    ds: pydicom.Dataset, pixels: np.ndarray | None = None
+) -> Tuple[np.ndarray, Image.Image]:
+    """Convierte un dataset DICOM a RGB uint8 + `PIL.Image` en gris."""
+    arr_u8 = _dicom_to_uint8(ds, pixels)
+
+    with span("io.to_rgb"):
+        rgb = cv2.cvtColor(arr_u8, cv2.COLOR_GRAY2RGB)
+
+    img2show = Image.fromarray(arr_u8)  # en escala de grises para mostrar
+    return rgb, img2show
+
+
+def _load_dicom(source: Path | bytes) -> Tuple[pydicom.Dataset, np.ndarray | None]:
+    """Cabecera y píxeles de un DICOM (píxeles None si hay que decodificar).
+
+    Usa `decode_dicom` (decodificador más rápido instalado para la
+    transfer syntax, leyendo solo cabecera y píxeles). Con pydicom < 3,
+    cabeceras atípicas (sin meta de archivo) o bytes sin preámbulo se
+    recurre a `dcmread` completo.
+
+    Args:
+        source: Ruta del archivo o su contenido en memoria.
+
+    Raises:
+        ValueError: Si el DICOM es ilegible o ningún decodificador puede
+            leer sus píxeles.
+    """
+    import pydicom
+    from pydicom.errors import InvalidDicomError
+
+    from .dicom_decoders import DecodeError, decode_dicom
+
+    in_memory = isinstance(source, bytes)
+    name = "desde memoria" if in_memory else str(source)
+    message = (
+        "No se pudo leer el DICOM desde memoria."
+        if in_memory
+        else f"No se pudo leer el DICOM: {source}"
+    )
+    try:
+        decoded = decode_dicom(source)
+    except DecodeError:
+        raise
+    except (ImportError, AttributeError, NotImplementedError, InvalidDicomError) as exc:
+        # pydicom < 3, sin file_meta o sin preámbulo: lectura completa
+        logger.debug("decode_dicom no aplicable (%s): %r", name, exc)
+    except Exception as exc:  # cabecera ilegible
+        raise ValueError(message) from exc
+    else:
+        return decoded.header, decoded.pixels
+
+    try:
+        with span("io.parse", format="dicom"):
+            if in_memory:
+                return pydicom.dcmread(io.BytesIO(source), force=True), None
+            return pydicom.dcmread(str(source)), None
+    except Exception as exc:  # pydicom lanza distintos tipos
+        raise ValueError(message) from exc
+
+
 def read_dicom_file(path: str | Path) -> Tuple[np.ndarray, Image.Image]:
     """Lee un DICOM y lo devuelve como RGB + imagen PIL para visualización.
 
     Aplica RescaleSlope/Intercept si existen y corrige MONOCHROME1
-    (invertido) según `PhotometricInterpretation`.
+    (invertido) según `PhotometricInterpretation`. Los píxeles se
+    decodifican una sola vez y pasan a 8 bits mediante una tabla, de modo
+    que la memoria pico es cercana al tamaño del buffer crudo.
 
     Args:
         path: Ruta al archivo DICOM.
@@ -55,40 +250,45 @@ def read_dicom_file(path: str | Path) -> Tuple[np.ndarray, Image.Image]:
     if not p.exists():
         raise FileNotFoundError(f"No existe el archivo DICOM: {p}")
 
-    try:
-        ds = pydicom.dcmread(str(p))
-    except Exception as exc:  # pydicom lanza distintos tipos
-        raise ValueError(f"No se pudo leer el DICOM: {p}") from exc
+    return _dicom_to_rgb(*_load_dicom(p))
 
-    if not hasattr(ds, "pixel_array"):
-        raise ValueError("El DICOM no contiene datos de imagen (pixel_array).")
 
-    img = ds.pixel_array.astype("float32", copy=False)
+def read_jpg_file(path: str | Path) -> Tuple[np.ndarray, Image.Image]:
+    """Lee JPG/PNG/TIFF y devuelve RGB `np.ndarray` + `PIL.Image`.
 
-    # Rescale (slope/intercept) si están presentes
-    slope = float(getattr(ds, "RescaleSlope", 1.0))
-    intercept = float(getattr(ds, "RescaleIntercept", 0.0))
-    if slope != 1.0 or intercept != 0.0:
-        img = img * slope + intercept
+    De un TIFF multipágina solo se lee la primera página.
 
-    # Invertir MONOCHROME1 (blanco = valores bajos)
-    photometric = str(getattr(ds, "PhotometricInterpretation", "")).upper()
-    if photometric == "MONOCHROME1":
-        img = np.max(img) - img
+    Args:
+        path: Ruta a la imagen (.jpg/.jpeg/.png/.tif/.tiff).
 
-    # A 8 bits y a RGB
-    arr_u8 = _to_uint8(img)
-    rgb = cv2.cvtColor(arr_u8, cv2.COLOR_GRAY2RGB)
+    Returns:
+        rgb: Imagen RGB `np.ndarray` (H, W, 3) en uint8.
+        img2show: `PIL.Image` para mostrar/guardar.
 
-    img2show = Image.fromarray(arr_u8)  # en escala de grises para mostrar
+    Raises:
+        FileNotFoundError: Si el archivo no existe.
+        ValueError: Si OpenCV no puede leer la imagen.
+    """
+    p = Path(path)
+    if not p.exists():
+        raise FileNotFoundError(f"No existe el archivo: {p}")
+
+    with span("io.decode", format=p.suffix.lower()):
+        bgr = cv2.imread(str(p), cv2.IMREAD_COLOR)
+    if bgr is None:
+        raise ValueError(f"No se pudo leer la imagen: {p}")
+
+    with span("io.to_rgb"):
+        rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+    img2show = Image.fromarray(rgb)
     return rgb, img2show
 
 
-def read_jpg_file(path: str | Path) -> Tuple[np.ndarray, Image.Image]:
-    """Lee JPG/PNG y devuelve RGB `np.ndarray` + `PIL.Image`.
+def read_image_file(path: str | Path) -> Tuple[np.ndarray, Image.Image]:
+    """Lee una imagen eligiendo el lector según la extensión.
 
     Args:
-        path: Ruta a la imagen (.jpg/.jpeg/.png).
+        path: Ruta a la imagen (.dcm/.jpg/.jpeg/.png/.tif/.tiff).
 
     Returns:
         rgb: Imagen RGB `np.ndarray` (H, W, 3) en uint8.
@@ -96,18 +296,235 @@ def read_jpg_file(path: str | Path) -> Tuple[np.ndarray, Image.Image]:
 
     Raises:
         FileNotFoundError: Si el archivo no existe.
-        ValueError: Si OpenCV no puede leer la imagen.
+        ValueError: Si la extensión no está soportada o el archivo es ilegible.
+    """
+    p = Path(path)
+    ext = p.suffix.lower()
+    if ext == ".dcm":
+        return read_dicom_file(p)
+    if ext in _RASTER_EXTS:
+        return read_jpg_file(p)
+    raise ValueError(f"Extensión no soportada: {ext}")
+
+
+def _reduced_imread_flag(path: Path | io.BytesIO, size: Tuple[int, int]) -> int:
+    """Flag de `cv2.imread` que decodifica en gris al menor tamaño útil.
+
+    Elige el mayor factor de reducción (8, 4 o 2; en JPEG se aplica en el
+    propio decodificador DCT) que deja la imagen aún mayor o igual que
+    `size`, para que el `resize` posterior siga siendo una reducción.
+    """
+    try:
+        with Image.open(path) as im:  # solo lee la cabecera
+            width, height = im.size
+    except Exception:  # formato que PIL no reconoce: sin reducción
+        return cv2.IMREAD_GRAYSCALE
+    for factor, flag in _REDUCED_GRAYSCALE:
+        if -(-width // factor) >= size[0] and -(-height // factor) >= size[1]:
+            return flag
+    return cv2.IMREAD_GRAYSCALE
+
+
+def read_model_gray(
+    path: str | Path,
+    size: Tuple[int, int] = (512, 512),
+    data: bytes | None = None,
+) -> np.ndarray:
+    """Lee una imagen directamente en gris uint8 a la resolución del modelo.
+
+    Ruta rápida para inferencia: evita el RGB a resolución completa y la
+    vuelta RGB → gris de `preprocess`. Los JPG/PNG se decodifican ya
+    reducidos (`IMREAD_REDUCED_GRAYSCALE_*`) y los DICOM pasan de la LUT
+    de 8 bits a `resize` sin copia RGB. El resultado se pasa tal cual a
+    `preprocess` (que ya no redimensiona) y sirve de base para el heatmap.
+
+    En DICOM el batch resultante es idéntico al de `read_dicom_file` +
+    `preprocess`; en JPG puede diferir en ±1 nivel de gris por la
+    decodificación reducida. No genera imagen para mostrar: la GUI sigue
+    usando `read_image_file`.
+
+    Args:
+        path: Ruta a la imagen (.dcm/.jpg/.jpeg/.png/.tif/.tiff).
+        size: Tamaño objetivo (ancho, alto), como en `preprocess`.
+        data: Contenido de `path` si ya se leyó (p. ej. para la clave de
+            caché); se decodifica desde memoria sin volver a leer el disco.
+
+    Returns:
+        Imagen en gris `np.ndarray` (alto, ancho) uint8.
+
+    Raises:
+        FileNotFoundError: Si el archivo no existe.
+        ValueError: Si la extensión no está soportada o el archivo es ilegible.
+    """
+    p = Path(path)
+    if data is None and not p.exists():
+        raise FileNotFoundError(f"No existe el archivo: {p}")
+
+    ext = p.suffix.lower()
+    if ext == ".dcm":
+        gray = _dicom_to_uint8(*_load_dicom(p if data is None else bytes(data)))
+    elif ext in _RASTER_EXTS:
+        with span("io.decode", format=ext, reduced=True):
+            if data is None:
+                gray = cv2.imread(str(p), _reduced_imread_flag(p, size))
+            else:
+                flag = _reduced_imread_flag(io.BytesIO(data), size)
+                gray = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
+        if gray is None:
+            raise ValueError(f"No se pudo leer la imagen: {p}")
+    else:
+        raise ValueError(f"Extensión no soportada: {ext}")
+
+    if (gray.shape[1], gray.shape[0]) != tuple(size):
+        with span("io.resize"):
+            gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def frame_count(path: str | Path) -> int:
+    """Número de frames (DICOM) o páginas (TIFF) sin decodificar píxeles.
+
+    Raises:
+        FileNotFoundError: Si el archivo no existe.
+        ValueError: Si la cabecera es ilegible.
     """
     p = Path(path)
     if not p.exists():
         raise FileNotFoundError(f"No existe el archivo: {p}")
 
-    bgr = cv2.imread(str(p), cv2.IMREAD_COLOR)
-    if bgr is None:
-        raise ValueError(f"No se pudo leer la imagen: {p}")
+    ext = p.suffix.lower()
+    try:
+        if ext == ".dcm":
+            import pydicom
+
+            ds = pydicom.dcmread(
+                str(p), stop_before_pixels=True, specific_tags=["NumberOfFrames"]
+            )
+            return _dicom_frames(ds)
+        if ext in {".tif", ".tiff"}:
+            with Image.open(p) as im:
+                return int(getattr(im, "n_frames", 1))
+    except Exception as exc:  # pydicom/PIL lanzan distintos tipos
+        raise ValueError(f"No se pudo leer la cabecera: {p}") from exc
+    return 1
 
-    rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
-    img2show = Image.fromarray(rgb)
-    return rgb, img2show
 
+def _iter_dicom_frames(p: Path) -> Iterator[np.ndarray]:
+    """Frames de un DICOM en uint8, normalizados cada uno por separado.
 
+    Usa `dicom_decoders.iter_dicom_frames` (decodificadores preferidos o
+    registrados, frame a frame). Como `_load_dicom`, con pydicom < 3 o
+    cabeceras atípicas se decodifica el volumen completo con `dcmread`.
+    """
+    import pydicom
+    from pydicom.errors import InvalidDicomError
+
+    from .dicom_decoders import DecodeError, iter_dicom_frames
+
+    try:
+        ds, frames = iter_dicom_frames(p)
+    except DecodeError:
+        raise
+    except (ImportError, AttributeError, NotImplementedError, InvalidDicomError) as exc:
+        logger.debug("iter_dicom_frames no aplicable (%s): %r", p, exc)
+        ds = pydicom.dcmread(str(p))
+        with span("io.decode", format="dicom"):
+            volume = ds.pixel_array
+        frames = iter(volume if _dicom_frames(ds) > 1 else volume[None])
+
+    slope = float(getattr(ds, "RescaleSlope", 1.0))
+    intercept = float(getattr(ds, "RescaleIntercept", 0.0))
+    photometric = str(getattr(ds, "PhotometricInterpretation", "")).upper()
+    for frame in frames:  # cada `next` decodifica un frame (con su tramo)
+        with span("io.rescale"):
+            yield _pixels_to_uint8(
+                frame, slope, intercept, photometric == "MONOCHROME1"
+            )
+
+
+def _iter_tiff_pages(p: Path) -> Iterator[np.ndarray]:
+    """Páginas de un TIFF en uint8 (gris o RGB), una a una."""
+    with Image.open(p) as im:
+        for index in range(int(getattr(im, "n_frames", 1))):
+            with span("io.decode", format="tiff"):
+                im.seek(index)
+                if im.mode not in {"L", "RGB"} and not im.mode.startswith(("I", "F")):
+                    page = np.asarray(im.convert("RGB"))
+                else:
+                    page = np.asarray(im)
+            if page.dtype != np.uint8:  # 16 bits, enteros o float: por página
+                with span("io.rescale"):
+                    page = _pixels_to_uint8(page, 1.0, 0.0, False)
+            yield page
+
+
+def iter_frames(path: str | Path) -> Iterator[np.ndarray]:
+    """Recorre los frames de un estudio decodificando uno cada vez.
+
+    DICOM multi-frame y TIFF multipágina se leen frame a frame (con
+    pydicom >= 3 el DICOM no se carga entero en memoria); cada frame se
+    normaliza a 8 bits por separado, no con el mínimo/máximo del volumen.
+    Cualquier otra imagen produce un único frame.
+
+    Args:
+        path: Ruta a la imagen (.dcm/.jpg/.jpeg/.png/.tif/.tiff).
+
+    Yields:
+        Frames `np.ndarray` uint8 en gris (H, W) o RGB (H, W, 3), aptos
+        para `preprocess_batch` y `predict_study`.
+
+    Raises:
+        FileNotFoundError: Si el archivo no existe.
+        ValueError: Si la extensión no está soportada o el archivo es ilegible.
+    """
+    p = Path(path)
+    if not p.exists():
+        raise FileNotFoundError(f"No existe el archivo: {p}")
+
+    ext = p.suffix.lower()
+    if ext not in _MULTI_FRAME_EXTS:
+        yield read_image_file(p)[0]
+        return
+    try:
+        reader = _iter_dicom_frames(p) if ext == ".dcm" else _iter_tiff_pages(p)
+        yield from reader
+    except (FileNotFoundError, ValueError):
+        raise
+    except Exception as exc:  # pydicom/PIL lanzan distintos tipos
+        raise ValueError(f"No se pudo leer los frames de {p}") from exc
+
+
+def is_dicom_bytes(data: bytes) -> bool:
+    """Indica si `data` tiene el preámbulo DICOM estándar (`DICM` en 128)."""
+    return data[128:132] == b"DICM"
+
+
+def read_image_bytes(
+    data: bytes, ext: str | None = None
+) -> Tuple[np.ndarray, Image.Image]:
+    """Decodifica una imagen (DICOM/JPG/PNG) desde bytes en memoria.
+
+    Args:
+        data: Contenido del archivo.
+        ext: Extensión original (p. ej. ".dcm"); si falta, se detecta DICOM
+            por su preámbulo y el resto se decodifica con OpenCV.
+
+    Returns:
+        rgb: Imagen RGB `np.ndarray` (H, W, 3) en uint8.
+        img2show: `PIL.Image` para mostrar/guardar.
+
+    Raises:
+        ValueError: Si los bytes no son una imagen legible.
+    """
+    if (ext or "").lower() == ".dcm" or is_dicom_bytes(data):
+        # Mismos decodificadores y conversión a 8 bits que `read_dicom_file`
+        return _dicom_to_rgb(*_load_dicom(bytes(data)))
+
+    buf = np.frombuffer(data, dtype=np.uint8)
+    with span("io.decode", format="bytes"):
+        bgr = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+    if bgr is None:
+        raise ValueError("No se pudo decodificar la imagen desde memoria.")
+    with span("io.to_rgb"):
+        rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+    return rgb, Image.fromarray(rgb)
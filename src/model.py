@@ -1,20 +1,188 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-"""Carga del modelo de clasificación para neumonía."""
+"""Carga del modelo de clasificación para neumonía.
+
+El modelo se mantiene en un registro de proceso (`ModelRegistry`): cada
+archivo `.h5` se carga una sola vez, se identifica por su ruta resuelta y
+su firma en disco (mtime, tamaño y SHA-256), y se recarga automáticamente
+si el archivo cambia. Así un proceso de larga duración nunca vuelve a
+parsear los pesos en el camino caliente de inferencia.
+
+TensorFlow solo se importa al cargar el primer modelo.
+"""
 
 from __future__ import annotations
 
+import hashlib
 import os
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+import numpy as np
+
+from .config import DEFAULT_MODEL_PATH
+
+if TYPE_CHECKING:
+    from tensorflow.keras.models import Model
+
+
+def resolve_model_path(path: str | os.PathLike[str] | None = None) -> Path:
+    """Devuelve la ruta absoluta del modelo (`path` o `MODEL_PATH`)."""
+    raw = path if path is not None else os.getenv("MODEL_PATH", DEFAULT_MODEL_PATH)
+    return Path(raw).resolve()
+
+
+def file_sha256(path: str | os.PathLike[str], chunk_size: int = 1 << 20) -> str:
+    """Calcula el SHA-256 de un archivo leyendo por bloques."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _weights_nbytes(model: Any) -> int:
+    """Estima la memoria ocupada por los pesos del modelo (en bytes)."""
+    total = 0
+    for weight in getattr(model, "weights", ()):
+        dtype = getattr(weight.dtype, "name", weight.dtype)
+        total += int(np.prod(weight.shape)) * np.dtype(dtype).itemsize
+    return total
+
+
+def _load_keras_model(path: Path) -> Model:
+    """Carga un modelo Keras desde disco para inferencia (no compilado)."""
+    from tensorflow.keras.models import load_model
+
+    return load_model(str(path), compile=False)
+
+
+@dataclass
+class ModelEntry:
+    """Modelo cargado junto con su firma en disco y métricas de carga.
+
+    `derived` guarda objetos construidos a partir del modelo (p. ej. su
+    motor Keras compilado): se descartan con la entrada al recargar el
+    archivo o al llamar a `evict`.
+    """
+
+    path: Path
+    model: Any
+    mtime_ns: int
+    size: int
+    sha256: str
+    load_seconds: float
+    nbytes: int
+    loaded_at: float = field(default_factory=time.time)
+    derived: dict[str, Any] = field(default_factory=dict, repr=False)
+
+    def matches(self, stat: os.stat_result) -> bool:
+        """Indica si el archivo en disco sigue siendo el que se cargó."""
+        return stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size
 
-from tensorflow.keras.models import Model, load_model
+    def info(self) -> dict[str, Any]:
+        """Resumen serializable (sin el objeto modelo)."""
+        return {
+            "path": str(self.path),
+            "sha256": self.sha256,
+            "mtime_ns": self.mtime_ns,
+            "size": self.size,
+            "load_seconds": self.load_seconds,
+            "nbytes": self.nbytes,
+            "loaded_at": self.loaded_at,
+        }
+
+
+class ModelRegistry:
+    """Registro de modelos cargados, compartido por todo el proceso.
+
+    Args:
+        loader: Función `Path -> modelo`. Por defecto usa `load_model` de
+            Keras sin compilar.
+    """
+
+    def __init__(self, loader: Callable[[Path], Any] | None = None) -> None:
+        self._loader = loader
+        self._entries: dict[Path, ModelEntry] = {}
+        self._lock = threading.Lock()
+
+    def entry(self, path: str | os.PathLike[str] | None = None) -> ModelEntry:
+        """Devuelve la entrada del modelo, cargándolo o recargándolo si hace falta.
+
+        Raises:
+            FileNotFoundError: Si no existe el archivo del modelo.
+        """
+        resolved = resolve_model_path(path)
+        try:
+            stat = resolved.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"No se encontró el archivo del modelo en: {resolved}"
+            ) from None
+
+        cached = self._entries.get(resolved)
+        if cached is not None and cached.matches(stat):
+            return cached
+
+        with self._lock:
+            # Otro hilo pudo haberlo cargado mientras esperábamos el lock.
+            cached = self._entries.get(resolved)
+            if cached is not None and cached.matches(stat):
+                return cached
+
+            loader = self._loader or _load_keras_model
+            start = time.perf_counter()
+            model = loader(resolved)
+            load_seconds = time.perf_counter() - start
+
+            entry = ModelEntry(
+                path=resolved,
+                model=model,
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                sha256=file_sha256(resolved),
+                load_seconds=load_seconds,
+                nbytes=_weights_nbytes(model),
+            )
+            self._entries[resolved] = entry
+            return entry
+
+    def get(self, path: str | os.PathLike[str] | None = None) -> Any:
+        """Devuelve el modelo listo para inferencia (ver `entry`)."""
+        return self.entry(path).model
+
+    def loaded(self, path: str | os.PathLike[str] | None = None) -> ModelEntry | None:
+        """Entrada ya cargada para `path`, sin cargar ni comprobar el archivo."""
+        return self._entries.get(resolve_model_path(path))
+
+    def info(self) -> list[dict[str, Any]]:
+        """Lista las entradas cargadas con tiempo de carga y memoria."""
+        return [entry.info() for entry in self._entries.values()]
+
+    def evict(self, path: str | os.PathLike[str] | None = None) -> None:
+        """Descarta un modelo del registro (se recargará en el próximo uso)."""
+        with self._lock:
+            self._entries.pop(resolve_model_path(path), None)
+
+    def clear(self) -> None:
+        """Descarta todos los modelos cargados."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Registro único del proceso.
+REGISTRY = ModelRegistry()
 
 
 def model_fun() -> Model:
-    """Carga el modelo entrenado desde la ruta definida en `MODEL_PATH`.
+    """Devuelve el modelo entrenado definido en `MODEL_PATH`.
 
     Busca primero en la variable de entorno `MODEL_PATH`; si no está
-    definida, usa por defecto `model/conv_MLP_84.h5`.
+    definida, usa por defecto `model/conv_MLP_84.h5`. El modelo se carga
+    una única vez por proceso y se recarga solo si el archivo cambia.
 
     Returns:
         Un objeto `tf.keras.Model` listo para inferencia (no compilado).
@@ -22,12 +190,9 @@ def model_fun() -> Model:
     Raises:
         FileNotFoundError: Si no existe el archivo del modelo.
     """
-    path = Path(os.getenv("MODEL_PATH", "model/conv_MLP_84.h5"))
+    return REGISTRY.get()
 
-    if not path.exists():
-        raise FileNotFoundError(
-            f"No se encontró el archivo del modelo en: {path.resolve()}"
-        )
-
-    return load_model(str(path), compile=False)
 
+def model_info() -> ModelEntry:
+    """Devuelve la entrada del registro para el modelo de `MODEL_PATH`."""
+    return REGISTRY.entry()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Pipeline por lotes: lectura paralela → modelo por batches → escritura.
+
+Las tres etapas se conectan con colas acotadas, de modo que la memoria
+en vuelo no depende del número de archivos y los resultados se entregan
+al `sink` a medida que salen del modelo (streaming):
+
+- Hilos lectores decodifican imágenes (OpenCV/pydicom liberan el GIL).
+- El hilo llamador agrupa hasta `batch_size` imágenes y ejecuta
+  `predict_batch` una vez por batch.
+- Hilos escritores invocan `sink(result)` (p. ej. guardar el PNG y
+  añadir una fila al archivo de resultados).
+
+Con una `ResultCache`, los lectores calculan la clave de contenido de cada
+archivo y las imágenes ya procesadas saltan directamente a la escritura,
+sin decodificar ni pasar por el modelo; así un lote interrumpido se
+reanuda donde se detuvo. En un fallo de caché la imagen se decodifica
+desde los bytes ya leídos para la clave (`bytes_reader`), sin volver a
+leer el archivo.
+"""
+
+from __future__ import annotations
+
+import queue
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+from . import inference
+from .cache import ResultCache
+from .io_imgs import read_image_bytes, read_image_file
+
+# Marca de fin de stream entre etapas.
+_DONE = object()
+
+
+@dataclass
+class PipelineResult:
+    """Resultado de una imagen (o el error que impidió procesarla)."""
+
+    index: int
+    path: Path
+    label: str | None = None
+    proba: float | None = None
+    heatmap: np.ndarray | None = None
+    error: str | None = None
+    probs: np.ndarray | None = None
+    cached: bool = False
+    key: str | None = None
+    # Tiempo del modelo por imagen (el del batch repartido); `None` si no
+    # pasó por el modelo (error o acierto de caché)
+    inference_ms: float | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class PipelineStats:
+    """Contadores de una ejecución del pipeline."""
+
+    total: int = 0
+    failed: int = 0
+    cached: int = 0
+    seconds: float = 0.0
+
+    @property
+    def images_per_sec(self) -> float:
+        return self.total / self.seconds if self.seconds > 0 else 0.0
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """`q.put` que se rinde si se solicita la parada del pipeline."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _read_file(path: Path) -> np.ndarray:
+    return read_image_file(path)[0]
+
+
+def _read_bytes(path: Path, data: bytes) -> np.ndarray:
+    return read_image_bytes(data, path.suffix)[0]
+
+
+def _result(
+    index: int,
+    path: Path,
+    key: str | None,
+    probs: np.ndarray,
+    heatmap: np.ndarray | None,
+    inference_ms: float | None = None,
+) -> PipelineResult:
+    label, proba = inference.summarize(probs)
+    return PipelineResult(
+        index,
+        path,
+        label,
+        proba,
+        heatmap,
+        probs=probs,
+        key=key,
+        inference_ms=inference_ms,
+    )
+
+
+def _predict_items(
+    items: list[tuple[int, Path, np.ndarray, str | None]],
+    out: list[np.ndarray] | None = None,
+    heatmap: inference.HeatmapArg = True,
+) -> list[PipelineResult]:
+    """Ejecuta el modelo sobre un batch, aislando imágenes inválidas.
+
+    Si el batch falla (imagen corrupta, error de OpenCV...), se reintenta
+    imagen a imagen y cada fallo se entrega como resultado con `error`.
+    `out` (opcional) trae un buffer por elemento para escribir su heatmap.
+    `inference_ms` es el tiempo del batch repartido entre sus imágenes,
+    como en `inference.predict_batch`.
+    """
+    arrays = [item[2] for item in items]
+    start = time.perf_counter()
+    try:
+        outputs = inference.explain_batch(
+            arrays, batch_size=len(arrays), out=out, heatmap=heatmap
+        )
+    except Exception:  # preprocesamiento y modelo lanzan tipos diversos
+        # Alguna imagen no es procesable: reintentar una a una
+        results = []
+        for i, (index, path, array, key) in enumerate(items):
+            one = [out[i]] if out is not None else None
+            start = time.perf_counter()
+            try:
+                [(probs, cam)] = inference.explain_batch(
+                    [array], batch_size=1, out=one, heatmap=heatmap
+                )
+            except Exception as exc:
+                results.append(PipelineResult(index, path, error=str(exc)))
+            else:
+                elapsed = (time.perf_counter() - start) * 1000.0
+                results.append(_result(index, path, key, probs, cam, elapsed))
+        return results
+
+    per_image = (time.perf_counter() - start) * 1000.0 / len(items)
+    return [
+        _result(index, path, key, probs, cam, per_image)
+        for (index, path, _array, key), (probs, cam) in zip(items, outputs)
+    ]
+
+
+def run_pipeline(
+    paths: Iterable[str | Path],
+    sink: Callable[[PipelineResult], None],
+    *,
+    batch_size: int = inference.DEFAULT_BATCH_SIZE,
+    readers: int = 4,
+    writers: int = 2,
+    max_pending: int = 64,
+    reader: Callable[[Path], np.ndarray] = _read_file,
+    cache: ResultCache | None = None,
+    heatmap: inference.HeatmapArg = True,
+    bytes_reader: Callable[[Path, bytes], np.ndarray] | None = None,
+) -> PipelineStats:
+    """Procesa `paths` en streaming y entrega cada resultado a `sink`.
+
+    Args:
+        paths: Rutas de imágenes; se consumen de forma perezosa.
+        sink: Función llamada (desde hilos escritores) con cada resultado,
+            incluidos los errores de lectura o preprocesamiento.
+        batch_size: Imágenes por llamada al modelo.
+        readers: Hilos de lectura/decodificación.
+        writers: Hilos que ejecutan `sink`.
+        max_pending: Capacidad de cada cola entre etapas.
+        reader: Función `Path -> np.ndarray` usada para decodificar.
+        cache: Caché de resultados opcional; los aciertos no pasan por el
+            modelo y los resultados nuevos se guardan en ella.
+        heatmap: Política de Grad‑CAM (`inference.heatmap_policy`); los
+            resultados sin heatmap lo llevan en `None`.
+        bytes_reader: Función `(Path, bytes) -> np.ndarray` equivalente a
+            `reader` que decodifica el contenido ya leído para la clave de
+            caché. Por defecto, la de `read_image_bytes` si `reader` es el
+            predeterminado; con otro `reader` sin ella, los fallos de caché
+            se releen del disco.
+
+    Returns:
+        Estadísticas de la ejecución (total, fallidas, desde caché,
+        segundos, img/s).
+
+    Raises:
+        ValueError: Si `batch_size`, `readers` o `writers` no son positivos.
+        Exception: La que lance `paths` al iterarlo, tras entregar a
+            `sink` lo ya leído.
+    """
+    if min(batch_size, readers, writers) < 1:
+        raise ValueError("batch_size, readers y writers deben ser >= 1.")
+    if bytes_reader is None and reader is _read_file:
+        bytes_reader = _read_bytes
+
+    stop = threading.Event()
+    path_q: queue.Queue = queue.Queue(maxsize=max_pending)
+    read_q: queue.Queue = queue.Queue(maxsize=max_pending)
+    write_q: queue.Queue = queue.Queue(maxsize=max_pending)
+    stats = PipelineStats()
+    stats_lock = threading.Lock()
+    feed_errors: list[BaseException] = []
+
+    def feed() -> None:
+        try:
+            for index, raw in enumerate(paths):
+                if not _put(path_q, (index, Path(raw)), stop):
+                    return
+        except BaseException as exc:  # se relanza en el hilo que llamó
+            feed_errors.append(exc)
+        finally:
+            # Siempre: si no, los lectores y el bucle principal esperan
+            # para siempre
+            for _ in range(readers):
+                _put(path_q, _DONE, stop)
+
+    def read_one(index: int, path: Path) -> Any:
+        key = None
+        if cache is not None:
+            data = path.read_bytes()
+            key = cache.key_for(data)
+            hit = cache.get(key)
+            if hit is not None:
+                label, proba = inference.summarize(hit.probs)
+                return PipelineResult(
+                    index,
+                    path,
+                    label,
+                    proba,
+                    hit.heatmap,
+                    probs=hit.probs,
+                    cached=True,
+                    key=key,
+                )
+            if bytes_reader is not None:  # sin segunda lectura del disco
+                return (index, path, bytes_reader(path, data), key)
+        return (index, path, reader(path), key)
+
+    def read() -> None:
+        while True:
+            item = path_q.get()
+            if item is _DONE:
+                _put(read_q, _DONE, stop)
+                return
+            index, path = item
+            try:
+                payload = read_one(index, path)
+            except Exception as exc:  # lectores lanzan tipos diversos
+                payload = PipelineResult(index, path, error=str(exc))
+            if not _put(read_q, payload, stop):
+                return
+
+    def write() -> None:
+        while True:
+            result = write_q.get()
+            if result is _DONE:
+                return
+            try:
+                if cache is not None and result.ok and not result.cached:
+                    cache.put(result.key, result.label, result.probs, result.heatmap)
+                sink(result)
+            except Exception as exc:  # un fallo de escritura no detiene el lote
+                print(f"Error al escribir {result.path}: {exc}", file=sys.stderr)
+                with stats_lock:
+                    stats.failed += 1
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+    threads += [threading.Thread(target=read, daemon=True) for _ in range(readers)]
+    writer_threads = [
+        threading.Thread(target=write, daemon=True) for _ in range(writers)
+    ]
+
+    def emit(results: Iterable[PipelineResult]) -> None:
+        for result in results:
+            with stats_lock:
+                stats.total += 1
+                stats.failed += 0 if result.ok else 1
+                stats.cached += 1 if result.cached else 0
+            _put(write_q, result, stop)
+
+    start = time.perf_counter()
+    for thread in threads + writer_threads:
+        thread.start()
+
+    try:
+        pending: list[tuple[int, Path, np.ndarray, str | None]] = []
+        finished_readers = 0
+        while finished_readers < readers:
+            item = read_q.get()
+            if item is _DONE:
+                finished_readers += 1
+                continue
+            if isinstance(item, PipelineResult):  # error de lectura o acierto
+                emit([item])
+                continue
+            pending.append(item)
+            if len(pending) >= batch_size:
+                emit(_predict_items(pending, heatmap=heatmap))
+                pending = []
+        if pending:
+            emit(_predict_items(pending, heatmap=heatmap))
+    except BaseException:
+        # Los hilos son daemon: basta con desbloquear sus `put` pendientes
+        stop.set()
+        raise
+
+    for _ in writer_threads:
+        write_q.put(_DONE)
+    for thread in writer_threads:
+        thread.join()
+
+    if feed_errors:
+        raise feed_errors[0]
+    stats.seconds = time.perf_counter() - start
+    return stats
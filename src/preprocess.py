@@ -1,14 +1,271 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-"""Preprocesamiento de imágenes para inferencia."""
+"""Preprocesamiento de imágenes para inferencia.
+
+`Preprocessor` convierte varias imágenes a un batch (N, alto, ancho, 1)
+float32 en [0, 1]: reparte las imágenes en un pool de hilos (OpenCV libera
+el GIL), reutiliza los objetos CLAHE por hilo y escribe en un buffer dado
+por el llamador o reutilizado entre llamadas. Las imágenes de entrada no
+se modifican nunca. `preprocess` y `preprocess_batch` son atajos sobre él.
+"""
 
 from __future__ import annotations
 
-from typing import Tuple
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Sequence, Tuple
 
-import cv2
 import numpy as np
 
+from .telemetry import span
+
+# Parámetros por defecto del preprocesamiento (forman parte de la clave de
+# caché de resultados: cambiarlos invalida los resultados guardados).
+PREPROCESS_DEFAULTS: dict[str, object] = {
+    "size": (512, 512),
+    "use_clahe": True,
+    "clip_limit": 2.0,
+    "tile_grid_size": (4, 4),
+}
+
+# Hilos del pool compartido de preprocesamiento.
+DEFAULT_PREPROCESS_WORKERS = min(4, os.cpu_count() or 1)
+
+# Objetos CLAHE por hilo (`cv2.CLAHE` no es seguro entre hilos).
+_LOCAL = threading.local()
+
+# Pool compartido por los `Preprocessor` con `workers=None` (perezoso).
+_POOL: ThreadPoolExecutor | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def _clahe(clip_limit: float, tile_grid_size: Tuple[int, int]) -> Any:
+    """Objeto CLAHE del hilo actual para estos parámetros (se crea una vez)."""
+    import cv2
+
+    cache = getattr(_LOCAL, "clahe", None)
+    if cache is None:
+        cache = _LOCAL.clahe = {}
+    key = (float(clip_limit), tuple(tile_grid_size))
+    clahe = cache.get(key)
+    if clahe is None:
+        clahe = cache[key] = cv2.createCLAHE(clipLimit=key[0], tileGridSize=key[1])
+    return clahe
+
+
+def _shared_pool() -> ThreadPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(
+                max_workers=DEFAULT_PREPROCESS_WORKERS,
+                thread_name_prefix="preprocess",
+            )
+        return _POOL
+
+
+def _to_model_gray(
+    array: np.ndarray,
+    size: Tuple[int, int],
+    use_clahe: bool,
+    clip_limit: float,
+    tile_grid_size: Tuple[int, int],
+) -> np.ndarray:
+    """Convierte una imagen a gris uint8 con tamaño `size` (y CLAHE opcional).
+
+    Nunca modifica `array`: cada paso que cambia valores trabaja sobre una
+    copia o sobre el resultado de una operación de OpenCV.
+    """
+    import cv2  # diferido: `import src` no debe cargar OpenCV
+
+    with span("preprocess.gray"):
+        if array.ndim == 3 and array.shape[2] == 3:
+            gray = cv2.cvtColor(array, cv2.COLOR_RGB2GRAY)
+        elif array.ndim == 2:
+            gray = array
+        else:
+            raise ValueError("La imagen debe ser RGB (H, W, 3) o GRIS (H, W).")
+
+        # Asegurar uint8 para CLAHE y operaciones posteriores (solo los
+        # float pueden traer NaN/inf: se sanean en una copia)
+        if gray.dtype != np.uint8:
+            if gray.dtype.kind == "f":
+                gray = np.nan_to_num(gray)
+            gmax = float(np.max(gray))
+            if gmax > 1.0:  # ya parece estar en 0..255
+                gray = np.clip(gray, 0, 255).astype(np.uint8)
+            else:  # 0..1 → escalar a 0..255
+                gray = np.clip(gray * 255.0, 0, 255).astype(np.uint8)
+
+    # Redimensionar primero (mejor que después de normalizar); las imágenes
+    # de `read_model_gray` ya llegan al tamaño del modelo
+    if (gray.shape[1], gray.shape[0]) != tuple(size):
+        with span("preprocess.resize"):
+            gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+    # Contraste local opcional
+    if use_clahe:
+        with span("preprocess.clahe"):
+            gray = _clahe(clip_limit, tile_grid_size).apply(gray)
+
+    return gray
+
+
+class Preprocessor:
+    """Preprocesa batches de imágenes con parámetros fijos.
+
+    Args:
+        size: Tamaño objetivo (ancho, alto) para `resize`.
+        use_clahe: Si `True`, aplica CLAHE para mejorar contraste local.
+        clip_limit: Parámetro de CLAHE.
+        tile_grid_size: Parámetro de CLAHE (tamaño de teselas).
+        workers: Hilos para repartir las imágenes: `None` usa un pool
+            compartido, 0 procesa en el hilo llamador y N > 0 crea un pool
+            propio (se libera con `close`).
+        pooled: Si `True` y no se pasa `out`, el batch se escribe en un
+            buffer por hilo que se reutiliza entre llamadas: es válido solo
+            hasta la siguiente llamada desde el mismo hilo.
+
+    Raises:
+        ValueError: Si `workers` es negativo.
+    """
+
+    def __init__(
+        self,
+        size: Tuple[int, int] = (512, 512),
+        use_clahe: bool = True,
+        clip_limit: float = 2.0,
+        tile_grid_size: Tuple[int, int] = (4, 4),
+        *,
+        workers: int | None = None,
+        pooled: bool = False,
+    ) -> None:
+        if workers is not None and workers < 0:
+            raise ValueError("workers debe ser >= 0.")
+        self.size = tuple(size)
+        self.use_clahe = use_clahe
+        self.clip_limit = clip_limit
+        self.tile_grid_size = tuple(tile_grid_size)
+        self.workers = workers
+        self.pooled = pooled
+        self._pool: ThreadPoolExecutor | None = None
+        self._buffers = threading.local()
+
+    def close(self) -> None:
+        """Libera el pool propio (si lo hay)."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self) -> Preprocessor:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _executor(self) -> ThreadPoolExecutor | None:
+        if self.workers is None:
+            return _shared_pool()
+        if self.workers == 0:
+            return None
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="preprocess"
+            )
+        return self._pool
+
+    def _buffer(self, n: int) -> np.ndarray:
+        """Batch de salida de `n` imágenes (reutilizado si `pooled`)."""
+        width, height = self.size
+        if not self.pooled:
+            return np.empty((n, height, width, 1), dtype=np.float32)
+        buffer = getattr(self._buffers, "batch", None)
+        if buffer is None or buffer.shape[0] < n:
+            buffer = self._buffers.batch = np.empty(
+                (n, height, width, 1), dtype=np.float32
+            )
+        return buffer[:n]
+
+    def _fill(self, batch: np.ndarray, i: int, array: np.ndarray) -> None:
+        gray = _to_model_gray(
+            array, self.size, self.use_clahe, self.clip_limit, self.tile_grid_size
+        )
+        # Normalizar a [0, 1] escribiendo directamente en el buffer
+        with span("preprocess.normalize"):
+            np.divide(
+                gray, np.float32(255.0), out=batch[i, :, :, 0], dtype=np.float32
+            )
+
+    def __call__(
+        self, arrays: Sequence[np.ndarray], out: np.ndarray | None = None
+    ) -> np.ndarray:
+        """Preprocesa `arrays` en un único buffer contiguo.
+
+        Args:
+            arrays: Imágenes RGB (H, W, 3) o en gris (H, W), uint8 o float;
+                pueden tener tamaños distintos entre sí. No se modifican.
+            out: Buffer float32 (N, alto, ancho, 1) donde escribir; si
+                falta, se usa uno nuevo (o el del hilo si `pooled`).
+
+        Returns:
+            Batch `float32` con shape (N, alto, ancho, 1) en [0.0, 1.0]
+            (`out` si se pasó).
+
+        Raises:
+            ValueError: Si alguna imagen no es RGB (H, W, 3) ni GRIS (H, W),
+                o si `out` no tiene la forma o el tipo esperados.
+        """
+        n = len(arrays)
+        width, height = self.size
+        if out is None:
+            batch = self._buffer(n)
+        elif out.shape != (n, height, width, 1) or out.dtype != np.float32:
+            raise ValueError(
+                f"out debe ser float32 con shape {(n, height, width, 1)}, "
+                f"no {out.dtype} {out.shape}."
+            )
+        else:
+            batch = out
+
+        executor = self._executor() if n > 1 else None
+        if executor is None:
+            for i, array in enumerate(arrays):
+                self._fill(batch, i, array)
+        else:
+            # `list` propaga la primera excepción de los hilos
+            list(executor.map(self._fill, [batch] * n, range(n), arrays))
+        return batch
+
+
+def preprocess_batch(
+    arrays: Sequence[np.ndarray],
+    size: Tuple[int, int] = (512, 512),
+    use_clahe: bool = True,
+    clip_limit: float = 2.0,
+    tile_grid_size: Tuple[int, int] = (4, 4),
+) -> np.ndarray:
+    """Preprocesa varias imágenes en un único buffer contiguo.
+
+    Equivale a `Preprocessor(size, use_clahe, clip_limit, tile_grid_size)`
+    con el pool de hilos compartido.
+
+    Args:
+        arrays: Imágenes RGB (H, W, 3) o en gris (H, W); pueden tener
+            tamaños distintos entre sí.
+        size: Tamaño objetivo (ancho, alto) para `resize`.
+        use_clahe: Si `True`, aplica CLAHE para mejorar contraste local.
+        clip_limit: Parámetro de CLAHE.
+        tile_grid_size: Parámetro de CLAHE (tamaño de teselas).
+
+    Returns:
+        Batch `float32` contiguo con shape (N, alto, ancho, 1) en [0.0, 1.0].
+
+    Raises:
+        ValueError: Si alguna imagen no es RGB (H, W, 3) ni GRIS (H, W).
+    """
+    return Preprocessor(size, use_clahe, clip_limit, tile_grid_size)(arrays)
+
 
 def preprocess(
     array: np.ndarray,
@@ -32,35 +289,10 @@ def preprocess(
     Raises:
         ValueError: Si la imagen no es RGB (H, W, 3) ni GRIS (H, W).
     """
-    if array.ndim == 3 and array.shape[2] == 3:
-        gray = cv2.cvtColor(array, cv2.COLOR_RGB2GRAY)
-    elif array.ndim == 2:
-        gray = array
-    else:
-        raise ValueError("La imagen debe ser RGB (H, W, 3) o GRIS (H, W).")
-
-    # Sanitizar valores numéricos
-    gray = np.nan_to_num(gray, copy=False)
-
-    # Asegurar uint8 para CLAHE y operaciones posteriores
-    if gray.dtype != np.uint8:
-        gmin, gmax = float(np.min(gray)), float(np.max(gray))
-        if gmax > 1.0:  # ya parece estar en 0..255
-            gray = np.clip(gray, 0, 255).astype(np.uint8)
-        else:  # 0..1 → escalar a 0..255
-            gray = np.clip(gray * 255.0, 0, 255).astype(np.uint8)
-
-    # Redimensionar primero (mejor que después de normalizar)
-    gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
-
-    # Contraste local opcional
-    if use_clahe:
-        clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tile_grid_size)
-        gray = clahe.apply(gray)
-
-    # Normalizar a [0, 1] y añadir canales/batch
-    gray = gray.astype(np.float32) / 255.0
-    gray = np.expand_dims(gray, axis=-1)  # (H, W, 1)
-    batch = np.expand_dims(gray, axis=0)  # (1, H, W, 1)
-    return batch
-
+    return preprocess_batch(
+        [array],
+        size=size,
+        use_clahe=use_clahe,
+        clip_limit=clip_limit,
+        tile_grid_size=tile_grid_size,
+    )
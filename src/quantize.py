@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Cuantización post-entrenamiento del clasificador y reporte de paridad.
+
+Genera variantes TFLite del modelo de `model_fun`:
+  - `dynamic`: pesos en int8, activaciones en float (sin calibración).
+  - `int8`: enteros completos, calibrados con imágenes reales pasadas
+    por `preprocess` (entrada y salida siguen en float32).
+  - `float16`: pesos en float16.
+
+`quantization_report` compara cada variante con el modelo float32
+(Keras): tamaño en disco, latencia p50 por imagen, coincidencia de la
+clase predicha y deriva de las probabilidades. Una variante solo debería
+desplegarse si su reporte pasa los umbrales (`QuantVariant.passes`).
+
+Ejemplo:
+    calibration = sample_batch("samples/", limit=100)
+    paths = quantize_model(modes=["int8"], calibration=calibration)
+    for row in quantization_report(paths, sample_batch("validacion/")):
+        print(row.mode, row.label_agreement, row.max_drift)
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import asdict, dataclass
+from functools import partial
+from pathlib import Path
+from typing import Any, Sequence
+
+import numpy as np
+
+from .backends import BACKEND_SUFFIXES, KerasBackend, load_backend
+from .model import REGISTRY, resolve_model_path
+
+# Modos de cuantización disponibles.
+QUANT_MODES: tuple[str, ...] = ("dynamic", "int8", "float16")
+
+# Versión del formato JSON del reporte.
+QUANT_FORMAT = 1
+
+# Umbrales por defecto para aceptar una variante.
+DEFAULT_MIN_AGREEMENT = 1.0
+DEFAULT_MAX_DRIFT = 0.02
+
+# Nombre de la fila de referencia en el reporte.
+REFERENCE = "float32"
+
+
+@dataclass
+class QuantVariant:
+    """Fila del reporte: una variante comparada con el modelo float32."""
+
+    mode: str
+    path: str
+    size_bytes: int
+    p50_ms: float
+    samples: int
+    label_agreement: float
+    max_drift: float
+    mean_drift: float
+
+    def passes(
+        self,
+        min_agreement: float = DEFAULT_MIN_AGREEMENT,
+        max_drift: float = DEFAULT_MAX_DRIFT,
+    ) -> bool:
+        """Indica si la variante cumple los umbrales de paridad."""
+        return self.label_agreement >= min_agreement and self.max_drift <= max_drift
+
+
+def quantize_tflite(
+    model: Any,
+    path: str | os.PathLike[str],
+    mode: str,
+    calibration: np.ndarray | None = None,
+) -> Path:
+    """Convierte un modelo Keras a TFLite cuantizado.
+
+    Args:
+        model: Modelo Keras de clasificación.
+        path: Archivo `.tflite` de salida.
+        mode: Uno de `QUANT_MODES`.
+        calibration: Batch preprocesado (N, H, W, 1) para calibrar los
+            rangos de activación; obligatorio en `int8`.
+
+    Raises:
+        ValueError: Si el modo es desconocido o falta la calibración.
+    """
+    import tensorflow as tf
+
+    if mode not in QUANT_MODES:
+        raise ValueError(f"Modo de cuantización desconocido: {mode}")
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == "int8":
+        if calibration is None or not len(calibration):
+            raise ValueError("int8 necesita imágenes de calibración.")
+        samples = np.asarray(calibration, dtype=np.float32)
+        converter.representative_dataset = lambda: ([s[None]] for s in samples)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    path = Path(path)
+    path.write_bytes(converter.convert())
+    return path
+
+
+def quantize_model(
+    model_path: str | os.PathLike[str] | None = None,
+    modes: Sequence[str] = QUANT_MODES,
+    calibration: np.ndarray | None = None,
+    out_dir: str | os.PathLike[str] | None = None,
+) -> dict[str, Path]:
+    """Genera las variantes cuantizadas del `.h5`.
+
+    Los archivos se llaman `<modelo>.<modo>.tflite` y, por defecto, quedan
+    junto al `.h5`, donde los busca `get_backend("tflite-<modo>")`.
+
+    Returns:
+        Ruta generada por modo.
+
+    Raises:
+        ValueError: Si algún modo es desconocido o falta la calibración.
+    """
+    source = resolve_model_path(model_path)
+    model = REGISTRY.get(source)
+    folder = Path(out_dir) if out_dir is not None else source.parent
+    folder.mkdir(parents=True, exist_ok=True)
+    return {
+        mode: quantize_tflite(
+            model,
+            folder / f"{source.stem}{BACKEND_SUFFIXES[f'tflite-{mode}']}",
+            mode,
+            calibration,
+        )
+        for mode in modes
+    }
+
+
+def quantization_report(
+    paths: dict[str, Path],
+    batch: np.ndarray,
+    model_path: str | os.PathLike[str] | None = None,
+    *,
+    repeat: int = 20,
+    warmup: int = 3,
+) -> list[QuantVariant]:
+    """Compara las variantes con el modelo float32 sobre `batch`.
+
+    Args:
+        paths: Archivo `.tflite` por modo (resultado de `quantize_model`).
+        batch: Imágenes preprocesadas (N, H, W, 1) de evaluación; conviene
+            que no sean las de calibración.
+        model_path: Modelo Keras de referencia (por defecto, `MODEL_PATH`).
+        repeat: Ejecuciones medidas para la latencia.
+        warmup: Ejecuciones previas descartadas.
+
+    Returns:
+        La fila de referencia (`float32`) seguida de una por variante. La
+        latencia es la p50 de clasificar una imagen.
+    """
+    from .bench import measure
+
+    source = resolve_model_path(model_path)
+    reference = KerasBackend(REGISTRY.get(source))
+    expected = reference.predict(batch)
+    labels = expected.argmax(axis=1)
+
+    rows = []
+    engines = [(REFERENCE, source, reference)]
+    for mode, path in paths.items():
+        engines.append((mode, Path(path), load_backend(Path(path))))
+    for mode, path, engine in engines:
+        probs = engine.predict(batch)
+        drift = np.abs(probs - expected)
+        timing = measure(
+            f"quantize.{mode}",
+            partial(engine.predict, batch[:1]),
+            params={},
+            repeat=repeat,
+            warmup=warmup,
+        )
+        rows.append(
+            QuantVariant(
+                mode=mode,
+                path=str(path),
+                size_bytes=path.stat().st_size,
+                p50_ms=timing.p50_ms,
+                samples=len(batch),
+                label_agreement=float(np.mean(probs.argmax(axis=1) == labels)),
+                max_drift=float(drift.max()),
+                mean_drift=float(drift.mean()),
+            )
+        )
+    return rows
+
+
+def report_to_json(
+    rows: Sequence[QuantVariant],
+    min_agreement: float = DEFAULT_MIN_AGREEMENT,
+    max_drift: float = DEFAULT_MAX_DRIFT,
+) -> dict[str, Any]:
+    """Reporte serializable con umbrales y veredicto por variante."""
+    from .bench import environment_info
+
+    return {
+        "format": QUANT_FORMAT,
+        "environment": environment_info(),
+        "thresholds": {"min_agreement": min_agreement, "max_drift": max_drift},
+        "variants": [
+            {**asdict(row), "passes": row.passes(min_agreement, max_drift)}
+            for row in rows
+        ],
+    }
+
+
+def format_report(
+    rows: Sequence[QuantVariant],
+    min_agreement: float = DEFAULT_MIN_AGREEMENT,
+    max_drift: float = DEFAULT_MAX_DRIFT,
+) -> str:
+    """Tabla legible del reporte (tamaño y latencia relativos a float32)."""
+    base = rows[0]
+    lines = [
+        f"{'variante':<9} {'tamaño KB':>10} {'x tamaño':>9} {'p50 ms':>8} "
+        f"{'x veloc.':>9} {'misma clase':>12} {'deriva máx.':>12} "
+        f"{'deriva media':>13}"
+    ]
+    for row in rows:
+        verdict = ""
+        if row is not base:
+            verdict = "  OK" if row.passes(min_agreement, max_drift) else "  FALLA"
+        lines.append(
+            f"{row.mode:<9} {row.size_bytes / 1024:>10.1f} "
+            f"{row.size_bytes / base.size_bytes:>9.2f} {row.p50_ms:>8.2f} "
+            f"{base.p50_ms / row.p50_ms if row.p50_ms else 0.0:>9.2f} "
+            f"{row.label_agreement:>12.1%} {row.max_drift:>12.2e} "
+            f"{row.mean_drift:>13.2e}{verdict}"
+        )
+    return "\n".join(lines)
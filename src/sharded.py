@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Modo lote en varios procesos, con un modelo caliente por proceso.
+
+Un solo proceso no aprovecha muchos núcleos: parte de la lectura
+(PIL/pydicom), del Grad-CAM (colormap, overlay) y la sobrecarga de
+TensorFlow en Python están limitadas por el GIL. `run_sharded` arranca N
+procesos (`spawn`), cada uno con `model_fun()` cargado una vez y con los
+hilos de TensorFlow/OpenCV acotados, y les reparte los archivos en
+bloques (*shards*) a través de colas:
+
+- Cada proceso tiene su propio `Pipe` con el principal (sin colas ni
+  cerrojos compartidos que un proceso caído pudiera dejar tomados).
+- Cada proceso lee, preprocesa y ejecuta el modelo sobre su bloque. El
+  heatmap se escribe directamente en un slot de un `SharedRing` (memoria
+  compartida) reservado por el principal, y por el `Pipe` solo vuelven
+  los `PipelineResult` sin heatmap: nada de serializar 768 KB por imagen.
+- El proceso principal reordena los resultados y los entrega a `sink`
+  en el orden de entrada (desde hilos escritores, como `run_pipeline`).
+- Si un proceso muere (p. ej. un archivo que rompe el decodificador), se
+  reinicia y su bloque se reintenta archivo a archivo; el que vuelve a
+  fallar se reporta como error sin detener el lote.
+
+Con una `ResultCache`, los aciertos se resuelven en el proceso principal
+sin enviarse a los procesos de trabajo.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import multiprocessing.connection
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+import numpy as np
+
+from . import inference
+from .cache import ResultCache
+from .io_imgs import read_image_file
+from .pipeline import PipelineResult, PipelineStats, _predict_items
+from .shm_ring import SharedRing
+
+# Archivos por bloque enviado a un proceso de trabajo.
+DEFAULT_SHARD_SIZE = 8
+
+# Reintentos de un archivo cuyo proceso murió al procesarlo.
+DEFAULT_MAX_RETRIES = 1
+
+# Espera (s) antes de reintentar repartir cuando no quedan slots libres.
+_SLOT_WAIT = 0.05
+
+# Marca de fin de stream hacia los hilos escritores.
+_DONE = object()
+
+# Heatmaps que viajan por memoria compartida.
+_HEATMAP_LAYOUT = {"heatmap": ((512, 512, 3), "uint8")}
+
+
+def default_workers() -> int:
+    """Procesos por defecto: uno por CPU."""
+    return os.cpu_count() or 1
+
+
+def read_rgb(path: Path) -> np.ndarray:
+    """Lector por defecto (serializable para los procesos de trabajo)."""
+    return read_image_file(path)[0]
+
+
+@dataclass
+class _Shard:
+    """Bloque de archivos `(índice, ruta)`, sus slots y cuántos intentos lleva."""
+
+    id: int
+    items: list[tuple[int, Path]]
+    slots: list[int] | None = None
+    attempt: int = 0
+
+
+def _limit_threads(threads: int) -> None:
+    """Acota los hilos de TensorFlow, OpenCV y el preprocesamiento."""
+    import cv2
+    import tensorflow as tf
+
+    from . import preprocess
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(min(2, threads))
+    cv2.setNumThreads(threads)
+    preprocess.DEFAULT_PREPROCESS_WORKERS = threads
+
+
+def _process_shard(
+    shard: _Shard,
+    reader: Callable[[Path], np.ndarray],
+    ring: SharedRing | None,
+    heatmap: inference.HeatmapArg,
+) -> tuple[list[PipelineResult], set[int]]:
+    """Lee y predice un bloque (en el proceso de trabajo).
+
+    Con `ring`, los heatmaps quedan en los slots del bloque y los
+    resultados se devuelven sin ellos, junto con los índices cuyo slot
+    contiene un heatmap.
+    """
+    results: list[PipelineResult] = []
+    batch = []
+    out: list[np.ndarray] | None = [] if ring is not None else None
+    for i, (index, path) in enumerate(shard.items):
+        try:
+            batch.append((index, path, reader(path), None))
+        except Exception as exc:  # lectores lanzan tipos diversos
+            results.append(PipelineResult(index, path, error=str(exc)))
+            continue
+        if out is not None:
+            out.append(ring.view(shard.slots[i], "heatmap"))
+    if batch:
+        results += _predict_items(batch, out, heatmap)
+    in_slot = set()
+    if ring is not None:
+        for result in results:
+            if result.heatmap is not None:
+                in_slot.add(result.index)
+                result.heatmap = None  # viaja por el slot
+    return results, in_slot
+
+
+def _worker_main(
+    conn: Any,
+    reader: Callable[[Path], np.ndarray],
+    threads: int,
+    ring_spec: Any,
+    heatmap: inference.HeatmapArg,
+) -> None:
+    """Bucle de un proceso de trabajo: modelo caliente y bloques del `Pipe`."""
+    try:
+        _limit_threads(threads)
+        inference.warm_up()
+        ring = SharedRing.attach(ring_spec) if ring_spec is not None else None
+    except BaseException:
+        conn.send(("failed", traceback.format_exc()))
+        return
+    while True:
+        try:
+            shard = conn.recv()
+        except EOFError:  # el proceso principal terminó
+            return
+        if shard is None:
+            return
+        results, in_slot = _process_shard(shard, reader, ring, heatmap)
+        conn.send(("done", (shard.id, results, in_slot)))
+
+
+class _Worker:
+    """Proceso de trabajo reiniciable, con su `Pipe` al proceso principal."""
+
+    def __init__(self, ctx: Any, slot: int, args: tuple) -> None:
+        self._ctx = ctx
+        self.slot = slot
+        self._args = args
+        self.shard: _Shard | None = None
+        self.start()
+
+    def start(self) -> None:
+        self.shard = None
+        self.conn, child = self._ctx.Pipe()
+        self.process = self._ctx.Process(
+            target=_worker_main,
+            args=(child, *self._args),
+            name=f"uao-worker-{self.slot}",
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+
+    def restart(self) -> None:
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.conn.close()
+        self.start()
+
+    def assign(self, shard: _Shard) -> None:
+        self.shard = shard
+        self.conn.send(shard)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:  # el proceso ya no existe
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+
+def run_sharded(
+    paths: Iterable[str | Path],
+    sink: Callable[[PipelineResult], None],
+    *,
+    workers: int | None = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    threads_per_worker: int | None = None,
+    writers: int = 1,
+    reader: Callable[[Path], np.ndarray] = read_rgb,
+    cache: ResultCache | None = None,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    ring_slots: int | None = None,
+    heatmap: inference.HeatmapArg = True,
+) -> PipelineStats:
+    """Procesa `paths` repartiéndolos en bloques entre varios procesos.
+
+    Args:
+        paths: Rutas de imágenes; se consumen de forma perezosa.
+        sink: Función llamada (desde hilos escritores del proceso
+            principal) con cada resultado, incluidos los errores. Con
+            `writers=1` recibe los resultados en el orden de `paths`. El
+            heatmap es una vista de memoria compartida válida solo durante
+            la llamada (después queda en `None`): cópialo si lo conservas.
+        workers: Procesos de trabajo (por defecto, uno por CPU).
+        shard_size: Archivos por bloque (y por batch del modelo).
+        threads_per_worker: Hilos de TensorFlow/OpenCV por proceso (por
+            defecto, CPUs / procesos, mínimo 1).
+        writers: Hilos que ejecutan `sink`.
+        reader: Función `Path -> np.ndarray` usada para decodificar; debe
+            poder serializarse (función de nivel de módulo).
+        cache: Caché de resultados opcional, consultada y actualizada en el
+            proceso principal.
+        max_retries: Reintentos de un archivo cuyo proceso murió; agotados,
+            el archivo queda como error y el lote continúa.
+        ring_slots: Heatmaps en vuelo en memoria compartida (por defecto,
+            `2 * workers * shard_size`; al menos `shard_size`, pues cada
+            bloque reserva un slot por archivo); `0` los envía serializados
+            por el `Pipe` (p. ej. si `/dev/shm` es pequeño, como en Docker).
+        heatmap: Política de Grad-CAM (`inference.heatmap_policy`); los
+            resultados sin heatmap lo llevan en `None`.
+
+    Returns:
+        Estadísticas de la ejecución.
+
+    Raises:
+        ValueError: Si `workers`, `shard_size` o `writers` no son positivos,
+            o si `ring_slots` está entre 1 y `shard_size - 1`.
+        RuntimeError: Si los procesos no pueden iniciarse (p. ej. falta el
+            modelo).
+    """
+    workers = workers or default_workers()
+    if min(workers, shard_size, writers) < 1:
+        raise ValueError("workers, shard_size y writers deben ser >= 1.")
+    threads = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+    if ring_slots is None:
+        ring_slots = 2 * workers * shard_size
+    if 0 < ring_slots < shard_size:
+        raise ValueError(
+            f"ring_slots ({ring_slots}) debe ser 0 o al menos shard_size "
+            f"({shard_size}): cada bloque reserva un slot por archivo."
+        )
+    ring = SharedRing(ring_slots, _HEATMAP_LAYOUT) if ring_slots > 0 else None
+
+    stats = PipelineStats()
+    stats_lock = threading.Lock()
+    write_q: queue.Queue = queue.Queue(maxsize=4 * shard_size * workers)
+
+    def write() -> None:
+        while True:
+            item = write_q.get()
+            if item is _DONE:
+                return
+            result, slot = item
+            try:
+                if cache is not None and result.ok and not result.cached:
+                    cache.put(result.key, result.label, result.probs, result.heatmap)
+                sink(result)
+            except Exception as exc:  # un fallo de escritura no detiene el lote
+                print(f"Error al escribir {result.path}: {exc}", file=sys.stderr)
+                with stats_lock:
+                    stats.failed += 1
+            finally:
+                if slot is not None:
+                    result.heatmap = None  # la vista deja de ser válida
+                    ring.release([slot])
+
+    writer_threads = [
+        threading.Thread(target=write, daemon=True) for _ in range(writers)
+    ]
+    start = time.perf_counter()
+    for thread in writer_threads:
+        thread.start()
+    try:
+        _dispatch(
+            paths,
+            write_q,
+            stats,
+            stats_lock,
+            workers=workers,
+            shard_size=shard_size,
+            worker_args=(
+                reader,
+                threads,
+                ring.spec if ring is not None else None,
+                inference.heatmap_policy(heatmap),
+            ),
+            ring=ring,
+            cache=cache,
+            max_retries=max_retries,
+        )
+    finally:
+        for _ in writer_threads:
+            write_q.put(_DONE)
+        for thread in writer_threads:
+            thread.join()
+        if ring is not None:
+            ring.close()
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def _dispatch(
+    paths: Iterable[str | Path],
+    write_q: queue.Queue,
+    stats: PipelineStats,
+    stats_lock: threading.Lock,
+    *,
+    workers: int,
+    shard_size: int,
+    worker_args: tuple,
+    ring: SharedRing | None,
+    cache: ResultCache | None,
+    max_retries: int,
+) -> None:
+    """Reparte bloques, vigila los procesos y emite los resultados en orden."""
+    ctx = multiprocessing.get_context("spawn")  # fork + TensorFlow no es seguro
+    source: Iterator[tuple[int, Path]] = (
+        (index, Path(raw)) for index, raw in enumerate(paths)
+    )
+    retry: deque[_Shard] = deque()
+    ready: dict[int, PipelineResult] = {}
+    slot_of: dict[int, int] = {}
+    keys: dict[int, str] = {}
+    next_index = 0
+    shard_ids = 0
+    exhausted = False
+
+    def emit_ready() -> None:
+        nonlocal next_index
+        while next_index in ready:
+            result = ready.pop(next_index)
+            with stats_lock:
+                stats.total += 1
+                stats.failed += 0 if result.ok else 1
+                stats.cached += 1 if result.cached else 0
+            write_q.put((result, slot_of.pop(result.index, None)))
+            next_index += 1
+
+    def next_shard() -> _Shard | None:
+        """Siguiente bloque; `None` si no quedan archivos o slots libres."""
+        nonlocal exhausted, shard_ids
+        if retry:
+            return retry.popleft()
+        slots = None
+        if ring is not None and not exhausted:
+            slots = ring.acquire(shard_size)
+            if slots is None:
+                return None
+        items: list[tuple[int, Path]] = []
+        while not exhausted and len(items) < shard_size:
+            item = next(source, None)
+            if item is None:
+                exhausted = True
+                break
+            index, path = item
+            if cache is not None:
+                try:
+                    keys[index] = cache.key_for(path.read_bytes())
+                except OSError as exc:
+                    ready[index] = PipelineResult(index, path, error=str(exc))
+                    continue
+                hit = cache.get(keys[index])
+                if hit is not None:
+                    label, proba = inference.summarize(hit.probs)
+                    ready[index] = PipelineResult(
+                        index,
+                        path,
+                        label,
+                        proba,
+                        hit.heatmap,
+                        probs=hit.probs,
+                        cached=True,
+                        key=keys[index],
+                    )
+                    continue
+            items.append(item)
+        if slots is not None:
+            ring.release(slots[len(items) :])
+            slots = slots[: len(items)]
+        emit_ready()
+        if not items:
+            return None
+        shard_ids += 1
+        return _Shard(shard_ids, items, slots)
+
+    def crashed(worker: _Worker) -> None:
+        # Los reintentos se cuentan por bloque/archivo (`attempt`), no en
+        # global: cada archivo culpable cuesta como mucho `max_retries + 1`
+        # reinicios y el resto del lote sigue adelante.
+        shard = worker.shard
+        if shard is not None:
+            shard.attempt += 1
+            slots = shard.slots or [None] * len(shard.items)
+            if len(shard.items) > 1:  # aislar el archivo culpable
+                retry.extendleft(
+                    _Shard(
+                        shard.id,
+                        [item],
+                        None if slot is None else [slot],
+                        shard.attempt,
+                    )
+                    for item, slot in reversed(list(zip(shard.items, slots)))
+                )
+            elif shard.attempt > max_retries:
+                [(index, path)] = shard.items
+                if ring is not None:
+                    ring.release(slots)
+                ready[index] = PipelineResult(
+                    index,
+                    path,
+                    error="El proceso de trabajo terminó inesperadamente.",
+                )
+                emit_ready()
+            else:
+                retry.appendleft(shard)
+        worker.restart()
+
+    def receive(worker: _Worker) -> None:
+        try:
+            kind, payload = worker.conn.recv()
+        except (EOFError, OSError):  # murió (quizá a mitad de un envío)
+            crashed(worker)
+            return
+        if kind == "failed":
+            raise RuntimeError(f"No se pudo iniciar un proceso:\n{payload}")
+        shard_id, output, in_slot = payload
+        shard = worker.shard
+        if shard is None or shard.id != shard_id:
+            return
+        slots = dict(zip((index for index, _path in shard.items), shard.slots or ()))
+        for result in output:
+            slot = slots.get(result.index)
+            if slot is not None and result.index in in_slot:
+                result.heatmap = ring.view(slot, "heatmap")
+                slot_of[result.index] = slot
+            elif slot is not None:
+                ring.release([slot])
+            result.key = keys.pop(result.index, None)
+            ready[result.index] = result
+        worker.shard = None
+        emit_ready()
+
+    pool = [_Worker(ctx, slot, worker_args) for slot in range(workers)]
+    try:
+        while True:
+            for worker in pool:
+                if worker.shard is None:
+                    shard = next_shard()
+                    if shard is None:
+                        continue
+                    try:
+                        worker.assign(shard)
+                    except OSError:  # murió estando libre
+                        crashed(worker)
+            idle = any(worker.shard is None for worker in pool)
+            if all(w.shard is None for w in pool) and exhausted and not retry:
+                break
+
+            # Sin slots libres, los escritores los devolverán en breve
+            timeout = _SLOT_WAIT if idle and not exhausted else None
+            waitables = [w.conn for w in pool] + [w.process.sentinel for w in pool]
+            signaled = set(multiprocessing.connection.wait(waitables, timeout))
+            for worker in pool:
+                if worker.conn in signaled:
+                    receive(worker)
+                elif worker.process.sentinel in signaled:
+                    crashed(worker)
+    finally:
+        for worker in pool:
+            worker.stop()
+    emit_ready()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Anillo de slots en memoria compartida para mover imágenes entre procesos.
+
+Enviar un heatmap 512x512x3 (o un tensor 512x512x1 float32) por un `Pipe`
+o una `multiprocessing.Queue` implica serializarlo, copiarlo al kernel y
+reconstruirlo al otro lado. `SharedRing` reserva de antemano `slots`
+posiciones en `multiprocessing.shared_memory`, un bloque por campo del
+`layout`, y entre procesos solo viajan índices de slot:
+
+    ring = SharedRing(64)                        # proceso dueño
+    spec = ring.spec                             # serializable
+    ...
+    worker_ring = SharedRing.attach(spec)        # proceso de trabajo
+    worker_ring.view(slot, "heatmap")[:] = heatmap
+    ...
+    ring.view(slot, "heatmap")                   # dueño: sin copias
+    ring.release([slot])
+
+El dueño reparte los slots (`acquire` / `release`); quien los recibe solo
+escribe o lee en ellos hasta devolverlos.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Mapping, Sequence
+
+import numpy as np
+
+# Campo → (forma por slot, dtype). Por defecto, el tensor de entrada del
+# modelo y el heatmap RGB de salida.
+SLOT_LAYOUT: dict[str, tuple[tuple[int, ...], str]] = {
+    "tensor": ((512, 512, 1), "float32"),
+    "heatmap": ((512, 512, 3), "uint8"),
+}
+
+
+@dataclass(frozen=True)
+class RingSpec:
+    """Descripción serializable de un anillo para adjuntarse desde otro proceso."""
+
+    slots: int
+    layout: tuple[tuple[str, tuple[int, ...], str], ...]
+    names: tuple[str, ...]
+
+
+class SharedRing:
+    """Slots de tamaño fijo en memoria compartida, reutilizados en anillo.
+
+    Args:
+        slots: Número de slots.
+        layout: Campo → (forma, dtype) de cada slot.
+
+    Raises:
+        ValueError: Si `slots` no es positivo o el layout está vacío.
+    """
+
+    def __init__(
+        self,
+        slots: int,
+        layout: Mapping[str, tuple[tuple[int, ...], str]] = SLOT_LAYOUT,
+    ) -> None:
+        if slots < 1 or not layout:
+            raise ValueError("Se necesita al menos un slot y un campo.")
+        fields = tuple(
+            (name, tuple(shape), dtype) for name, (shape, dtype) in layout.items()
+        )
+        segments = [
+            shared_memory.SharedMemory(
+                create=True, size=slots * _slot_nbytes(shape, dtype)
+            )
+            for _name, shape, dtype in fields
+        ]
+        spec = RingSpec(slots, fields, tuple(s.name for s in segments))
+        self._setup(spec, segments)
+        self._owner = True
+        self._free: deque[int] = deque(range(slots))
+        self._cond = threading.Condition()
+
+    @classmethod
+    def attach(cls, spec: RingSpec) -> SharedRing:
+        """Abre en este proceso un anillo creado en otro (no reparte slots)."""
+        ring = cls.__new__(cls)
+        segments = [shared_memory.SharedMemory(name=name) for name in spec.names]
+        ring._setup(spec, segments)
+        ring._owner = False
+        return ring
+
+    def _setup(
+        self, spec: RingSpec, segments: list[shared_memory.SharedMemory]
+    ) -> None:
+        self.spec = spec
+        self._segments = segments
+        self._arrays = {
+            name: np.ndarray((spec.slots, *shape), dtype=dtype, buffer=segment.buf)
+            for (name, shape, dtype), segment in zip(spec.layout, segments)
+        }
+
+    @property
+    def slots(self) -> int:
+        return self.spec.slots
+
+    @property
+    def free(self) -> int:
+        """Slots libres (solo en el proceso dueño)."""
+        return len(self._free)
+
+    def view(self, slot: int, field: str) -> np.ndarray:
+        """Vista (sin copia) del campo `field` del slot `slot`."""
+        return self._arrays[field][slot]
+
+    def acquire(
+        self, count: int = 1, timeout: float | None = 0.0
+    ) -> list[int] | None:
+        """Reserva `count` slots.
+
+        Args:
+            count: Slots a reservar.
+            timeout: Segundos de espera si no hay suficientes libres
+                (`0`: no espera; `None`: espera indefinidamente).
+
+        Returns:
+            Los índices reservados, o `None` si no se liberaron a tiempo.
+
+        Raises:
+            ValueError: Si `count` supera el tamaño del anillo.
+        """
+        if count > self.slots:
+            raise ValueError(f"El anillo solo tiene {self.slots} slots.")
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self._free) >= count, timeout):
+                return None
+            return [self._free.popleft() for _ in range(count)]
+
+    def release(self, slots: Sequence[int]) -> None:
+        """Devuelve slots al anillo (desde cualquier hilo del dueño)."""
+        with self._cond:
+            self._free.extend(slots)
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """Cierra el anillo; el dueño además libera la memoria compartida."""
+        self._arrays.clear()
+        for segment in self._segments:
+            try:
+                segment.close()
+            except BufferError:
+                pass  # quedan vistas vivas: el mapeo se libera al recolectarlas
+            if self._owner:
+                segment.unlink()
+        self._segments = []
+
+    def __enter__(self) -> SharedRing:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def _slot_nbytes(shape: tuple[int, ...], dtype: str) -> int:
+    return int(np.prod(shape)) * np.dtype(dtype).itemsize
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Perfil de arranque: cuánto cuesta importar cada dependencia pesada.
+
+Uso: `python -m app.cli --profile-startup` o `python main.py --profile-startup`.
+Los módulos se importan en orden y se mide el tiempo incremental de cada
+uno (lo que ya cargó un módulo anterior no se vuelve a contar).
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+import time
+from typing import Iterable, NamedTuple
+
+# Orden aproximado en que el pipeline necesita cada módulo.
+STARTUP_MODULES: tuple[str, ...] = (
+    "numpy",
+    "PIL.Image",
+    "cv2",
+    "pydicom",
+    "tensorflow",
+    "src.io_imgs",
+    "src.preprocess",
+    "src.model",
+    "src.explain",
+    "src.inference",
+)
+
+
+class ImportTiming(NamedTuple):
+    """Tiempo de importación de un módulo."""
+
+    module: str
+    seconds: float
+    preloaded: bool
+    error: str | None = None
+
+
+def profile_imports(modules: Iterable[str] = STARTUP_MODULES) -> list[ImportTiming]:
+    """Importa `modules` en orden y mide el tiempo de cada uno."""
+    timings = []
+    for name in modules:
+        preloaded = name in sys.modules
+        start = time.perf_counter()
+        error = None
+        try:
+            importlib.import_module(name)
+        except ImportError as exc:
+            error = str(exc)
+        timings.append(
+            ImportTiming(name, time.perf_counter() - start, preloaded, error)
+        )
+    return timings
+
+
+def format_import_profile(
+    timings: Iterable[ImportTiming], elapsed_before: float | None = None
+) -> str:
+    """Tabla legible con el desglose de tiempos de importación.
+
+    Args:
+        timings: Resultado de `profile_imports`.
+        elapsed_before: Segundos que tardó la interfaz en estar lista
+            (p. ej. la CLI tras interpretar argumentos), si se conocen.
+    """
+    timings = list(timings)
+    lines = ["Perfil de arranque (importaciones):"]
+    if elapsed_before is not None:
+        label = "(interfaz hasta aquí)"
+        lines.append(f"  {label:<24} {elapsed_before * 1000:9.1f} ms")
+    for t in timings:
+        note = " (ya cargado)" if t.preloaded else ""
+        note = f" (no disponible: {t.error})" if t.error else note
+        lines.append(f"  {t.module:<24} {t.seconds * 1000:9.1f} ms{note}")
+    total = sum(t.seconds for t in timings)
+    lines.append(f"  {'total':<24} {total * 1000:9.1f} ms")
+    return "\n".join(lines)
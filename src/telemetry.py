@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Instrumentación opcional por etapas (tramos y contadores).
+
+Los módulos del pipeline marcan sus etapas con `span("nombre")` y
+`count("nombre")`. Mientras no haya un destino activo (`enable`), `span`
+devuelve un contexto vacío compartido y `count` retorna de inmediato, así
+que el coste con la instrumentación apagada es una llamada a función.
+
+Destinos disponibles:
+  - `LogSink`: una línea de log por tramo.
+  - `PrometheusSink`: archivo en formato de texto de Prometheus (suma y
+    número de ejecuciones por etapa, contadores).
+  - `ChromeTraceSink`: JSON de eventos para chrome://tracing o Perfetto.
+
+Ejemplo:
+    from src import telemetry
+
+    telemetry.enable(telemetry.ChromeTraceSink("outputs/trace.json"))
+    ...  # predicciones
+    telemetry.disable()  # escribe los archivos pendientes
+
+También se activa con variables de entorno (ver `configure_from_env`):
+`UAO_TRACE_FILE`, `UAO_METRICS_FILE` y `UAO_LOG_TIMINGS=1`.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, ContextManager, NamedTuple, Protocol
+
+logger = logging.getLogger(__name__)
+
+# Prefijo de las métricas exportadas a Prometheus.
+METRIC_PREFIX = "uao_neumonia"
+
+
+class SpanEvent(NamedTuple):
+    """Tramo de ejecución terminado."""
+
+    name: str
+    start_ns: int
+    duration_ns: int
+    thread_id: int
+    attrs: dict[str, Any]
+
+
+class Sink(Protocol):
+    """Destino de la instrumentación."""
+
+    def record_span(self, event: SpanEvent) -> None: ...
+
+    def record_count(self, name: str, value: float) -> None: ...
+
+    def close(self) -> None: ...
+
+
+# Destino activo (None = instrumentación apagada).
+_SINK: Sink | None = None
+_NOOP: ContextManager[None] = nullcontext()
+
+
+class _Span:
+    """Contexto que mide un tramo y lo entrega al destino al salir."""
+
+    __slots__ = ("_sink", "_name", "_attrs", "_start")
+
+    def __init__(self, sink: Sink, name: str, attrs: dict[str, Any]) -> None:
+        self._sink = sink
+        self._name = name
+        self._attrs = attrs
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter_ns()
+
+    def __exit__(self, *exc: object) -> None:
+        end = time.perf_counter_ns()
+        self._sink.record_span(
+            SpanEvent(
+                self._name,
+                self._start,
+                end - self._start,
+                threading.get_ident(),
+                self._attrs,
+            )
+        )
+
+
+def span(name: str, **attrs: Any) -> ContextManager[None]:
+    """Mide el bloque `with` como la etapa `name` (si hay destino activo)."""
+    sink = _SINK
+    if sink is None:
+        return _NOOP
+    return _Span(sink, name, attrs)
+
+
+def count(name: str, value: float = 1) -> None:
+    """Suma `value` al contador `name` (si hay destino activo)."""
+    sink = _SINK
+    if sink is not None:
+        sink.record_count(name, value)
+
+
+def enabled() -> bool:
+    """Indica si hay un destino activo."""
+    return _SINK is not None
+
+
+def enable(*sinks: Sink) -> Sink:
+    """Activa la instrumentación hacia uno o varios destinos.
+
+    Si ya había destinos activos, se cierran antes.
+
+    Raises:
+        ValueError: Si no se indica ningún destino.
+    """
+    global _SINK
+    if not sinks:
+        raise ValueError("Indica al menos un destino.")
+    disable()
+    _SINK = sinks[0] if len(sinks) == 1 else MultiSink(sinks)
+    return _SINK
+
+
+def disable() -> None:
+    """Apaga la instrumentación y cierra (vuelca) el destino activo."""
+    global _SINK
+    sink, _SINK = _SINK, None
+    if sink is not None:
+        sink.close()
+
+
+def configure_from_env(environ: dict[str, str] | None = None) -> bool:
+    """Activa destinos según variables de entorno.
+
+    - `UAO_TRACE_FILE`: ruta del JSON para chrome://tracing.
+    - `UAO_METRICS_FILE`: ruta del archivo de texto de Prometheus.
+    - `UAO_LOG_TIMINGS=1`: una línea de log por tramo.
+
+    Los archivos se escriben al salir del proceso.
+
+    Returns:
+        True si se activó algún destino.
+    """
+    env = os.environ if environ is None else environ
+    sinks: list[Sink] = []
+    if env.get("UAO_TRACE_FILE"):
+        sinks.append(ChromeTraceSink(env["UAO_TRACE_FILE"]))
+    if env.get("UAO_METRICS_FILE"):
+        sinks.append(PrometheusSink(env["UAO_METRICS_FILE"]))
+    if env.get("UAO_LOG_TIMINGS", "").lower() in {"1", "true", "yes"}:
+        sinks.append(LogSink())
+    if not sinks:
+        return False
+    enable(*sinks)
+    atexit.register(disable)
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Destinos
+# ---------------------------------------------------------------------------
+
+
+class MultiSink:
+    """Reparte cada evento entre varios destinos."""
+
+    def __init__(self, sinks: Any) -> None:
+        self.sinks = tuple(sinks)
+
+    def record_span(self, event: SpanEvent) -> None:
+        for sink in self.sinks:
+            sink.record_span(event)
+
+    def record_count(self, name: str, value: float) -> None:
+        for sink in self.sinks:
+            sink.record_count(name, value)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+class LogSink:
+    """Escribe una línea de log por tramo y por contador."""
+
+    def __init__(self, log: logging.Logger | None = None, level: int = logging.INFO):
+        self.log = log or logger
+        self.level = level
+
+    def record_span(self, event: SpanEvent) -> None:
+        attrs = "".join(f" {k}={v}" for k, v in event.attrs.items())
+        self.log.log(
+            self.level, "%s %.3f ms%s", event.name, event.duration_ns / 1e6, attrs
+        )
+
+    def record_count(self, name: str, value: float) -> None:
+        self.log.log(self.level, "%s +%s", name, value)
+
+    def close(self) -> None:
+        pass
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    """Escribe `text` en `path` sin dejar archivos a medias."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class PrometheusSink:
+    """Agrega tramos y contadores y los vuelca en formato de texto.
+
+    El archivo es apto para el *textfile collector* de node_exporter:
+    `<prefijo>_stage_seconds` (sum/count por etapa) y
+    `<prefijo>_events_total` (contadores).
+
+    Args:
+        path: Archivo de salida (se reescribe en cada `flush`).
+        prefix: Prefijo de los nombres de métrica.
+    """
+
+    def __init__(self, path: str | os.PathLike[str], prefix: str = METRIC_PREFIX):
+        self.path = Path(path)
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._seconds: dict[str, float] = defaultdict(float)
+        self._calls: dict[str, int] = defaultdict(int)
+        self._counters: dict[str, float] = defaultdict(float)
+
+    def record_span(self, event: SpanEvent) -> None:
+        with self._lock:
+            self._seconds[event.name] += event.duration_ns / 1e9
+            self._calls[event.name] += 1
+
+    def record_count(self, name: str, value: float) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def render(self) -> str:
+        """Métricas actuales en formato de texto de Prometheus."""
+        stage = f"{self.prefix}_stage_seconds"
+        events = f"{self.prefix}_events_total"
+        with self._lock:
+            lines = [
+                f"# HELP {stage} Tiempo acumulado por etapa del pipeline.",
+                f"# TYPE {stage} summary",
+            ]
+            for name in sorted(self._seconds):
+                lines.append(f'{stage}_sum{{stage="{name}"}} {self._seconds[name]:.9f}')
+                lines.append(f'{stage}_count{{stage="{name}"}} {self._calls[name]}')
+            lines += [
+                f"# HELP {events} Contadores de eventos del pipeline.",
+                f"# TYPE {events} counter",
+            ]
+            for name in sorted(self._counters):
+                lines.append(f'{events}{{name="{name}"}} {self._counters[name]:g}')
+        return "\n".join(lines) + "\n"
+
+    def flush(self) -> None:
+        """Reescribe el archivo con las métricas acumuladas."""
+        _atomic_write(self.path, self.render())
+
+    def close(self) -> None:
+        self.flush()
+
+
+class ChromeTraceSink:
+    """Guarda los tramos como eventos de traza (chrome://tracing, Perfetto).
+
+    Args:
+        path: Archivo JSON de salida (se escribe al cerrar).
+    """
+
+    def __init__(self, path: str | os.PathLike[str]):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._events: list[dict[str, Any]] = []
+        self._counters: dict[str, float] = defaultdict(float)
+        self._origin_ns = time.perf_counter_ns()
+        self._pid = os.getpid()
+
+    def _ts(self, ns: int) -> float:
+        return (ns - self._origin_ns) / 1000.0  # microsegundos
+
+    def record_span(self, event: SpanEvent) -> None:
+        trace_event = {
+            "name": event.name,
+            "cat": event.name.split(".", 1)[0],
+            "ph": "X",
+            "ts": self._ts(event.start_ns),
+            "dur": event.duration_ns / 1000.0,
+            "pid": self._pid,
+            "tid": event.thread_id,
+        }
+        if event.attrs:
+            trace_event["args"] = {k: str(v) for k, v in event.attrs.items()}
+        with self._lock:
+            self._events.append(trace_event)
+
+    def record_count(self, name: str, value: float) -> None:
+        with self._lock:
+            self._counters[name] += value
+            self._events.append(
+                {
+                    "name": name,
+                    "ph": "C",
+                    "ts": self._ts(time.perf_counter_ns()),
+                    "pid": self._pid,
+                    "args": {"value": self._counters[name]},
+                }
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            document = {"traceEvents": list(self._events), "displayTimeUnit": "ms"}
+        _atomic_write(self.path, json.dumps(document))
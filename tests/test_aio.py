@@ -0,0 +1,98 @@
+import asyncio
+import threading
+
+import cv2
+import numpy as np
+import pytest
+from src.aio import AsyncPredictor
+
+
+def _fake_batch_fn(calls, gate=None):
+    def fake(arrays):
+        if gate is not None:
+            gate.wait()
+        calls.append(len(arrays))
+        probs = np.array([0.1, 0.8, 0.1], np.float32)
+        return [(probs, np.zeros((8, 8, 3), np.uint8)) for _ in arrays]
+
+    return fake
+
+
+def _png_bytes(value=0):
+    ok, buf = cv2.imencode(".png", np.full((16, 16, 3), value, np.uint8))
+    assert ok
+    return buf.tobytes()
+
+
+def test_predict_async_coalesces_concurrent_awaiters():
+    """Las corrutinas concurrentes comparten batch y el bucle sigue libre."""
+    calls = []
+    with AsyncPredictor(_fake_batch_fn(calls), max_batch=8, max_wait_ms=50) as ai:
+
+        async def main():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.001)
+
+            tick = asyncio.create_task(ticker())
+            results = await asyncio.gather(
+                *(ai.predict(_png_bytes(i)) for i in range(6))
+            )
+            tick.cancel()
+            return results, ticks
+
+        results, ticks = asyncio.run(main())
+
+    assert [r[0] for r in results] == ["normal"] * 6
+    assert results[0][1] == pytest.approx(80.0)
+    assert sum(calls) == 6
+    assert len(calls) < 6
+    assert ticks > 0
+
+
+def test_predict_async_timeout_and_cancellation():
+    """Al agotar el tiempo, la imagen no llega a pasar por el modelo."""
+    calls = []
+    gate = threading.Event()
+    with AsyncPredictor(_fake_batch_fn(calls, gate), max_wait_ms=1) as ai:
+
+        async def main():
+            blocker = asyncio.create_task(ai.predict(_png_bytes()))
+            await asyncio.sleep(0.1)  # el batcher queda bloqueado en `gate`
+            with pytest.raises(asyncio.TimeoutError):
+                await ai.predict(_png_bytes(), timeout=0.05)
+            gate.set()
+            return await blocker
+
+        label, _proba, _heatmap = asyncio.run(main())
+
+    assert label == "normal"
+    assert calls == [1]
+
+
+def test_predict_stream_keeps_order_and_reports_errors(tmp_path):
+    """El stream respeta el orden de entrada y entrega los errores."""
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"img{i}.png"
+        path.write_bytes(_png_bytes(i))
+        paths.append(path)
+    paths.insert(2, tmp_path / "falta.png")
+
+    calls = []
+    with AsyncPredictor(_fake_batch_fn(calls), max_pending=2) as ai:
+
+        async def main():
+            return [result async for result in ai.stream(paths)]
+
+        results = asyncio.run(main())
+
+    assert [r.path for r in results] == paths
+    assert [r.index for r in results] == list(range(5))
+    assert not results[2].ok
+    assert all(r.label == "normal" for r in results if r.ok)
+    assert sum(calls) == 4
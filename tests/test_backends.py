@@ -0,0 +1,96 @@
+import gc
+import weakref
+
+import numpy as np
+import pytest
+from src import inference
+from src.backends import TFLiteBackend, backend_name, get_backend
+from src.bench import build_synthetic_model
+from src.export import check_parity, export_model
+from src.model import file_sha256
+
+
+@pytest.fixture(scope="module")
+def model_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("model") / "synthetic.h5"
+    build_synthetic_model().save(path)
+    return path
+
+
+def test_backend_name_from_env(monkeypatch):
+    """El motor sale del argumento, de UAO_BACKEND o del valor por defecto."""
+    monkeypatch.delenv("UAO_BACKEND", raising=False)
+    assert backend_name() == "keras"
+    monkeypatch.setenv("UAO_BACKEND", "TFLite")
+    assert backend_name() == "tflite"
+    assert backend_name("onnx") == "onnx"
+    with pytest.raises(ValueError, match="desconocido"):
+        backend_name("torch")
+
+
+def test_tflite_export_parity_and_classify(model_path, monkeypatch):
+    """El modelo TFLite exportado da las mismas probabilidades que Keras."""
+    monkeypatch.setenv("MODEL_PATH", str(model_path))
+    with pytest.raises(FileNotFoundError, match="app.export"):
+        get_backend("tflite")
+
+    paths = export_model(formats=["tflite"])
+    assert paths["tflite"] == model_path.with_suffix(".tflite")
+    [result] = check_parity(backends=["tflite"])
+    assert result.ok, result
+
+    engine = get_backend("tflite")
+    assert isinstance(engine, TFLiteBackend)
+    assert get_backend("tflite") is engine
+
+    rng = np.random.default_rng(0)
+    imgs = [(rng.random((300, 280)) * 255).astype(np.uint8) for _ in range(3)]
+    keras_probs = inference.classify_batch(imgs, batch_size=2, backend="keras")
+    tflite_probs = inference.classify_batch(imgs, batch_size=2, backend="tflite")
+    assert keras_probs.shape == (3, 3)
+    np.testing.assert_allclose(tflite_probs, keras_probs, atol=1e-4)
+
+
+def test_predictions_tag_the_backend_used(model_path, monkeypatch):
+    """Sin Grad-CAM, el resultado lleva el motor y el hash de su archivo."""
+    monkeypatch.setenv("MODEL_PATH", str(model_path))
+    monkeypatch.setenv("UAO_BACKEND", "tflite")
+    tflite_path = model_path.with_suffix(".tflite")
+    if not tflite_path.exists():
+        export_model(formats=["tflite"])
+
+    img = np.full((64, 64), 128, np.uint8)
+    [never] = inference.predict_batch([img], heatmap="never")
+    assert never.backend == "tflite"
+    assert never.model_sha256 == file_sha256(tflite_path)
+
+    [always] = inference.predict_batch([img], heatmap="always")
+    assert always.backend == "keras"
+    assert always.model_sha256 == file_sha256(model_path)
+    row = dict(zip(inference.PREDICTION_CSV_FIELDS, always.to_csv_row()))
+    assert row["backend"] == "keras"
+
+
+def test_onnx_export_parity(model_path, monkeypatch):
+    """Con tf2onnx y onnxruntime instalados, ONNX también pasa la paridad."""
+    pytest.importorskip("tf2onnx")
+    pytest.importorskip("onnxruntime")
+    monkeypatch.setenv("MODEL_PATH", str(model_path))
+    export_model(formats=["onnx"])
+    [result] = check_parity(backends=["onnx"])
+    assert result.ok, result
+
+
+def test_keras_backend_is_dropped_with_reloaded_model(model_path, monkeypatch):
+    """El motor Keras vive en la entrada del registro: al recargar se libera."""
+    from src.model import REGISTRY
+
+    monkeypatch.setenv("MODEL_PATH", str(model_path))
+    engine = get_backend("keras")
+    assert get_backend("keras") is engine
+    ref = weakref.ref(engine.model)
+
+    del engine
+    REGISTRY.evict()
+    gc.collect()
+    assert ref() is None
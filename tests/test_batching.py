@@ -0,0 +1,118 @@
+import json
+import threading
+import urllib.request
+
+import cv2
+import numpy as np
+import pytest
+from app.serve import InferenceServer
+from src.batching import MicroBatcher
+
+
+def _fake_batch_fn(calls, gate=None):
+    def fake(arrays):
+        if gate is not None:
+            gate.wait()
+        calls.append(len(arrays))
+        if any(a.size == 0 for a in arrays):
+            raise ValueError("imagen vacía")
+        probs = np.array([0.1, 0.8, 0.1], np.float32)
+        return [(probs, np.zeros((8, 8, 3), np.uint8)) for _ in arrays]
+
+    return fake
+
+
+def test_micro_batcher_groups_concurrent_requests():
+    """Las peticiones que llegan dentro de la ventana comparten batch."""
+    calls = []
+    gate = threading.Event()
+    batcher = MicroBatcher(_fake_batch_fn(calls, gate), max_batch=4, max_wait_ms=50)
+    try:
+        futures = [batcher.submit(np.zeros((4, 4), np.uint8)) for _ in range(6)]
+        gate.set()
+        results = [f.result(timeout=5) for f in futures]
+    finally:
+        batcher.close()
+
+    assert len(results) == 6
+    assert sum(calls) == 6
+    assert max(calls) <= 4
+    assert len(calls) < 6
+
+
+def test_micro_batcher_isolates_invalid_items():
+    """Una imagen inválida falla sola; las demás del batch se resuelven."""
+    calls = []
+    batcher = MicroBatcher(_fake_batch_fn(calls), max_batch=4, max_wait_ms=50)
+    try:
+        ok = batcher.submit(np.zeros((4, 4), np.uint8))
+        bad = batcher.submit(np.zeros((0,), np.uint8))
+        assert ok.result(timeout=5)[0][1] == pytest.approx(0.8)
+        with pytest.raises(ValueError):
+            bad.result(timeout=5)
+    finally:
+        batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(np.zeros((4, 4), np.uint8))
+
+
+def test_server_predict_endpoint(monkeypatch):
+    """`POST /predict` decodifica, agrupa y responde JSON con el heatmap."""
+    calls = []
+    batcher = MicroBatcher(_fake_batch_fn(calls), max_batch=2, max_wait_ms=5)
+    server = InferenceServer(("127.0.0.1", 0), batcher)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        ok, png = cv2.imencode(".png", np.zeros((16, 16), np.uint8))
+        assert ok
+        url = f"http://127.0.0.1:{server.server_address[1]}/predict?heatmap=1"
+        request = urllib.request.Request(url, data=png.tobytes(), method="POST")
+        with urllib.request.urlopen(request, timeout=10) as response:
+            payload = json.loads(response.read())
+    finally:
+        server.shutdown()
+        server.server_close()
+        batcher.close()
+
+    assert payload["label"] == "normal"
+    assert payload["probs"]["normal"] == pytest.approx(0.8)
+    assert payload["heatmap_png"]
+    # Mismo esquema que `Prediction.to_dict` (CLI, GUI, aio)
+    assert payload["backend"] == "keras" and "model_sha256" in payload
+    assert payload["timings"]["latency_ms"] >= 0
+    assert calls == [1]
+
+
+def test_server_rejects_bad_length_and_decode_errors(monkeypatch):
+    """Content-Length inválido → 400; cualquier fallo al decodificar → 422."""
+    import http.client
+
+    from src import io_imgs
+
+    def broken(data, ext=None):
+        raise cv2.error("imdecode falló")
+
+    monkeypatch.setattr(io_imgs, "read_image_bytes", broken)
+    batcher = MicroBatcher(_fake_batch_fn([]), max_batch=2, max_wait_ms=5)
+    server = InferenceServer(("127.0.0.1", 0), batcher)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    statuses = []
+    try:
+        for headers in ({"Content-Length": "abc"}, {"Content-Length": "4"}):
+            conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+            conn.putrequest("POST", "/predict")
+            for name, value in headers.items():
+                conn.putheader(name, value)
+            conn.endheaders(b"data")
+            response = conn.getresponse()
+            statuses.append((response.status, json.loads(response.read())["error"]))
+            conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+        batcher.close()
+
+    assert statuses[0] == (400, "Content-Length inválido.")
+    assert statuses[1][0] == 422 and "imdecode" in statuses[1][1]
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from src.bench import (
+    compare_results,
+    measure,
+    results_to_json,
+    run_suite,
+    synthetic_image,
+    write_synthetic_dicom,
+)
+from src.io_imgs import read_dicom_file
+
+
+def test_measure_and_compare_detects_regression():
+    """Las latencias se resumen y un p50 peor que la base es regresión."""
+    result = measure("noop", lambda: None, params={"size": 8}, repeat=5, warmup=0)
+    assert result.key == "noop[size=8]"
+    assert result.p50_ms <= result.p95_ms
+    assert result.images_per_sec > 0
+
+    current = results_to_json([result])
+    baseline = {"results": [dict(current["results"][0])]}
+    assert compare_results(current, baseline) == []
+
+    baseline["results"][0]["p50_ms"] = current["results"][0]["p50_ms"] / 10
+    assert len(compare_results(current, baseline, tolerance=0.2)) == 1
+
+    with pytest.raises(ValueError):
+        measure("noop", lambda: None, repeat=0)
+
+
+def test_run_suite_io_stages(tmp_path):
+    """Las etapas sin modelo se miden por tamaño de imagen."""
+    results = run_suite(
+        sizes=(64, 128),
+        stages=("read_dicom_file", "read_jpg_file", "preprocess"),
+        repeat=2,
+        warmup=0,
+        workdir=tmp_path,
+    )
+    assert [r.key for r in results] == [
+        "read_dicom_file[size=64]",
+        "read_jpg_file[size=64]",
+        "preprocess[size=64]",
+        "read_dicom_file[size=128]",
+        "read_jpg_file[size=128]",
+        "preprocess[size=128]",
+    ]
+    with pytest.raises(ValueError):
+        run_suite(stages=("desconocida",))
+
+
+def test_synthetic_dicom_round_trip(tmp_path):
+    """El DICOM sintético se lee como RGB uint8 con su tamaño original."""
+    path = write_synthetic_dicom(tmp_path / "x.dcm", synthetic_image(32))
+    rgb, _img = read_dicom_file(path)
+    assert rgb.shape == (32, 32, 3)
+    assert rgb.dtype == np.uint8
@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+from src.cache import MemoryLRU, ResultCache, cache_namespace
+
+
+def test_cache_roundtrip_and_namespace(tmp_path):
+    """Guardar y recuperar; otro modelo/preprocesamiento cambia la clave."""
+    cache = ResultCache(tmp_path, cache_namespace("a" * 64))
+    key = cache.key_for(b"imagen")
+    assert cache.get(key) is None
+
+    heat = (np.random.rand(32, 32, 3) * 255).astype(np.uint8)
+    cache.put(key, "viral", np.array([0.1, 0.2, 0.7]), heat)
+
+    hit = cache.get(key)
+    assert hit.label == "viral"
+    np.testing.assert_allclose(hit.probs, [0.1, 0.2, 0.7], rtol=1e-6)
+    np.testing.assert_array_equal(hit.heatmap, heat)
+
+    other = ResultCache(tmp_path, cache_namespace("b" * 64))
+    assert other.key_for(b"imagen") != key
+    params = {"size": (256, 256)}
+    assert cache_namespace("a" * 64, params) != cache_namespace("a" * 64)
+
+
+def test_cache_entry_without_heatmap(tmp_path):
+    """Modo solo clasificación: se guarda y recupera sin PNG."""
+    cache = ResultCache(tmp_path, "ns")
+    key = cache.key_for(b"imagen")
+    cache.put(key, "normal", np.array([0.1, 0.8, 0.1]), None)
+
+    assert not list(tmp_path.glob("*/*.png"))
+    hit = cache.get(key)
+    assert hit.label == "normal"
+    assert hit.heatmap is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Al exceder el tope se borran primero las entradas menos usadas."""
+    heat = (np.random.rand(64, 64, 3) * 255).astype(np.uint8)
+    cache = ResultCache(tmp_path, "ns", max_bytes=10**9)
+    keys = [cache.key_for(bytes([i])) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, "normal", np.zeros(3), heat)
+        for f in tmp_path.glob(f"*/{key}.*"):
+            os.utime(f, (1000 + i, 1000 + i))
+
+    entry_size = sum(f.stat().st_size for f in tmp_path.glob(f"*/{keys[0]}.*"))
+    cache.max_bytes = int(entry_size * 3.2)
+    assert cache.get(keys[0]) is not None  # ahora es la más reciente
+
+    cache.put(cache.key_for(b"nueva"), "normal", np.zeros(3), heat)
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+
+
+def test_memory_lru_is_bounded_by_bytes():
+    """MemoryLRU desaloja por tamaño y respeta el orden de uso."""
+    lru = MemoryLRU(max_bytes=3 * 1000)
+    arrays = {k: np.zeros(1000, np.uint8) for k in "abcd"}
+    for k in "abc":
+        lru.put(k, (arrays[k], None))
+    assert lru.nbytes == 3000
+
+    assert lru.get("a") is not None  # "b" queda como la menos reciente
+    lru.put("d", (arrays["d"], None))
+    assert "b" not in lru
+    assert all(k in lru for k in "acd")
+
+    lru.put("grande", np.zeros(5000, np.uint8))
+    assert "grande" not in lru
+
+
+def test_cache_rewrite_does_not_inflate_size(tmp_path):
+    """Reescribir una clave no suma dos veces su tamaño."""
+    heat = (np.random.rand(32, 32, 3) * 255).astype(np.uint8)
+    cache = ResultCache(tmp_path, "ns")
+    key = cache.key_for(b"imagen")
+    for _ in range(3):
+        cache.put(key, "viral", np.array([0.1, 0.2, 0.7]), heat)
+    on_disk = sum(f.stat().st_size for f in tmp_path.glob("*/*"))
+    assert cache._size == on_disk
+
+    cache.put(key, "viral", np.array([0.1, 0.2, 0.7]), None)
+    assert not list(tmp_path.glob("*/*.png"))
+    assert cache._size == sum(f.stat().st_size for f in tmp_path.glob("*/*"))
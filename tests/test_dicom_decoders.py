@@ -0,0 +1,112 @@
+import copy
+
+import numpy as np
+import pytest
+from src import dicom_decoders
+from src.bench import synthetic_image, write_synthetic_dicom
+from src.dicom_decoders import DecodeError, decode_dicom, register_decoder
+from src.io_imgs import iter_frames, read_dicom_file, read_image_bytes
+
+
+@pytest.mark.parametrize("syntax", ["native", "rle", "jpeg2000"])
+def test_lossless_syntaxes_decode_to_same_pixels(tmp_path, syntax):
+    """Las sintaxis sin pérdida dan los mismos píxeles y la misma imagen."""
+    pixels = synthetic_image(64)
+    path = write_synthetic_dicom(tmp_path / f"{syntax}.dcm", pixels, syntax)
+    native = write_synthetic_dicom(tmp_path / "ref.dcm", pixels)
+
+    decoded = decode_dicom(path)
+    np.testing.assert_array_equal(decoded.pixels, pixels)
+    assert decoded.decoder
+    np.testing.assert_array_equal(read_dicom_file(path)[0], read_dicom_file(native)[0])
+
+
+def test_decoder_fallback_and_forced_decoder(tmp_path, monkeypatch):
+    """Si un decodificador falla se usa el siguiente; forzar uno inexistente falla."""
+    monkeypatch.setattr(dicom_decoders, "_DECODERS", dict(dicom_decoders._DECODERS))
+    monkeypatch.setattr(
+        dicom_decoders,
+        "DECODER_PREFERENCES",
+        copy.deepcopy(dicom_decoders.DECODER_PREFERENCES),
+    )
+    path = write_synthetic_dicom(tmp_path / "x.dcm", synthetic_image(32), "jpeg")
+
+    class Broken:
+        name = "roto"
+
+        def supports(self, tsyntax, header):
+            return True
+
+        def decode(self, path, header):
+            raise RuntimeError("fallo")
+
+    register_decoder(Broken(), syntaxes=dicom_decoders.JPEG_BASELINE)
+    decoded = decode_dicom(path)
+    assert decoded.decoder != "roto"
+    assert decoded.pixels.shape == (32, 32)
+
+    with pytest.raises(DecodeError, match="roto: fallo"):
+        decode_dicom(path, decoder="roto")
+
+
+def test_read_image_bytes_uses_pluggable_decoders(tmp_path, monkeypatch):
+    """Un DICOM comprimido en memoria pasa por `decode_dicom` como uno en disco."""
+    pixels = synthetic_image(32)
+    path = write_synthetic_dicom(tmp_path / "x.dcm", pixels, "jpeg2000")
+    used = []
+    original = dicom_decoders.decode_dicom
+
+    def spy(source, decoder=None):
+        decoded = original(source, decoder)
+        used.append((type(source), decoded.decoder))
+        return decoded
+
+    monkeypatch.setattr(dicom_decoders, "decode_dicom", spy)
+    rgb, _img = read_image_bytes(path.read_bytes())
+
+    assert used and used[0][0] is bytes
+    np.testing.assert_array_equal(rgb, read_dicom_file(path)[0])
+
+
+def test_iter_frames_uses_registered_decoders(tmp_path, monkeypatch):
+    """Un multi-frame comprimido respeta preferencias, respaldo y registro."""
+    monkeypatch.setattr(dicom_decoders, "_DECODERS", dict(dicom_decoders._DECODERS))
+    monkeypatch.setattr(
+        dicom_decoders,
+        "DECODER_PREFERENCES",
+        copy.deepcopy(dicom_decoders.DECODER_PREFERENCES),
+    )
+    volume = np.stack([synthetic_image(32, seed=i) for i in range(3)])
+    path = write_synthetic_dicom(tmp_path / "mf.dcm", volume, "rle")
+    expected = list(iter_frames(path))
+    calls = []
+
+    class Broken:
+        name = "roto"
+
+        def supports(self, tsyntax, header):
+            return True
+
+        def iter_frames(self, source, header):
+            raise RuntimeError("fallo")
+
+    class Volume:  # sin `iter_frames`: se parte el resultado de `decode`
+        name = "volumen"
+
+        def supports(self, tsyntax, header):
+            return True
+
+        def decode(self, source, header):
+            calls.append(self.name)
+            return dicom_decoders.NativeDecoder().decode(source, header)
+
+    register_decoder(Volume(), syntaxes=dicom_decoders.RLE)
+    register_decoder(Broken(), syntaxes=dicom_decoders.RLE)
+    frames = list(iter_frames(path))
+    assert calls == ["volumen"]
+    assert len(frames) == 3
+    for frame, reference in zip(frames, expected):
+        np.testing.assert_array_equal(frame, reference)
+
+    _header, raw = dicom_decoders.iter_dicom_frames(path, decoder="volumen")
+    np.testing.assert_array_equal(np.stack(list(raw)), volume)
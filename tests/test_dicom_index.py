@@ -0,0 +1,68 @@
+import os
+
+import pydicom
+import pytest
+from pydicom.dataelem import RawDataElement
+from pydicom.tag import Tag
+from src.bench import synthetic_image, write_synthetic_dicom
+from src.dicom_index import DicomIndex
+
+
+def _write(path, modality, body_part, size=16):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_synthetic_dicom(path, synthetic_image(size))
+    ds = pydicom.dcmread(path)
+    ds.Modality = modality
+    ds.BodyPartExamined = body_part
+    ds.save_as(path)
+    return path
+
+
+def test_index_filters_and_updates_incrementally(tmp_path):
+    """Se filtra por etiquetas y solo se relee lo nuevo o modificado."""
+    root = tmp_path / "estudios"
+    chest = _write(root / "a" / "chest.dcm", "CR", "CHEST", size=32)
+    _write(root / "b" / "knee.dcm", "DX", "KNEE")
+    (root / "roto.dcm").write_bytes(b"no es un dicom")
+
+    with DicomIndex(tmp_path / "idx.sqlite") as index:
+        stats = index.update(root, workers=0)
+        assert (stats.scanned, stats.added, stats.failed) == (3, 3, 1)
+        assert index.paths(modalities=["cr", "dx"], body_parts=["chest"]) == [
+            chest.resolve()
+        ]
+        [entry] = index.select(body_parts=["CHEST"])
+        assert (entry.rows, entry.columns, entry.photometric) == (32, 32, "MONOCHROME2")
+        assert index.paths(min_rows=20) == [chest.resolve()]
+
+        # Sin cambios: nada se relee
+        stats = index.update(root, workers=0)
+        assert (stats.added, stats.updated, stats.unchanged) == (0, 0, 3)
+
+        # Un archivo modificado y otro borrado
+        _write(root / "b" / "knee.dcm", "DX", "CHEST")
+        knee = root / "b" / "knee.dcm"
+        mtime = knee.stat().st_mtime_ns + 10**9
+        os.utime(knee, ns=(mtime, mtime))
+        (root / "roto.dcm").unlink()
+        stats = index.update(root, workers=0)
+        assert (stats.updated, stats.removed) == (1, 1)
+        assert len(index.paths(body_parts=["CHEST"])) == 2
+        assert len(index) == 2
+
+
+@pytest.mark.filterwarnings("ignore:Invalid value for VR IS")
+def test_index_records_malformed_integer_tags(tmp_path):
+    """Un IS mal formado queda como error del archivo sin abortar `update`."""
+    root = tmp_path / "estudios"
+    _write(root / "ok.dcm", "CR", "CHEST")
+    bad = _write(root / "frames.dcm", "CR", "CHEST")
+    ds = pydicom.dcmread(bad)
+    tag = Tag(0x0028, 0x0008)  # NumberOfFrames
+    ds[tag] = RawDataElement(tag, "IS", 4, b"abc ", 0, False, True)
+    ds.save_as(bad)
+
+    with DicomIndex(tmp_path / "idx.sqlite") as index:
+        stats = index.update(root, workers=0)
+        assert (stats.scanned, stats.added, stats.failed) == (2, 2, 1)
+        assert index.paths(body_parts=["CHEST"]) == [(root / "ok.dcm").resolve()]
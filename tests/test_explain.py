@@ -0,0 +1,57 @@
+import gc
+import weakref
+
+import numpy as np
+import tensorflow as tf
+from src.explain import forward_with_cam, get_explainer, overlay_heatmap
+
+
+def _tiny_model():
+    inputs = tf.keras.Input((64, 64, 1))
+    x = tf.keras.layers.Conv2D(4, 3, activation="relu")(inputs)
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    outputs = tf.keras.layers.Dense(3, activation="softmax")(x)
+    return tf.keras.Model(inputs, outputs)
+
+
+def test_forward_with_cam_matches_predict():
+    """La pasada fusionada devuelve las mismas probabilidades que predict()."""
+    model = _tiny_model()
+    batch = np.random.rand(2, 64, 64, 1).astype(np.float32)
+
+    probs, heatmaps = forward_with_cam(model, batch)
+
+    np.testing.assert_allclose(probs, model.predict(batch, verbose=0), atol=1e-5)
+    assert heatmaps.shape == (2, 62, 62)
+    assert float(heatmaps.min()) >= 0.0
+    assert float(heatmaps.max()) <= 1.0 + 1e-6
+
+
+def test_overlay_heatmap_gray_and_rgb():
+    """El overlay acepta base RGB o en gris y devuelve RGB uint8."""
+    heat = np.random.rand(16, 16).astype(np.float32)
+    rgb = np.zeros((100, 80, 3), np.uint8)
+    gray = np.zeros((100, 80), np.uint8)
+    assert overlay_heatmap(rgb, heat, 64).shape == (64, 64, 3)
+    assert overlay_heatmap(gray, heat, 64).shape == (64, 64, 3)
+
+
+def test_explainer_is_cached_and_traced_once():
+    """El explicador se reutiliza y su paso compilado no se retraza."""
+    model = _tiny_model()
+    explainer = get_explainer(model)
+    assert get_explainer(model) is explainer
+
+    explainer(np.random.rand(1, 64, 64, 1).astype(np.float32))
+    explainer(np.random.rand(3, 64, 64, 1).astype(np.float32))
+    assert explainer._step.experimental_get_tracing_count() == 1
+
+
+def test_explainer_does_not_keep_model_alive():
+    """El explicador cacheado no impide liberar un modelo descartado."""
+    model = _tiny_model()
+    forward_with_cam(model, np.zeros((1, 64, 64, 1), np.float32))
+    ref = weakref.ref(model)
+    del model
+    gc.collect()
+    assert ref() is None
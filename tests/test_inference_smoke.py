@@ -1,32 +1,235 @@
+import csv
+import json
+from pathlib import Path
+
 import numpy as np
+import pytest
 from src import inference
 
 
 def test_predict_smoke(monkeypatch):
-    """Smoke test de inference.predict() con modelo y Grad‑CAM stub."""
+    """Smoke test de inference.predict() con modelo y pasada fusionada stub."""
     # Imagen gris en RGB (512x512x3)
     img = np.dstack([np.full((512, 512), 128, np.uint8)] * 3)
 
-    # Stub del modelo: acepta *args/**kwargs por verbose=0, etc.
-    class FakeModel:
-        def predict(self, batch, *args, **kwargs):
-            # Simula 3 clases con una distribución válida
-            return np.array([[0.2, 0.3, 0.5]], dtype=float)
-
-    # Reemplaza model_fun y grad_cam dentro de src.inference
-    monkeypatch.setattr(inference, "model_fun", lambda: FakeModel())
-    monkeypatch.setattr(
-        inference,
-        "grad_cam",
-        lambda x: np.dstack([np.full((512, 512), 10, np.uint8)] * 3),
-    )
+    calls = []
+
+    # Stub de la pasada única: simula 3 clases y un mapa Grad‑CAM 16x16
+    def fake_forward(model, batch):
+        calls.append(batch.shape)
+        probs = np.array([[0.2, 0.3, 0.5]], dtype=np.float32)
+        heat = np.linspace(0, 1, 256, dtype=np.float32).reshape(1, 16, 16)
+        return probs, heat
+
+    # Reemplaza model_fun y forward_with_cam dentro de src.inference
+    monkeypatch.setattr(inference, "model_fun", lambda: object())
+    monkeypatch.setattr(inference, "forward_with_cam", fake_forward)
 
     label, proba, heat = inference.predict(img)
 
     assert label in inference.LABELS
+    assert label == "viral"
     assert isinstance(proba, float)
     assert 0.0 <= proba <= 100.0
     assert heat.shape == (512, 512, 3)
     assert heat.dtype == np.uint8
+    # Un único preprocesamiento y una única pasada hacia delante
+    assert calls == [(1, 512, 512, 1)]
+
+
+def test_predict_batch_smoke(monkeypatch):
+    """predict_batch agrupa en batches y devuelve un resultado por imagen."""
+    imgs = [np.dstack([np.full((256, 256), v, np.uint8)] * 3) for v in (0, 80, 160)]
+    shapes = []
+
+    def fake_forward(model, batch):
+        n = batch.shape[0]
+        shapes.append(batch.shape)
+        probs = np.tile(np.array([[0.7, 0.2, 0.1]], dtype=np.float32), (n, 1))
+        return probs, np.zeros((n, 16, 16), np.float32)
+
+    monkeypatch.setattr(inference, "model_fun", lambda: object())
+    monkeypatch.setattr(inference, "forward_with_cam", fake_forward)
+
+    results = inference.predict_batch(imgs, batch_size=2)
+
+    assert shapes == [(2, 512, 512, 1), (1, 512, 512, 1)]
+    assert [r[0] for r in results] == ["bacteriana"] * 3
+    assert all(r[2].shape == (512, 512, 3) for r in results)
+
+
+def test_predict_study_batches_frames(monkeypatch):
+    """predict_study consume los frames por batches y promedia el estudio."""
+    frames = (np.full((64, 64), v, np.uint8) for v in range(5))
+    table = np.array(
+        [[0.9, 0.1, 0.0], [0.1, 0.1, 0.8], [0.1, 0.1, 0.8], [0.1, 0.1, 0.8]]
+        + [[0.1, 0.8, 0.1]],
+        dtype=np.float32,
+    )
+    shapes = []
+
+    def fake_forward(model, batch):
+        start = sum(s[0] for s in shapes)
+        shapes.append(batch.shape)
+        n = batch.shape[0]
+        return table[start : start + n], np.zeros((n, 16, 16), np.float32)
+
+    monkeypatch.setattr(inference, "model_fun", lambda: object())
+    monkeypatch.setattr(inference, "forward_with_cam", fake_forward)
+
+    study = inference.predict_study(frames, batch_size=2)
+
+    assert [s[0] for s in shapes] == [2, 2, 1]
+    assert [f[0] for f in study.frames] == ["bacteriana"] + ["viral"] * 3 + ["normal"]
+    np.testing.assert_allclose(study.probs, table.mean(axis=0))
+    assert study.label == "viral"
+    assert len(study.heatmaps) == 5
+
+
+def test_explain_batch_auto_heatmap_only_for_flagged(monkeypatch):
+    """Con heatmap="auto" solo se calcula Grad‑CAM de lo no normal o dudoso."""
+    imgs = [np.full((64, 64), v, np.uint8) for v in range(3)]
+    # normal seguro, viral, normal con confianza baja
+    table = np.array(
+        [[0.02, 0.97, 0.01], [0.1, 0.1, 0.8], [0.3, 0.6, 0.1]], dtype=np.float32
+    )
+    cam_sizes = []
+
+    class FakeEngine:
+        def predict(self, batch):
+            return table[: batch.shape[0]]
+
+    def fake_forward(model, batch):
+        cam_sizes.append(batch.shape[0])
+        n = batch.shape[0]
+        return table[:n], np.zeros((n, 16, 16), np.float32)
+
+    monkeypatch.setattr(inference, "get_backend", lambda: FakeEngine())
+    monkeypatch.setattr(inference, "model_fun", lambda: object())
+    monkeypatch.setattr(inference, "forward_with_cam", fake_forward)
+
+    auto = inference.explain_batch(imgs, heatmap="auto")
+    assert cam_sizes == [2]
+    assert [h is None for _p, h in auto] == [True, False, False]
+
+    never = inference.explain_batch(imgs, heatmap=False)
+    assert cam_sizes == [2]
+    assert all(h is None for _p, h in never)
+    np.testing.assert_allclose([p for p, _h in never], table)
+
+
+def test_heatmap_rows_use_keras_probs_when_engine_disagrees(monkeypatch):
+    """Con heatmap, etiqueta y Grad‑CAM salen de Keras en ambos caminos."""
+    imgs = [np.full((64, 64), v, np.uint8) for v in range(2)]
+    engine_probs = np.array([[0.1, 0.1, 0.8], [0.02, 0.97, 0.01]], np.float32)
+    keras_probs = np.array([[0.7, 0.2, 0.1]], np.float32)  # otra clase
+
+    class FakeEngine:
+        def predict(self, batch):
+            return engine_probs[: batch.shape[0]]
+
+    def fake_forward(model, batch):
+        n = batch.shape[0]
+        return np.repeat(keras_probs, n, axis=0), np.zeros((n, 16, 16), np.float32)
+
+    monkeypatch.setattr(inference, "get_backend", lambda: FakeEngine())
+    monkeypatch.setattr(inference, "backend_name", lambda: "tflite-int8")
+    monkeypatch.setattr(inference, "backend_sha256", lambda name: f"sha-{name}")
+    monkeypatch.setattr(inference, "model_fun", lambda: object())
+    monkeypatch.setattr(inference, "forward_with_cam", fake_forward)
+
+    explained, normal = inference.predict_batch(imgs, heatmap="auto")
+    assert (explained.label, explained.backend) == ("bacteriana", "keras")
+    assert explained.model_sha256 == "sha-keras"
+    np.testing.assert_allclose(explained.probs, keras_probs[0])
+    assert explained.heatmap is not None
+    assert (normal.label, normal.backend) == ("normal", "tflite-int8")
+    assert normal.heatmap is None
+
+    batch = np.zeros((1, 512, 512, 1), np.float32)
+    single = inference.predict(imgs[0], batch, heatmap="auto")
+    assert (single.label, single.backend) == (explained.label, explained.backend)
+    np.testing.assert_allclose(single.probs, explained.probs)
+
+
+def test_prediction_keeps_full_vector_and_serializes():
+    """Prediction conserva todas las clases y se serializa a JSONL/CSV."""
+    pred = inference.Prediction.from_probs(
+        np.array([0.15, 0.05, 0.8]), None, "ab" * 32, {"inference_ms": 12.5}
+    )
+
+    label, proba, heat = pred  # compatible con la tupla clásica
+    assert (label, heat) == ("viral", None)
+    assert proba == pytest.approx(80.0)
+    assert pred[0] == "viral" and len(pred) == 3
+    assert pred.class_index == 2
+    assert [name for name, _p in pred.top_k(2)] == ["viral", "bacteriana"]
+
+    record = json.loads(pred.to_json(top_k=1))
+    assert record["probs"] == {"bacteriana": 0.15, "normal": 0.05, "viral": 0.8}
+    assert record["top_k"] == [["viral", 0.8]]
+    assert record["model_sha256"] == "ab" * 32
+    assert "heatmap" not in record
+
+    row = dict(zip(inference.PREDICTION_CSV_FIELDS, pred.to_csv_row()))
+    assert row["p_normal"] == "0.050000"
+    assert row["inference_ms"] == "12.500"
+
+
+def test_batch_and_gui_outputs_reuse_prediction_serializers(tmp_path):
+    """CLI (JSONL/CSV) y el historial de la GUI comparten columnas y formato."""
+    from app.cli import RESULT_FIELDS, ResultsWriter
+
+    pred = inference.Prediction.from_probs(
+        np.array([0.15, 0.05, 0.8]), model_sha256="ab" * 32, backend="tflite"
+    )
+    for name in ("r.jsonl", "r.csv"):
+        writer = ResultsWriter(tmp_path / name)
+        writer.write(Path("a.png"), pred, cached=True)
+        writer.write(Path("b.png"), None, error="ilegible")
+        writer.close()
+
+    ok, bad = map(json.loads, (tmp_path / "r.jsonl").read_text().splitlines())
+    assert ok == {
+        "path": "a.png",
+        **pred.to_dict(),
+        "heatmap": None,
+        "cached": True,
+        "error": None,
+    }
+    assert (bad["path"], bad["error"]) == ("b.png", "ilegible")
+
+    with open(tmp_path / "r.csv", newline="", encoding="utf-8") as fh:
+        header, *rows = list(csv.reader(fh))
+    assert header == ["path", *inference.PREDICTION_CSV_FIELDS, *RESULT_FIELDS]
+    assert rows[0][1:-3] == [str(v) for v in pred.to_csv_row()]
+    assert all(len(row) == len(header) for row in rows)
+
+    gui = pytest.importorskip("app.gui")
+    history = tmp_path / "historial.csv"
+    for cedula in ("123-4", "567"):
+        gui.append_history(str(history), cedula, pred)
+    with open(history, newline="", encoding="utf-8") as fh:
+        records = list(csv.DictReader(fh, delimiter=gui.HISTORY_DELIMITER))
+    assert [r["cedula"] for r in records] == ["123-4", "567"]
+    assert records[0]["backend"] == "tflite"
+    assert records[0]["p_viral"] == "0.800000"
+
+
+def test_gui_history_rotates_legacy_file(tmp_path):
+    """Un historial del formato anterior (sin cabecera) no se mezcla."""
+    gui = pytest.importorskip("app.gui")
+    pred = inference.Prediction.from_probs(np.array([0.15, 0.05, 0.8]))
+    history = tmp_path / "historial.csv"
+    legacy = b"123-viral-80.00%\r\n456-normal-95.10%\r\n"
+    history.write_bytes(legacy)
 
+    gui.append_history(str(history), "789", pred)
+    assert (tmp_path / "historial.anterior.csv").read_bytes() == legacy
+    with open(history, newline="", encoding="utf-8") as fh:
+        [record] = list(csv.DictReader(fh, delimiter=gui.HISTORY_DELIMITER))
+    assert (record["cedula"], record["label"]) == ("789", "viral")
 
+    history.write_bytes(legacy)
+    gui.append_history(str(history), "790", pred)
+    assert (tmp_path / "historial.anterior-1.csv").exists()
@@ -0,0 +1,100 @@
+import cv2
+import numpy as np
+import pydicom
+import pytest
+from PIL import Image
+from src.bench import synthetic_image, write_synthetic_dicom
+from src.io_imgs import (
+    _rescale_float,
+    _rescale_lut,
+    frame_count,
+    iter_frames,
+    read_dicom_file,
+    read_jpg_file,
+    read_model_gray,
+)
+from src.preprocess import preprocess
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.int8, np.uint16, np.int16])
+@pytest.mark.parametrize("slope,intercept", [(1.0, 0.0), (0.5, -1024.0), (-2.0, 3.0)])
+@pytest.mark.parametrize("monochrome1", [False, True])
+def test_lut_matches_float_path(dtype, slope, intercept, monochrome1):
+    """La conversión por LUT es idéntica bit a bit a la ruta float32."""
+    info = np.iinfo(dtype)
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(info.min, info.max, (37, 41), endpoint=True).astype(dtype)
+    np.testing.assert_array_equal(
+        _rescale_lut(pixels, slope, intercept, monochrome1),
+        _rescale_float(pixels, slope, intercept, monochrome1),
+    )
+    flat = np.full((4, 4), 7, dtype=dtype)
+    assert not _rescale_lut(flat, slope, intercept, monochrome1).any()
+
+
+def test_read_dicom_file_applies_header(tmp_path):
+    """Rescale y MONOCHROME1 de la cabecera se aplican como en la ruta float."""
+    pixels = synthetic_image(48)
+    path = write_synthetic_dicom(tmp_path / "x.dcm", pixels)
+    ds = pydicom.dcmread(path)
+    ds.RescaleSlope = 2
+    ds.RescaleIntercept = -1024
+    ds.PhotometricInterpretation = "MONOCHROME1"
+    ds.save_as(path)
+
+    rgb, img2show = read_dicom_file(path)
+
+    expected = _rescale_float(pixels, 2.0, -1024.0, True)
+    np.testing.assert_array_equal(rgb[..., 0], expected)
+    np.testing.assert_array_equal(np.asarray(img2show), expected)
+
+
+def test_read_model_gray_matches_full_path(tmp_path):
+    """La ruta rápida da el mismo batch (DICOM) o casi (JPG) que la completa."""
+    pixels = synthetic_image(1200)
+    dcm = write_synthetic_dicom(tmp_path / "x.dcm", pixels)
+    gray = read_model_gray(dcm)
+    assert gray.shape == (512, 512) and gray.dtype == np.uint8
+    np.testing.assert_array_equal(
+        preprocess(gray), preprocess(read_dicom_file(dcm)[0])
+    )
+
+    jpg = tmp_path / "x.jpg"
+    cv2.imwrite(str(jpg), read_dicom_file(dcm)[0])
+    fast = read_model_gray(jpg, size=(256, 256))
+    full = cv2.resize(
+        cv2.cvtColor(read_jpg_file(jpg)[0], cv2.COLOR_RGB2GRAY),
+        (256, 256),
+        interpolation=cv2.INTER_AREA,
+    )
+    assert fast.shape == (256, 256)
+    assert np.abs(fast.astype(int) - full).mean() < 1.0
+
+    # Desde bytes ya leídos (fallos de caché del pipeline): mismo resultado
+    for path, size in ((dcm, (512, 512)), (jpg, (256, 256))):
+        np.testing.assert_array_equal(
+            read_model_gray(path, size, data=path.read_bytes()),
+            read_model_gray(path, size),
+        )
+
+
+def test_iter_frames_normalizes_each_frame(tmp_path):
+    """DICOM multi-frame y TIFF multipágina se recorren frame a frame."""
+    volume = np.stack([synthetic_image(64, seed=i) // (i + 1) for i in range(3)])
+    dcm = write_synthetic_dicom(tmp_path / "mf.dcm", volume)
+    frames = list(iter_frames(dcm))
+    assert frame_count(dcm) == 3
+    for index, frame in enumerate(frames):
+        # Cada frame como si fuera un DICOM de un solo frame
+        single = write_synthetic_dicom(tmp_path / f"f{index}.dcm", volume[index])
+        np.testing.assert_array_equal(frame, read_dicom_file(single)[0][..., 0])
+    # El primer frame es también lo que ve `read_dicom_file`
+    np.testing.assert_array_equal(read_dicom_file(dcm)[0][..., 0], frames[0])
+
+    tif = tmp_path / "mf.tif"
+    pages = [Image.fromarray(page) for page in volume]
+    pages[0].save(tif, save_all=True, append_images=pages[1:])
+    pages = list(iter_frames(tif))
+    assert frame_count(tif) == 3
+    assert all(p.dtype == np.uint8 and p.max() == 255 for p in pages)
+    np.testing.assert_array_equal(pages[1], _rescale_lut(volume[1], 1.0, 0.0, False))
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+from src.model import ModelRegistry
+
+
+def test_registry_loads_once_and_reloads_on_change(tmp_path):
+    """El registro reutiliza el modelo y lo recarga si el archivo cambia."""
+    path = tmp_path / "model.h5"
+    path.write_bytes(b"v1")
+    loads = []
+
+    def fake_loader(p):
+        loads.append(p)
+        return object()
+
+    registry = ModelRegistry(loader=fake_loader)
+    assert registry.loaded(path) is None
+
+    first = registry.get(path)
+    assert registry.get(path) is first
+    assert len(loads) == 1
+
+    entry = registry.entry(path)
+    assert registry.loaded(path) is entry
+    assert entry.size == 2
+    assert len(entry.sha256) == 64
+    assert entry.load_seconds >= 0.0
+
+    # Nuevo contenido y mtime → recarga
+    path.write_bytes(b"v2-new")
+    os.utime(path, ns=(entry.mtime_ns + 10**9, entry.mtime_ns + 10**9))
+    second = registry.get(path)
+    assert second is not first
+    assert len(loads) == 2
+    assert registry.entry(path).sha256 != entry.sha256
+
+
+def test_registry_missing_file(tmp_path):
+    """Un modelo inexistente produce FileNotFoundError."""
+    registry = ModelRegistry(loader=lambda p: object())
+    with pytest.raises(FileNotFoundError):
+        registry.get(tmp_path / "missing.h5")
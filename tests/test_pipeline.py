@@ -0,0 +1,129 @@
+import cv2
+import numpy as np
+import pytest
+from src import inference, pipeline
+from src.cache import ResultCache
+from src.pipeline import run_pipeline
+
+
+def _fake_explain_batch(calls):
+    def fake(arrays, batch_size, **_options):
+        calls.append(len(arrays))
+        probs = np.array([0.1, 0.8, 0.1], np.float32)
+        return [(probs, np.zeros((512, 512, 3), np.uint8)) for _ in arrays]
+
+    return fake
+
+
+def test_run_pipeline_streams_results_and_errors(monkeypatch):
+    """El pipeline agrupa en batches, aísla errores de lectura y entrega todo."""
+    batches = []
+
+    def reader(path):
+        if path.name == "bad.png":
+            raise ValueError("ilegible")
+        return np.zeros((64, 64, 3), np.uint8)
+
+    monkeypatch.setattr(inference, "explain_batch", _fake_explain_batch(batches))
+
+    paths = [f"img{i}.png" for i in range(5)] + ["bad.png"]
+    results = []
+    stats = run_pipeline(
+        paths, results.append, batch_size=2, readers=2, writers=2, reader=reader
+    )
+
+    assert stats.total == 6
+    assert stats.failed == 1
+    assert sum(batches) == 5
+    assert max(batches) <= 2
+    assert sorted(r.index for r in results) == list(range(6))
+    bad = [r for r in results if not r.ok]
+    assert [r.path.name for r in bad] == ["bad.png"]
+    assert all(r.label == "normal" for r in results if r.ok)
+
+
+def test_run_pipeline_resumes_from_cache(monkeypatch, tmp_path):
+    """Una segunda ejecución con caché no vuelve a llamar al modelo."""
+    calls = []
+    monkeypatch.setattr(inference, "explain_batch", _fake_explain_batch(calls))
+
+    paths = []
+    for i in range(3):
+        p = tmp_path / f"img{i}.png"
+        p.write_bytes(f"contenido-{i}".encode())
+        paths.append(p)
+
+    def reader(path):
+        return np.zeros((64, 64, 3), np.uint8)
+
+    cache = ResultCache(tmp_path / "cache", namespace="ns")
+    fresh = []
+    first = run_pipeline(paths, fresh.append, reader=reader, cache=cache)
+    assert first.cached == 0
+    assert sum(calls) == 3
+    assert all(r.inference_ms is not None and r.inference_ms >= 0 for r in fresh)
+
+    results = []
+    second = run_pipeline(paths, results.append, reader=reader, cache=cache)
+    assert second.cached == 3
+    assert sum(calls) == 3
+    assert all(r.cached and r.label == "normal" for r in results)
+    assert all(r.inference_ms is None for r in results)
+
+
+def test_run_pipeline_reraises_source_errors(monkeypatch):
+    """Si `paths` falla al iterarse, se entrega lo leído y se relanza el error."""
+    monkeypatch.setattr(inference, "explain_batch", _fake_explain_batch([]))
+
+    def paths():
+        yield "img0.png"
+        raise FileNotFoundError("manifiesto")
+
+    results = []
+    with pytest.raises(FileNotFoundError):
+        run_pipeline(
+            paths(),
+            results.append,
+            readers=2,
+            reader=lambda p: np.zeros((64, 64, 3), np.uint8),
+        )
+    assert [r.path.name for r in results] == ["img0.png"]
+
+
+def test_run_pipeline_isolates_non_value_errors(monkeypatch):
+    """Un error que no es ValueError (p. ej. cv2.error) solo afecta a su imagen."""
+    ok = _fake_explain_batch([])
+
+    def flaky(arrays, batch_size, **options):
+        if any(a.shape[0] == 1 for a in arrays):
+            raise RuntimeError("cv2.error simulado")
+        return ok(arrays, batch_size, **options)
+
+    monkeypatch.setattr(inference, "explain_batch", flaky)
+
+    def reader(path):
+        size = 1 if path.name == "corrupt.png" else 64
+        return np.zeros((size, size, 3), np.uint8)
+
+    results = []
+    stats = run_pipeline(
+        ["a.png", "corrupt.png", "b.png"], results.append, batch_size=4, reader=reader
+    )
+    assert stats.total == 3 and stats.failed == 1
+    assert {r.path.name for r in results if r.ok} == {"a.png", "b.png"}
+
+
+def test_run_pipeline_cache_miss_reads_file_once(monkeypatch, tmp_path):
+    """Con caché, un fallo decodifica los bytes ya leídos para la clave."""
+    monkeypatch.setattr(inference, "explain_batch", _fake_explain_batch([]))
+    path = tmp_path / "img.png"
+    cv2.imwrite(str(path), np.zeros((32, 32, 3), np.uint8))
+
+    def no_disk_read(*_args, **_kwargs):
+        raise AssertionError("segunda lectura del archivo")
+
+    monkeypatch.setattr(pipeline, "read_image_file", no_disk_read)
+    results = []
+    cache = ResultCache(tmp_path / "cache", namespace="ns")
+    stats = run_pipeline([path], results.append, cache=cache)
+    assert stats.failed == 0 and results[0].ok
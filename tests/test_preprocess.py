@@ -1,5 +1,6 @@
 import numpy as np
-from src.preprocess import preprocess
+import pytest
+from src.preprocess import Preprocessor, _clahe, preprocess, preprocess_batch
 
 
 def test_preprocess_rgb_and_gray():
@@ -20,3 +21,49 @@ def test_preprocess_rgb_and_gray():
     assert 0.0 <= float(out_gray.min()) <= 1.0
     assert 0.0 <= float(out_gray.max()) <= 1.0
 
+
+
+def test_preprocess_batch_matches_single():
+    """preprocess_batch apila imágenes de distinto tamaño en (N, H, W, 1)."""
+    imgs = [
+        (np.random.rand(300, 400, 3) * 255).astype(np.uint8),
+        (np.random.rand(600, 500) * 255).astype(np.uint8),
+    ]
+    batch = preprocess_batch(imgs)
+    assert batch.shape == (2, 512, 512, 1)
+    assert batch.dtype == np.float32
+    assert batch.flags.c_contiguous
+    for i, img in enumerate(imgs):
+        np.testing.assert_array_equal(batch[i], preprocess(img)[0])
+
+
+def test_preprocessor_parallel_out_and_no_mutation():
+    """El pool da lo mismo que en serie, escribe en `out` y no toca entradas."""
+    rng = np.random.default_rng(0)
+    imgs = [(rng.random((200 + 50 * i, 300)) * 255).astype(np.uint8) for i in range(5)]
+    noisy = rng.random((256, 256)).astype(np.float32)
+    noisy[0, :8] = np.nan
+    imgs.append(noisy)
+    originals = [img.copy() for img in imgs]
+
+    serial = Preprocessor(workers=0)(imgs)
+    with Preprocessor(workers=3) as parallel:
+        out = np.empty((len(imgs), 512, 512, 1), np.float32)
+        assert parallel(imgs, out=out) is out
+    np.testing.assert_array_equal(out, serial)
+    np.testing.assert_array_equal(preprocess_batch(imgs), serial)
+    for img, original in zip(imgs, originals):
+        np.testing.assert_array_equal(img, original)  # NaN incluidos
+
+    with pytest.raises(ValueError, match="out debe ser"):
+        Preprocessor()(imgs, out=np.empty((1, 512, 512, 1), np.float32))
+
+
+def test_preprocessor_reuses_buffer_and_clahe():
+    """Con `pooled` se reutiliza el buffer; CLAHE se crea una vez por hilo."""
+    img = np.full((64, 64), 100, np.uint8)
+    pre = Preprocessor(size=(32, 32), pooled=True)
+    first = pre([img, img])
+    second = pre([img])
+    assert np.shares_memory(first, second)
+    assert _clahe(2.0, (4, 4)) is _clahe(2, [4, 4])
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from src.backends import get_backend
+from src.bench import build_synthetic_model
+from src.export import parity_batch
+from src.quantize import (
+    QUANT_MODES,
+    format_report,
+    quantization_report,
+    quantize_model,
+    report_to_json,
+)
+
+
+def test_quantized_variants_and_report(tmp_path, monkeypatch):
+    """Las tres variantes se generan, se comparan con float32 y se sirven."""
+    model_path = tmp_path / "synthetic.h5"
+    build_synthetic_model().save(model_path)
+    monkeypatch.setenv("MODEL_PATH", str(model_path))
+    batch = parity_batch((512, 512, 1), samples=4)
+
+    with pytest.raises(ValueError, match="calibración"):
+        quantize_model(modes=["int8"])
+    paths = quantize_model(calibration=batch)
+    assert set(paths) == set(QUANT_MODES)
+    assert paths["int8"] == tmp_path / "synthetic.int8.tflite"
+
+    rows = quantization_report(paths, batch, repeat=2, warmup=1)
+    assert [row.mode for row in rows] == ["float32", *QUANT_MODES]
+    reference, *variants = rows
+    assert reference.max_drift == 0.0 and reference.label_agreement == 1.0
+    assert all(row.size_bytes < reference.size_bytes for row in variants)
+    float16 = rows[-1]
+    assert float16.passes(min_agreement=1.0, max_drift=1e-3)
+
+    report = report_to_json(rows)
+    assert [v["mode"] for v in report["variants"]] == [row.mode for row in rows]
+    assert "float16" in format_report(rows)
+
+    probs = get_backend("tflite-float16").predict(batch)
+    np.testing.assert_allclose(probs.sum(axis=1), 1.0, atol=1e-3)
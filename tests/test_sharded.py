@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pytest
+from src.bench import build_synthetic_model
+from src.sharded import run_sharded
+
+
+def _reader(path):
+    """Lector de prueba: `crash*` mata el proceso y `bad*` falla."""
+    if path.name.startswith("crash"):
+        os._exit(1)
+    if path.name.startswith("bad"):
+        raise ValueError("ilegible")
+    rng = np.random.default_rng(int(path.stem[3:]))
+    return rng.integers(0, 255, (64, 64, 3), dtype=np.uint8)
+
+
+@pytest.fixture(scope="module")
+def model_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("model") / "synthetic.h5"
+    build_synthetic_model().save(path)
+    return path
+
+
+def test_run_sharded_orders_results_and_survives_crashes(model_path, monkeypatch):
+    """Los resultados salen en orden y un proceso caído solo afecta su archivo."""
+    monkeypatch.setenv("MODEL_PATH", str(model_path))
+    # Un archivo culpable por bloque (dos reinicios cada uno), más que
+    # procesos: ninguno aborta el lote
+    crashes = [f"crash{i}.png" for i in range(4)]
+    names = ["img0.png", crashes[0], "img1.png", crashes[1], "img2.png"]
+    names += [crashes[2], "bad.png", crashes[3], "img3.png", "img4.png"]
+
+    results, heatmaps = [], {}
+
+    def sink(result):
+        results.append(result)
+        if result.ok:  # vista de memoria compartida: copiar para conservarla
+            heatmaps[result.path.name] = result.heatmap.copy()
+
+    stats = run_sharded(names, sink, workers=2, shard_size=2, reader=_reader)
+
+    assert [r.path.name for r in results] == names
+    assert stats.total == len(names)
+    assert stats.failed == 1 + len(crashes)
+    errors = {r.path.name: r.error for r in results if not r.ok}
+    assert errors["bad.png"] == "ilegible"
+    assert all("inesperadamente" in errors[name] for name in crashes)
+    assert all(r.label and r.heatmap is None for r in results if r.ok)
+    assert sorted(heatmaps) == [f"img{i}.png" for i in range(5)]
+    assert all(h.shape == (512, 512, 3) and h.any() for h in heatmaps.values())
+
+
+def test_run_sharded_reports_startup_failure(tmp_path, monkeypatch):
+    """Si el modelo no carga, se informa el error en vez de reintentar sin fin."""
+    monkeypatch.setenv("MODEL_PATH", str(tmp_path / "no_existe.h5"))
+    with pytest.raises(RuntimeError, match="iniciar"):
+        run_sharded(["img0.png"], lambda r: None, workers=1, reader=_reader)
+
+
+def test_run_sharded_rejects_ring_smaller_than_shard():
+    """Un anillo con menos slots que un bloque se rechaza antes de arrancar."""
+    with pytest.raises(ValueError, match="ring_slots"):
+        run_sharded(
+            ["img0.png"], lambda r: None, workers=1, shard_size=4, ring_slots=2
+        )
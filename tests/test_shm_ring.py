@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from src.shm_ring import SharedRing
+
+
+def test_shared_ring_views_are_shared_between_handles():
+    """Lo escrito en un slot se ve, sin copias, desde otro adjunto al anillo."""
+    with SharedRing(3) as ring:
+        other = SharedRing.attach(ring.spec)
+        other.view(1, "heatmap")[:] = 7
+        other.view(2, "tensor")[:] = 0.5
+
+        assert ring.view(1, "heatmap").shape == (512, 512, 3)
+        assert np.all(ring.view(1, "heatmap") == 7)
+        assert not ring.view(0, "heatmap").any()
+        assert ring.view(2, "tensor").dtype == np.float32
+        assert np.all(ring.view(2, "tensor") == 0.5)
+        other.close()
+
+
+def test_shared_ring_acquire_and_release():
+    """Los slots se reparten sin repetirse y se recuperan al liberarlos."""
+    with SharedRing(4, {"heatmap": ((8, 8, 3), "uint8")}) as ring:
+        first = ring.acquire(3)
+        assert sorted(first) == [0, 1, 2]
+        assert ring.acquire(2) is None
+        assert ring.acquire(2, timeout=0.01) is None
+
+        ring.release(first[:1])
+        second = ring.acquire(2)
+        assert len(set(first[1:]) | set(second)) == 4
+        assert ring.free == 0
+        with pytest.raises(ValueError, match="slots"):
+            ring.acquire(5)
@@ -0,0 +1,24 @@
+import subprocess
+import sys
+
+from src.startup import format_import_profile, profile_imports
+
+
+def test_import_src_does_not_load_heavy_dependencies():
+    """`import src` y la CLI no cargan TensorFlow, OpenCV ni pydicom."""
+    code = (
+        "import sys, src, app.cli\n"
+        "heavy = {'tensorflow', 'cv2', 'pydicom'} & set(sys.modules)\n"
+        "assert not heavy, heavy\n"
+        "assert callable(src.preprocess)\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_profile_imports_reports_each_module():
+    """El perfil incluye cada módulo y marca los que no existen."""
+    timings = profile_imports(["json", "modulo_que_no_existe"])
+    assert [t.module for t in timings] == ["json", "modulo_que_no_existe"]
+    assert timings[1].error is not None
+    text = format_import_profile(timings, elapsed_before=0.01)
+    assert "json" in text and "total" in text
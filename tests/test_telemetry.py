@@ -0,0 +1,34 @@
+import json
+
+import numpy as np
+from src import telemetry
+from src.preprocess import preprocess
+
+
+def test_span_is_noop_when_disabled():
+    """Sin destino activo no se registra nada y el contexto es compartido."""
+    telemetry.disable()
+    assert not telemetry.enabled()
+    assert telemetry.span("a") is telemetry.span("b")
+    telemetry.count("x")
+
+
+def test_sinks_record_preprocess_stages(tmp_path):
+    """Las etapas de preprocess llegan a la traza y a las métricas."""
+    trace = tmp_path / "trace.json"
+    metrics = tmp_path / "metrics.prom"
+    telemetry.enable(
+        telemetry.ChromeTraceSink(trace), telemetry.PrometheusSink(metrics)
+    )
+    try:
+        preprocess(np.zeros((64, 64, 3), np.uint8))
+        telemetry.count("images", 2)
+    finally:
+        telemetry.disable()
+
+    events = json.loads(trace.read_text())["traceEvents"]
+    names = {e["name"] for e in events if e["ph"] == "X"}
+    assert {"preprocess.gray", "preprocess.resize", "preprocess.clahe"} <= names
+    text = metrics.read_text()
+    assert 'uao_neumonia_stage_seconds_count{stage="preprocess.clahe"} 1' in text
+    assert 'uao_neumonia_events_total{name="images"} 2' in text